@@ -3,6 +3,8 @@ from app.routes.auth import auth_bp
 from app.routes.monitor import monitor_bp
 from app.routes.ocr import ocr_bp
 from app.routes.upload import upload_bp
+from app.services.ocr.registry import backend_registry
+from app.utils.config import WARMUP_BACKENDS
 import logging
 
 def create_app():
@@ -13,6 +15,7 @@ def create_app():
     - Creates a new Flask application instance
     - Registers all blueprints (auth, monitor, ocr, upload)
     - Configures basic logging
+    - Starts background warm-up of the configured OCR backends
     
     Returns:
         Flask: Configured Flask application instance
@@ -28,6 +31,9 @@ def create_app():
     # Configure logging
     logging.basicConfig(level=logging.INFO)
 
+    # Load OCR backends in the background so startup does not wait on them
+    backend_registry.warmup(WARMUP_BACKENDS)
+
     return app
 
 if __name__ == '__main__':
@@ -1,6 +1,5 @@
 from flask import Blueprint, jsonify
-from app.services.google_drive_service import GoogleDriveService
-from app.utils.config import CREDENTIALS_PATH, TOKEN_PATH
+from app.services.google_drive_service import get_drive_service
 import logging
 
 auth_bp = Blueprint('auth', __name__)
@@ -13,7 +12,7 @@ This blueprint handles:
 - User session management
 """
 
-drive_service = GoogleDriveService(CREDENTIALS_PATH, TOKEN_PATH)
+drive_service = get_drive_service()
 
 @auth_bp.route('/login', methods=['GET'])
 def login():
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
-from app.services.google_drive_service import GoogleDriveService
-from app.utils.config import CREDENTIALS_PATH, TOKEN_PATH
+from app.services.google_drive_service import get_drive_service
+from app.services.ingestion_pipeline import IngestionPipeline, STAGES
+from app.services.monitor_scheduler import MonitorScheduler
+from app.services.ocr.registry import OCR_BACKENDS
+from app.services.ocr.templates import template_registry
+from app.utils.config import DEFAULT_TEMPLATE
 import logging
-import threading
 
 monitor_bp = Blueprint('monitor', __name__)
 
@@ -10,51 +13,158 @@ monitor_bp = Blueprint('monitor', __name__)
 Blueprint for monitoring routes.
 
 This blueprint handles:
-- Starting monitoring of a Google Drive folder for new files
-- Monitoring Google Drive folders for new files
+- Starting monitoring of Google Drive folders for new files
+- Listing, pausing, resuming and stopping folder monitors
+- Running the ingestion pipeline (download, decode, OCR, parse, sink) on new files
 """
 
-drive_service = GoogleDriveService(CREDENTIALS_PATH, TOKEN_PATH)
-monitor_thread = None
+drive_service = get_drive_service()
+scheduler = MonitorScheduler(drive_service)
 
 @monitor_bp.route('/monitor', methods=['POST'])
 def monitor():
     """
-    Start monitoring a Google Drive folder for new files.
+    Start monitoring Google Drive folders for new files.
 
     Expects JSON payload:
         folder_name (str): Name of the Google Drive folder to monitor
+        folder_names (List[str], optional): Several folders to monitor, resolved in one batched call
+        interval (float, optional): Initial polling interval in seconds; it then adapts
+            to the folder's activity
+        pipeline (bool, optional): Extract new invoices instead of only downloading them
+        ocr_backend (str, optional): OCR backend of the pipeline (default: 'pytesseract')
+        genai_api_key (str, optional): API key, required for the 'genai' backend
+        concurrency (dict, optional): Worker threads per stage, e.g. {"download": 4, "ocr": 2}
+        template (str, optional): Detection template of the pipeline (default: 'detection_areas')
 
     Returns:
         200: Monitoring started successfully
-        400: Invalid request or monitoring already in progress
+        400: Invalid request or a folder already monitored
         401: Not authenticated
         500: Server error
 
     Note:
-        - Creates a background thread for continuous monitoring
-        - Only one monitoring thread can be active at a time
+        - All folders are polled by one scheduler over a shared worker pool
+        - In pipeline mode, results are appended to the pipeline results file;
+          progress is reported by GET /monitor/<folder_id>
     """
     data = request.get_json()
-    folder_name = data.get('folder_name')
+    folder_names = data.get('folder_names') or [data.get('folder_name')]
+    if not isinstance(folder_names, list) or not all(isinstance(name, str) and name.strip() for name in folder_names):
+        return jsonify({"error": "No folder name provided"}), 400
 
     if not drive_service:
         return jsonify({"error": "Not logged in"}), 401
 
     try:
-        folder_id = drive_service.get_folder_id_by_name(folder_name)
+        options = {"interval": float(data['interval'])} if data.get('interval') else {}
 
-        global monitor_thread
-        if monitor_thread and monitor_thread.is_alive():
-            return jsonify({"message": "Monitoring already in progress"}), 400
+        pipeline = None
+        if data.get('pipeline'):
+            backend_name = data.get('ocr_backend', 'pytesseract')
+            genai_api_key = data.get('genai_api_key')
+            if backend_name not in OCR_BACKENDS:
+                return jsonify({"error": "Invalid OCR backend specified"}), 400
+            if backend_name == 'genai' and not genai_api_key:
+                return jsonify({"error": "genai_api_key is required for 'genai' OCR backend"}), 400
 
-        monitor_thread = threading.Thread(target=drive_service.monitor_folder, args=(folder_id,))
-        monitor_thread.start()
+            concurrency = data.get('concurrency') or {}
+            unknown = set(concurrency) - set(STAGES)
+            if unknown:
+                return jsonify({"error": f"Unknown pipeline stage(s): {', '.join(sorted(unknown))}"}), 400
+            concurrency = {stage: int(workers) for stage, workers in concurrency.items()}
+            template = template_registry.get(data.get('template', DEFAULT_TEMPLATE)).name
 
-        return jsonify({"message": "Monitoring started"}), 200
+        # Every name is resolved and every pipeline built before any monitor is added
+        folder_ids = drive_service.get_folder_ids_by_name(folder_names)
+        folders = []
+        for folder_name, folder_id in folder_ids.items():
+            if data.get('pipeline'):
+                pipeline = IngestionPipeline(drive_service, folder_id, backend_name=backend_name,
+                                             genai_api_key=genai_api_key, concurrency=concurrency,
+                                             state=scheduler.state, template=template)
+            folders.append((folder_id, folder_name, pipeline))
+        # Adds all folders or, if one is already monitored, none
+        monitors = scheduler.add_many(folders, **options)
+
+        if len(monitors) == 1:
+            return jsonify({"message": "Monitoring started", "monitor": monitors[0]}), 200
+        return jsonify({"message": "Monitoring started", "monitors": monitors}), 200
     except ValueError as e:
         logging.error(f"Monitoring error: {e}")
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         logging.error(f"Monitoring error: {e}")
-        return jsonify({"error": "Failed to start monitoring"}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to start monitoring"}), 500
+
+
+@monitor_bp.route('/monitor', methods=['GET'])
+def list_monitors():
+    """
+    List folder monitors with their status, current interval and last-poll timing.
+
+    Returns:
+        200: {"monitors": [...]}
+    """
+    return jsonify({"monitors": scheduler.list()}), 200
+
+
+@monitor_bp.route('/monitor/<folder_id>', methods=['GET'])
+def get_monitor(folder_id):
+    """
+    Show one folder monitor, including pipeline queue depths and per-stage latency.
+
+    Returns:
+        200: Monitor details
+        404: Folder not monitored
+    """
+    monitor_info = scheduler.get(folder_id)
+    if monitor_info is None:
+        return jsonify({"error": "Folder not monitored"}), 404
+    return jsonify(monitor_info), 200
+
+
+@monitor_bp.route('/monitor/<folder_id>/pause', methods=['POST'])
+def pause_monitor(folder_id):
+    """
+    Pause polling of a folder.
+
+    Returns:
+        200: Monitor paused
+        404: Folder not monitored
+    """
+    try:
+        return jsonify({"message": "Monitoring paused", "monitor": scheduler.pause(folder_id)}), 200
+    except KeyError:
+        return jsonify({"error": "Folder not monitored"}), 404
+
+
+@monitor_bp.route('/monitor/<folder_id>/resume', methods=['POST'])
+def resume_monitor(folder_id):
+    """
+    Resume polling of a paused folder.
+
+    Returns:
+        200: Monitor resumed
+        404: Folder not monitored
+    """
+    try:
+        return jsonify({"message": "Monitoring resumed", "monitor": scheduler.resume(folder_id)}), 200
+    except KeyError:
+        return jsonify({"error": "Folder not monitored"}), 404
+
+
+@monitor_bp.route('/monitor/<folder_id>', methods=['DELETE'])
+def stop_monitor(folder_id):
+    """
+    Stop monitoring a folder. Its progress is kept, so monitoring it again resumes
+    from the last saved change token.
+
+    Returns:
+        200: Monitor stopped
+        404: Folder not monitored
+    """
+    try:
+        return jsonify({"message": "Monitoring stopped", "monitor": scheduler.stop(folder_id)}), 200
+    except KeyError:
+        return jsonify({"error": "Folder not monitored"}), 404
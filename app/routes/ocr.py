@@ -1,20 +1,30 @@
 from flask import Blueprint, request, jsonify
 import os
 import logging
-from app.services.google_drive_service import GoogleDriveService
-from app.services.ocr.pytesseract_backend import PytesseractOCR
-from app.services.ocr.easyocr_backend import EasyOCRBackend
-from app.services.ocr.genai_backend import GenAIOCRBackend
-from app.utils.text_parser import parse_detected_text
-import yaml
+from app.services.ocr.registry import backend_registry, OCR_BACKENDS
+from app.services.batch_service import BatchExtractor
+from app.services.job_queue import JobQueue, QueueFullError
+from app.services.extraction_service import (result_cache, result_cache_key, cache_backend_name,
+                                             validate_extraction_request, extract_invoice_file)
+from app.services.ocr.preprocessing import step_timer
+from app.services.ocr.templates import template_registry
+from app.utils.config import BATCH_MAX_FILES, BATCH_INVOICES_PER_TASK, JOB_RETRY_AFTER, DEFAULT_TEMPLATE
 
 ocr_bp = Blueprint('ocr', __name__)
 
-drive_service = GoogleDriveService('client_secret.json', 'token.json')
+# Process pool used by the batch endpoint
+batch_extractor = BatchExtractor()
 
-# Initialize OCR backends
-pytesseract_ocr = PytesseractOCR()
-easyocr_backend = EasyOCRBackend()
+# Background workers for asynchronous extraction jobs
+job_queue = JobQueue()
+
+def _is_true(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _is_positive_int(value):
+    # JSON true/false are bools, which are ints in Python
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 1
 
 @ocr_bp.route('/extract_invoice', methods=['POST'])
 def extract_invoice():
@@ -23,8 +33,10 @@ def extract_invoice():
 
     Expects:
         - 'filename': Name of the image file in the 'downloads' folder
-        - 'ocr_backend': String indicating which OCR backend to use ('pytesseract', 'easyocr', 'genai')
-        - 'genai_api_key': Required if 'ocr_backend' is 'genai'
+        - 'ocr_backend': String indicating which OCR backend to use ('pytesseract', 'easyocr', 'genai', 'cascade')
+        - 'genai_api_key': Required if 'ocr_backend' is 'genai'; adds the GenAI tier to 'cascade'
+        - 'template' (optional): Name of the detection template (default: 'detection_areas')
+        - 'no_cache' (optional): 'true' to bypass the result cache
 
     Returns:
         JSON with fields:
@@ -32,49 +44,321 @@ def extract_invoice():
             - date
             - second_product_amount
             - total_amount
+        With the 'cascade' backend, the 'X-OCR-Tiers' header lists the number of
+        fields each tier handled, e.g. 'pytesseract=3,easyocr=1'.
     """
     filename = request.form.get('filename')
-    if not filename:
-        return jsonify({"error": "No filename provided"}), 400
-
-    image_path = os.path.join('downloads', filename)
-    if not os.path.exists(image_path):
-        return jsonify({"error": f"File '{filename}' does not exist in downloads folder"}), 400
-
     ocr_backend_name = request.form.get('ocr_backend', 'pytesseract').lower()
     genai_api_key = request.form.get('genai_api_key')  # Only needed for GenAI
+    template = request.form.get('template', DEFAULT_TEMPLATE)
+
+    try:
+        image_path = validate_extraction_request(filename, ocr_backend_name, genai_api_key, template)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_cache = not _is_true(request.form.get('no_cache', 'false'))
+
+    # Perform OCR
+    try:
+        tier_counts = {}
+        extracted_data, cache_status = extract_invoice_file(image_path, ocr_backend_name, genai_api_key, use_cache,
+                                                            template, tier_counts)
+
+        response = jsonify(extracted_data)
+        response.headers['X-Cache'] = cache_status
+        if tier_counts:
+            response.headers['X-OCR-Tiers'] = ",".join(f"{tier}={count}" for tier, count in tier_counts.items())
+        return response, 200
+    except Exception as e:
+        logging.error(f"OCR extraction error: {e}")
+        return jsonify({"error": "Failed to extract invoice data"}), 500
+
+@ocr_bp.route('/extract_invoice_batch', methods=['POST'])
+def extract_invoice_batch():
+    """
+    Endpoint to extract invoice details from many images in the downloads folder.
+
+    The files are spread over a pool of worker processes; each worker loads
+    the selected OCR backend once and reuses it for every file it handles.
+
+    Expects JSON payload:
+        - 'filenames': List of image file names in the 'downloads' folder
+        - 'ocr_backend': OCR backend to use ('pytesseract', 'easyocr', 'genai')
+        - 'genai_api_key': Required if 'ocr_backend' is 'genai'
+        - 'workers' (optional): Number of worker processes to use, at most OCR_BATCH_WORKERS
+        - 'invoices_per_task' (optional): Invoices handed to a worker at once; batched
+          backends (EasyOCR in 'recognize' mode) recognize their regions together
+        - 'template' (optional): Name of the detection template (default: 'detection_areas')
+        - 'no_cache' (optional): true to bypass the result cache
 
-    if ocr_backend_name not in ['pytesseract', 'easyocr', 'genai']:
+    Returns:
+        200: JSON with per-file 'results', per-file 'errors', the number of
+             'cached' results and throughput figures; with the 'cascade' backend,
+             'tier_counts' holds the number of fields each tier handled (cached
+             results not included)
+        400: Invalid request
+        500: Batch could not be processed
+    """
+    data = request.get_json(silent=True) or {}
+    filenames = data.get('filenames')
+    if not isinstance(filenames, list) or not filenames:
+        return jsonify({"error": "'filenames' must be a non-empty list"}), 400
+    if len(filenames) > BATCH_MAX_FILES:
+        return jsonify({"error": f"At most {BATCH_MAX_FILES} files can be processed per batch"}), 400
+
+    ocr_backend_name = str(data.get('ocr_backend', 'pytesseract')).lower()
+    genai_api_key = data.get('genai_api_key')
+
+    if ocr_backend_name not in OCR_BACKENDS:
         return jsonify({"error": "Invalid OCR backend specified"}), 400
 
     if ocr_backend_name == 'genai' and not genai_api_key:
         return jsonify({"error": "genai_api_key is required for 'genai' OCR backend"}), 400
 
-    # Initialize OCR instance
-    if ocr_backend_name == 'pytesseract':
-        ocr_instance = pytesseract_ocr
-    elif ocr_backend_name == 'easyocr':
-        ocr_instance = easyocr_backend
-    elif ocr_backend_name == 'genai':
-        ocr_instance = GenAIOCRBackend(genai_api_key)
+    workers = data.get('workers')
+    if workers is not None and not _is_positive_int(workers):
+        return jsonify({"error": "'workers' must be a positive integer"}), 400
 
-    detection_areas = ocr_instance.load_detection_areas(yaml_path=os.path.join('downloads', 'detection_areas.yaml'))
+    invoices_per_task = data.get('invoices_per_task', BATCH_INVOICES_PER_TASK)
+    if not _is_positive_int(invoices_per_task):
+        return jsonify({"error": "'invoices_per_task' must be a positive integer"}), 400
 
-    # Perform OCR
     try:
-        detected_text_file = os.path.join('downloads', 'detected_text.txt')
-        if ocr_backend_name == 'genai':
-            ocr_instance.perform_ocr(image_path, detection_areas, output_file=detected_text_file, prompt="Extract text from the image.")
+        template = template_registry.get(data.get('template', DEFAULT_TEMPLATE))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    image_paths = {}
+    missing = {}
+    for filename in filenames:
+        image_path = os.path.join('downloads', str(filename))
+        if os.path.exists(image_path):
+            image_paths[filename] = image_path
         else:
-            ocr_instance.perform_ocr(image_path, detection_areas, output_file=detected_text_file)
+            missing[filename] = f"File '{filename}' does not exist in downloads folder"
 
-        # Parse the detected text to extract required fields
-        extracted_data = parse_detected_text(detected_text_file)
+    use_cache = not _is_true(data.get('no_cache', False))
 
-        # Clean up detected text file
-        os.remove(detected_text_file)
+    try:
+        cached = {}
+        cache_keys = {}
+        if use_cache:
+            cache_backend = cache_backend_name(ocr_backend_name, genai_api_key)
+            for filename, image_path in list(image_paths.items()):
+                cache_keys[filename] = result_cache_key(image_path, cache_backend, template)
+                hit = result_cache.get(cache_keys[filename])
+                if hit is not None:
+                    cached[filename] = hit
+                    del image_paths[filename]
+
+        if image_paths:
+            report = batch_extractor.extract(image_paths, ocr_backend_name, template,
+                                             genai_api_key=genai_api_key, workers=workers,
+                                             invoices_per_task=invoices_per_task)
+        else:
+            report = {"results": {}, "errors": {}, "elapsed_seconds": 0.0, "files_per_second": None}
+            if ocr_backend_name == 'cascade':
+                report["tier_counts"] = {}
+
+        for filename, extracted_data in report["results"].items():
+            if filename in cache_keys:
+                result_cache.put(cache_keys[filename], extracted_data)
 
-        return jsonify(extracted_data), 200
+        report["results"].update(cached)
+        report["cached"] = len(cached)
+        report["errors"].update(missing)
+        report["total_files"] = len(filenames)
+        report["succeeded"] = len(report["results"])
+        report["failed"] = len(report["errors"])
+        return jsonify(report), 200
     except Exception as e:
-        logging.error(f"OCR extraction error: {e}")
-        return jsonify({"error": "Failed to extract invoice data"}), 500
\ No newline at end of file
+        logging.error(f"Batch extraction error: {e}")
+        return jsonify({"error": "Failed to process batch"}), 500
+
+
+@ocr_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Endpoint to inspect the extraction result cache and the per-backend region caches.
+
+    Returns:
+        200: JSON with hit/miss/eviction counters and sizes:
+            - results: extraction result cache
+            - regions: region recognition cache of each backend in this process
+    """
+    regions = {}
+    for name in backend_registry.names():
+        backend_stats = [backend.region_cache.stats() for backend in backend_registry.instances(name)]
+        if len(backend_stats) == 1:
+            regions[name] = backend_stats[0]
+        elif backend_stats:
+            regions[name] = {key: sum(s[key] for s in backend_stats)
+                             for key in ("hits", "misses", "evictions", "entries")}
+    return jsonify({"results": result_cache.stats(), "regions": regions}), 200
+
+
+@ocr_bp.route('/warmup', methods=['POST'])
+def warmup():
+    """
+    Endpoint to preload OCR backends in the background.
+
+    Expects JSON payload:
+        - 'backends' (optional): List of backends to load (default: ['easyocr'])
+
+    Returns:
+        202: Warm-up started, JSON with the current backend states
+        400: Unknown backend or a backend that cannot be preloaded
+    """
+    data = request.get_json(silent=True) or {}
+    names = data.get('backends', ['easyocr'])
+    if not isinstance(names, list):
+        return jsonify({"error": "'backends' must be a list"}), 400
+    names = [str(name).lower() for name in names]
+    if 'genai' in names:
+        return jsonify({"error": "The 'genai' backend is created per API key and cannot be preloaded"}), 400
+
+    try:
+        backend_registry.warmup(names)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"message": "Warm-up started", "backends": backend_registry.status()}), 202
+
+
+@ocr_bp.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness endpoint.
+
+    Query parameters:
+        - 'backend' (optional): Only report ready once this backend is loaded
+
+    Returns:
+        200: Ready, JSON with the state of every backend
+        503: The requested backend is not loaded yet
+    """
+    states = backend_registry.status()
+    backend_name = request.args.get('backend')
+    if backend_name:
+        backend_name = backend_name.lower()
+        if backend_name not in states:
+            return jsonify({"error": f"Unknown OCR backend '{backend_name}'"}), 400
+        if not backend_registry.is_ready(backend_name):
+            return jsonify({"ready": False, "backends": states}), 503
+    return jsonify({"ready": True, "backends": states}), 200
+
+
+@ocr_bp.route('/genai/stats', methods=['GET'])
+def genai_stats():
+    """
+    Endpoint to inspect GenAI client call statistics.
+
+    Returns:
+        200: JSON list with, per loaded GenAI backend (one per API key), call,
+             retry and failure counters and latency percentiles
+    """
+    return jsonify([backend.client.stats() for backend in backend_registry.instances('genai')]), 200
+
+
+@ocr_bp.route('/cascade/stats', methods=['GET'])
+def cascade_stats():
+    """
+    Endpoint to inspect how many fields each cascade tier has handled.
+
+    Returns:
+        200: JSON list with, per loaded cascade backend (one with and one without
+             a GenAI API key), its tiers, confidence threshold and fields per tier
+    """
+    return jsonify([backend.stats() for backend in backend_registry.instances('cascade')]), 200
+
+
+@ocr_bp.route('/preprocessing/stats', methods=['GET'])
+def preprocessing_stats():
+    """
+    Endpoint to inspect the time spent in each preprocessing step.
+
+    Steps run by batch worker processes are recorded in those processes
+    and are not included.
+
+    Returns:
+        200: JSON with, per level ('page' or 'region') and step, the number
+             of calls, total seconds and mean milliseconds per call
+    """
+    return jsonify(step_timer.stats()), 200
+
+
+def _run_extraction_job(image_path, ocr_backend_name, genai_api_key, use_cache, template):
+    tier_counts = {}
+    extracted_data, cache_status = extract_invoice_file(image_path, ocr_backend_name, genai_api_key, use_cache,
+                                                        template, tier_counts)
+    result = {"invoice": extracted_data, "cache": cache_status}
+    if tier_counts:
+        result["tiers"] = tier_counts
+    return result
+
+
+@ocr_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Endpoint to queue an invoice extraction and return immediately.
+
+    Expects the same form fields as /extract_invoice:
+        - 'filename': Name of the image file in the 'downloads' folder
+        - 'ocr_backend': OCR backend to use ('pytesseract', 'easyocr', 'genai', 'cascade')
+        - 'genai_api_key': Required if 'ocr_backend' is 'genai'; adds the GenAI tier to 'cascade'
+        - 'template' (optional): Name of the detection template (default: 'detection_areas')
+        - 'no_cache' (optional): 'true' to bypass the result cache
+
+    Returns:
+        202: JSON with 'job_id' and 'status_url'
+        400: Invalid request
+        429: Job queue is full; retry after the 'Retry-After' delay
+    """
+    filename = request.form.get('filename')
+    ocr_backend_name = request.form.get('ocr_backend', 'pytesseract').lower()
+    genai_api_key = request.form.get('genai_api_key')  # Only needed for GenAI
+    template = request.form.get('template', DEFAULT_TEMPLATE)
+
+    try:
+        image_path = validate_extraction_request(filename, ocr_backend_name, genai_api_key, template)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_cache = not _is_true(request.form.get('no_cache', 'false'))
+
+    try:
+        job_id = job_queue.submit(_run_extraction_job, image_path, ocr_backend_name, genai_api_key, use_cache,
+                                  template)
+    except QueueFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = str(JOB_RETRY_AFTER)
+        return response, 429
+
+    return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+
+@ocr_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Endpoint to fetch the status and result of an extraction job.
+
+    Returns:
+        200: JSON with 'status' ('queued', 'running', 'succeeded', 'failed'),
+             timestamps, and 'result' or 'error' once finished
+        404: Unknown or expired job
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    return jsonify(job), 200
+
+
+@ocr_bp.route('/jobs', methods=['GET'])
+def job_stats():
+    """
+    Endpoint to inspect the job queue.
+
+    Returns:
+        200: JSON with queue depth, capacity, rejected submissions and job counts by status
+    """
+    return jsonify(job_queue.stats()), 200
@@ -1,16 +1,22 @@
 from flask import Blueprint, request, jsonify
 import os
 import logging
+from app.services.ocr.templates import template_registry
+from app.utils.config import DEFAULT_TEMPLATE
 
 upload_bp = Blueprint('upload', __name__)
 
 @upload_bp.route('/upload_yaml', methods=['POST'])
 def upload_yaml():
     """
-    Endpoint to upload a YAML file.
+    Endpoint to upload a YAML detection template.
+
+    The template is validated before it replaces the stored one; requests
+    running meanwhile keep using the previous version.
 
     Expects:
         - 'yaml_file': YAML file in multipart/form-data
+        - 'template' (optional): Template name (default: 'detection_areas')
 
     Returns:
         JSON with status message.
@@ -25,12 +31,39 @@ def upload_yaml():
     if not file.filename.endswith(('.yaml', '.yml')):
         return jsonify({"error": "Invalid file type. Only YAML files are allowed."}), 400
 
-    # Save the uploaded YAML file as 'detection_areas.yaml' in the 'downloads' folder
-    yaml_path = os.path.join('downloads', 'detection_areas.yaml')
-    os.makedirs('downloads', exist_ok=True)
-    file.save(yaml_path)
+    # Save the uploaded YAML file as '<template>.yaml' in the templates folder
+    name = request.form.get('template', DEFAULT_TEMPLATE)
+    try:
+        template = template_registry.save(name, file.read())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "YAML file uploaded successfully.", "template": template.name,
+                    "areas": list(template.area_names), "file_path": template_registry.path_for(name)}), 200
+
+@upload_bp.route('/templates', methods=['GET'])
+def list_templates():
+    """
+    Endpoint to list the available detection templates.
+
+    Returns:
+        JSON with the template names.
+    """
+    return jsonify({"templates": template_registry.names()}), 200
+
+@upload_bp.route('/templates/<name>', methods=['GET'])
+def get_template(name):
+    """
+    Endpoint to show a detection template as compiled by the server.
 
-    return jsonify({"message": "YAML file uploaded successfully.", "file_path": yaml_path}), 200
+    Returns:
+        200: JSON with the areas and options of the template
+        404: Unknown or invalid template
+    """
+    try:
+        return jsonify(template_registry.get(name).describe()), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
 
 @upload_bp.route('/upload_image', methods=['POST'])
 def upload_image():
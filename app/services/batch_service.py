@@ -0,0 +1,260 @@
+"""
+Batch extraction service.
+
+Spreads invoice OCR over a pool of worker processes. Each worker builds
+its OCR backend once when it starts and reuses it for every file it is
+handed, so model loading is paid once per worker instead of once per file.
+
+There is one pool of BATCH_WORKERS processes per backend and API key. A
+request asking for fewer workers keeps that many chunks in flight on the
+shared pool instead of getting a pool of its own, and pools left idle are
+shut down once more than BATCH_MAX_POOLS exist.
+"""
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from app.utils.config import BATCH_WORKERS, BATCH_INVOICES_PER_TASK, BATCH_MAX_POOLS
+
+# Backend instance owned by the current worker process
+_worker_backend = None
+_worker_backend_name = None
+
+
+def _init_worker(backend_name: str, genai_api_key: Optional[str]) -> None:
+    """
+    Process pool initializer: load the OCR backend once per worker.
+
+    The pool already runs one invoice per process, so regions are recognized
+    one by one inside a worker, and pooled backends (Tesseract engines) size
+    themselves to that single thread.
+    """
+    global _worker_backend, _worker_backend_name
+    from app.services.ocr.registry import backend_registry, backend_options
+    from app.services.ocr.region_executor import region_executor
+
+    region_executor.workers = 1
+
+    _worker_backend = backend_registry.get(backend_name, **backend_options(backend_name, genai_api_key))
+    _worker_backend_name = backend_name
+    logging.info(f"Batch worker {os.getpid()} ready with '{backend_name}' backend")
+
+
+def _extract_in_worker(image_paths: List[str], template) -> Tuple[List[Tuple[bool, object]], Dict[str, int]]:
+    """
+    Run OCR and field parsing for a chunk of images inside a worker process.
+
+    The chunk is recognized with extract_text_many() so batched backends can
+    share recognizer batches across invoices. If that fails, the images are
+    retried one by one so a single bad file only fails itself.
+
+    Args:
+        image_paths (List[str]): Paths to the invoice images
+        template (Template): Detection template (areas, per-area options and field mapping)
+
+    Returns:
+        Tuple[List[Tuple[bool, object]], Dict[str, int]]: Per image, (True, extracted fields)
+            or (False, error message); and with the 'cascade' backend, the number of
+            fields each tier handled (empty otherwise)
+    """
+    from app.utils.text_parser import parse_ocr_results
+
+    kwargs = {"prompt": "Extract text from the image."} if _worker_backend_name in ('genai', 'cascade') else {}
+    tier_counts = {}
+    if _worker_backend_name == 'cascade':
+        kwargs["tier_counts"] = tier_counts
+    try:
+        return [(True, parse_ocr_results(results, template.field_mapping))
+                for results in _worker_backend.extract_text_many(image_paths, template.areas, template.region_options,
+                                                                 template.page_steps, **kwargs)], tier_counts
+    except Exception:
+        if len(image_paths) == 1:
+            raise
+    # The failed attempt may already have counted fields; only the retries below are reported
+    tier_counts.clear()
+
+    outcomes = []
+    for image_path in image_paths:
+        try:
+            results = _worker_backend.extract_text(image_path, template.areas, template.region_options,
+                                                   template.page_steps, **kwargs)
+            outcomes.append((True, parse_ocr_results(results, template.field_mapping)))
+        except Exception as e:
+            outcomes.append((False, str(e)))
+    return outcomes, tier_counts
+
+
+class BatchExtractor:
+    """
+    Run invoice extraction for many files over a process pool.
+
+    One pool of max_workers processes is kept per (backend, API key) and
+    reused across requests, so warm workers keep their loaded models.
+
+    Attributes:
+        max_workers (int): Number of worker processes per pool
+        max_pools (int): Pools kept alive at most; the least recently used idle ones are shut down
+    """
+
+    def __init__(self, max_workers: int = BATCH_WORKERS, max_pools: int = BATCH_MAX_POOLS):
+        """
+        Initialize the batch extractor.
+
+        Args:
+            max_workers (int): Number of worker processes per pool
+            max_pools (int): Pools kept alive at most
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_pools = max(1, max_pools)
+        self._pools: "OrderedDict[Tuple[str, Optional[str]], ProcessPoolExecutor]" = OrderedDict()
+        self._users: Dict[Tuple[str, Optional[str]], int] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _acquire_pool(self, backend_name: str, genai_api_key: Optional[str]) -> ProcessPoolExecutor:
+        """
+        Return the pool of a backend and API key, creating it if needed; release it with _release_pool().
+        """
+        key = (backend_name, genai_api_key)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                # 'spawn' keeps workers independent of torch/OpenMP state in the parent
+                pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(backend_name, genai_api_key),
+                )
+                self._pools[key] = pool
+            self._pools.move_to_end(key)
+            self._users[key] = self._users.get(key, 0) + 1
+            idle = [other for other in self._pools if not self._users.get(other)]
+            evicted = [self._pools.pop(other) for other in idle[:max(0, len(self._pools) - self.max_pools)]]
+        for other in evicted:
+            other.shutdown(wait=False)
+        return pool
+
+    def _release_pool(self, backend_name: str, genai_api_key: Optional[str], pool: ProcessPoolExecutor,
+                      discard: bool = False) -> None:
+        """
+        Stop using a pool; with discard, also drop it so the next batch builds a new one.
+        """
+        key = (backend_name, genai_api_key)
+        with self._lock:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+            discard = discard and self._pools.get(key) is pool
+            if discard:
+                del self._pools[key]
+        if discard:
+            pool.shutdown(wait=False)
+
+    def extract(self, image_paths: Dict[str, str], backend_name: str, template,
+                genai_api_key: Optional[str] = None, workers: Optional[int] = None,
+                invoices_per_task: int = BATCH_INVOICES_PER_TASK) -> dict:
+        """
+        Extract invoice fields from several images in parallel.
+
+        Args:
+            image_paths (Dict[str, str]): Mapping of filename to image path
+            backend_name (str): OCR backend to use in the workers
+            template (Template): Detection template (areas, per-area options and field mapping)
+            genai_api_key (Optional[str]): API key, required for 'genai'
+            workers (Optional[int]): Chunks processed at once, at most max_workers (default: max_workers)
+            invoices_per_task (int): Images handed to a worker at once
+
+        Returns:
+            dict: Batch report with keys:
+                - results: {filename: extracted fields}
+                - errors: {filename: error message}
+                - total_files, succeeded, failed
+                - elapsed_seconds, files_per_second
+                - tier_counts: {tier: fields handled}, with the 'cascade' backend only
+        """
+        filenames = list(image_paths)
+        step = max(1, invoices_per_task)
+        chunks = [filenames[i:i + step] for i in range(0, len(filenames), step)]
+        workers = max(1, min(workers or self.max_workers, self.max_workers, len(chunks) or 1))
+
+        results: Dict[str, dict] = {}
+        errors: Dict[str, str] = {}
+        tier_counts: Dict[str, int] = {}
+        start = time.perf_counter()
+
+        pool = self._acquire_pool(backend_name, genai_api_key)
+        pending = iter(chunks)
+        futures = {}
+        broken = False
+        try:
+            while True:
+                # Keep at most 'workers' chunks of this request in flight on the shared pool
+                while not broken and len(futures) < workers:
+                    chunk = next(pending, None)
+                    if chunk is None:
+                        break
+                    future = pool.submit(_extract_in_worker, [image_paths[filename] for filename in chunk], template)
+                    futures[future] = chunk
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = futures.pop(future)
+                    try:
+                        outcomes, chunk_tier_counts = future.result()
+                    except BrokenProcessPool as e:
+                        broken = True
+                        errors.update({filename: f"Worker process terminated: {e}" for filename in chunk})
+                        continue
+                    except Exception as e:
+                        self.logger.error(f"Batch extraction failed for {', '.join(chunk)}: {e}")
+                        errors.update({filename: str(e) for filename in chunk})
+                        continue
+
+                    for tier, count in chunk_tier_counts.items():
+                        tier_counts[tier] = tier_counts.get(tier, 0) + count
+                    for filename, (ok, value) in zip(chunk, outcomes):
+                        if ok:
+                            results[filename] = value
+                        else:
+                            self.logger.error(f"Batch extraction failed for {filename}: {value}")
+                            errors[filename] = value
+
+            if broken:
+                # Chunks never submitted to the crashed pool
+                for chunk in pending:
+                    errors.update({filename: "Worker process terminated" for filename in chunk})
+        finally:
+            # A crashed worker poisons the whole pool; rebuild it on the next batch
+            self._release_pool(backend_name, genai_api_key, pool, discard=broken)
+
+        elapsed = time.perf_counter() - start
+        report = {
+            "results": results,
+            "errors": errors,
+            "total_files": len(image_paths),
+            "succeeded": len(results),
+            "failed": len(errors),
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(len(results) / elapsed, 3) if elapsed > 0 else None,
+        }
+        if backend_name == 'cascade':
+            report["tier_counts"] = tier_counts
+        return report
+
+    def shutdown(self) -> None:
+        """
+        Shut down all worker pools.
+        """
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=True)
@@ -0,0 +1,175 @@
+"""
+Invoice extraction service.
+
+Runs the full single-invoice flow shared by the HTTP endpoint and the job
+queue: backend lookup, detection template, result cache, OCR and field parsing.
+"""
+import os
+from typing import Optional, Tuple
+from app.services.ocr.registry import backend_registry, backend_options, OCR_BACKENDS
+from app.services.ocr.templates import template_registry
+from app.services.result_cache import ExtractionCache
+from app.utils.text_parser import parse_ocr_results
+from app.utils.config import (DOWNLOADS_DIR, DEFAULT_TEMPLATE, TESSERACT_MODE, EASYOCR_MODE, EASYOCR_QUANTIZE,
+                              EASYOCR_SPLIT_LINES, GENAI_MODE, CASCADE_MIN_CONFIDENCE, DECODE_MIN_REGION_HEIGHT,
+                              RESIZE_MODE, RESIZE_MAX_SCALE, RESIZE_INTERPOLATION, INK_GATE, INK_CROP, INK_MIN_STD,
+                              INK_MIN_RATIO, INK_MARGIN)
+
+# Extraction results keyed by image content, detection areas and backend
+result_cache = ExtractionCache()
+
+GENAI_PROMPT = "Extract text from the image."
+
+
+def validate_extraction_request(filename: Optional[str], backend_name: str, genai_api_key: Optional[str],
+                                template: str = DEFAULT_TEMPLATE) -> str:
+    """
+    Validate an extraction request and resolve the image path.
+
+    Args:
+        filename (Optional[str]): Name of the image file in the downloads folder
+        backend_name (str): Requested OCR backend
+        genai_api_key (Optional[str]): API key, required for 'genai'
+        template (str): Name of the detection template
+
+    Returns:
+        str: Path to the image
+
+    Raises:
+        ValueError: If the request is invalid
+    """
+    if not filename:
+        raise ValueError("No filename provided")
+
+    image_path = os.path.join(DOWNLOADS_DIR, filename)
+    if not os.path.exists(image_path):
+        raise ValueError(f"File '{filename}' does not exist in downloads folder")
+
+    if backend_name not in OCR_BACKENDS:
+        raise ValueError("Invalid OCR backend specified")
+
+    if backend_name == 'genai' and not genai_api_key:
+        raise ValueError("genai_api_key is required for 'genai' OCR backend")
+
+    # Parses and caches the template, or raises if it is unknown or malformed
+    template_registry.get(template)
+
+    return image_path
+
+
+def cache_backend_name(backend_name: str, genai_api_key: Optional[str] = None) -> str:
+    """
+    Return the backend name results are cached under.
+
+    A cascade's result depends on which tiers it can escalate to, so it is
+    cached as 'cascade(<tiers>)', e.g. 'cascade(pytesseract,easyocr,genai)'.
+
+    Args:
+        backend_name (str): OCR backend
+        genai_api_key (Optional[str]): API key sent with the request
+
+    Returns:
+        str: Backend name for result_cache_key()
+    """
+    if backend_name != 'cascade':
+        return backend_name
+    # Only computes the tiers; the tier backends load on first use
+    cascade = backend_registry.get(backend_name, **backend_options(backend_name, genai_api_key))
+    return f"cascade({','.join(cascade.tiers)})"
+
+
+def backend_fingerprint(cache_backend: str) -> dict:
+    """
+    Return the settings that decide the output of a backend, for the result cache key.
+
+    Args:
+        cache_backend (str): Backend name from cache_backend_name()
+
+    Returns:
+        dict: Decode, resize and ink settings plus the settings of each backend in use
+    """
+    backends = {
+        'pytesseract': {'mode': TESSERACT_MODE},
+        'easyocr': {'mode': EASYOCR_MODE, 'quantize': EASYOCR_QUANTIZE, 'split_lines': EASYOCR_SPLIT_LINES},
+        'genai': {'mode': GENAI_MODE, 'prompt': GENAI_PROMPT},
+    }
+    fingerprint = {
+        'decode_min_region_height': DECODE_MIN_REGION_HEIGHT,
+        'resize': [RESIZE_MODE, RESIZE_MAX_SCALE, RESIZE_INTERPOLATION],
+        'ink': [INK_GATE, INK_CROP, INK_MIN_STD, INK_MIN_RATIO, INK_MARGIN],
+    }
+    if cache_backend.startswith('cascade('):
+        tiers = cache_backend[len('cascade('):-1].split(',')
+        fingerprint['cascade'] = {'min_confidence': CASCADE_MIN_CONFIDENCE}
+    else:
+        tiers = [cache_backend]
+    for name in tiers:
+        if name in backends:
+            fingerprint[name] = backends[name]
+    return fingerprint
+
+
+def result_cache_key(image_path: str, cache_backend: str, template) -> str:
+    """
+    Build the result cache key of an image, shared by single and batch extraction.
+
+    Args:
+        image_path (str): Path to the invoice image
+        cache_backend (str): Backend name from cache_backend_name()
+        template (Template): Detection template; its areas, per-area options and page steps are part of the key
+
+    Returns:
+        str: Result cache key
+    """
+    return result_cache.make_key(image_path, template.areas, cache_backend, template.region_options,
+                                 template.page_steps, backend_fingerprint(cache_backend))
+
+
+def extract_invoice_file(image_path: str, backend_name: str, genai_api_key: Optional[str] = None,
+                         use_cache: bool = True, template: str = DEFAULT_TEMPLATE,
+                         tier_counts: Optional[dict] = None) -> Tuple[dict, str]:
+    """
+    Extract invoice fields from one image.
+
+    Args:
+        image_path (str): Path to the invoice image
+        backend_name (str): OCR backend to use
+        genai_api_key (Optional[str]): API key, required for 'genai'
+        use_cache (bool): Look up and store the result in the result cache
+        template (str): Name of the detection template
+        tier_counts (Optional[dict]): With the 'cascade' backend, receives the number
+            of fields each tier handled (left empty on a cache hit)
+
+    Returns:
+        Tuple[dict, str]: Extracted fields and the cache status ('HIT', 'MISS' or 'BYPASS')
+
+    Raises:
+        Exception: If the backend cannot be loaded or OCR fails
+    """
+    # Backends are created on first use; GenAI instances are kept per API key
+    ocr_instance = backend_registry.get(backend_name, **backend_options(backend_name, genai_api_key))
+
+    detection_template = template_registry.get(template)
+    detection_areas = detection_template.areas
+
+    cache_key = None
+    if use_cache:
+        cache_key = result_cache_key(image_path, cache_backend_name(backend_name, genai_api_key), detection_template)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached, 'HIT'
+
+    kwargs = {}
+    if backend_name in ('genai', 'cascade'):
+        kwargs["prompt"] = GENAI_PROMPT
+    if backend_name == 'cascade' and tier_counts is not None:
+        kwargs["tier_counts"] = tier_counts
+    results = ocr_instance.extract_text(image_path, detection_areas, detection_template.region_options,
+                                        detection_template.page_steps, **kwargs)
+
+    # Map the recognized areas to the required fields
+    extracted_data = parse_ocr_results(results, detection_template.field_mapping)
+
+    if cache_key:
+        result_cache.put(cache_key, extracted_data)
+    return extracted_data, 'MISS' if use_cache else 'BYPASS'
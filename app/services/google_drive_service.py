@@ -1,14 +1,76 @@
 import os
-import io
-from typing import List, Dict, Optional, Set
+import json
+import hashlib
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from concurrent.futures import ThreadPoolExecutor
+import google_auth_httplib2
+import httplib2
+from app.services.monitor_state import MonitorState
+from app.utils.config import DRIVE_CHUNK_SIZE, DRIVE_DOWNLOAD_WORKERS, DRIVE_BATCH_SIZE
 import logging
+import threading
 import time
 
+# Google Docs, Sheets, folders, shortcuts...: no binary content to download
+GOOGLE_APPS_MIME_PREFIX = 'application/vnd.google-apps.'
+
+# Statuses no retry can fix. A 401 only reaches callers once AuthorizedHttp
+# has refreshed the credentials and retried, so it is permanent too.
+PERMANENT_STATUSES = (400, 401, 404)
+
+# Reasons Drive sends with 403 when throttling or out of quota
+RATE_LIMIT_REASONS = ('userRateLimitExceeded', 'rateLimitExceeded', 'dailyLimitExceeded',
+                      'downloadQuotaExceeded', 'sharingRateLimitExceeded', 'quotaExceeded')
+
+
+def is_downloadable(file: Dict[str, str]) -> bool:
+    """
+    Return True if a file has binary content (not a folder or a Google-native document).
+    """
+    return not (file.get('mimeType') or '').startswith(GOOGLE_APPS_MIME_PREFIX)
+
+
+def error_reasons(error: HttpError) -> List[str]:
+    """
+    Return the reason codes in the JSON body of an API error, e.g. ['rateLimitExceeded'].
+    """
+    try:
+        body = json.loads(error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content)
+        details = body['error']
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return []
+    entries = (details.get('errors') or []) + (details.get('details') or [])
+    return [entry['reason'] for entry in entries if isinstance(entry, dict) and entry.get('reason')]
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Return True if a request was throttled (429, or 403 with a rate limit or quota reason).
+    """
+    if not isinstance(error, HttpError):
+        return False
+    status = int(error.resp.status)
+    return status == 429 or (status == 403 and any(reason in RATE_LIMIT_REASONS for reason in error_reasons(error)))
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """
+    Return True if retrying a request cannot succeed (400, 401 or 404).
+
+    Throttling, quota errors, timeouts and server errors are transient, so
+    the file is tried again on a later poll.
+    """
+    if not isinstance(error, HttpError) or is_rate_limited(error):
+        return False
+    return int(error.resp.status) in PERMANENT_STATUSES
+
+
 class GoogleDriveService:
     """
     A service class for interacting with Google Drive API.
@@ -19,6 +81,12 @@ class GoogleDriveService:
     - Download files from Drive
     - Monitor folders for changes
     - Handle OAuth2 authentication flow
+
+    One instance is shared by the whole process (see get_drive_service()).
+    Token refreshes are serialized by a lock, and every thread reuses its own
+    authorized HTTP connection, since httplib2 connections are not thread-safe.
+    Parallel downloads run on one long-lived thread pool, so its threads keep
+    their connections from one call to the next.
     
     Attributes:
         SCOPES (List[str]): Required OAuth2 scopes for Drive API
@@ -30,8 +98,10 @@ class GoogleDriveService:
     """
 
     SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+    FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
 
-    def __init__(self, credentials_path: str, token_path: str, monitored_folder_id: Optional[str] = None):
+    def __init__(self, credentials_path: str, token_path: str, monitored_folder_id: Optional[str] = None,
+                 download_workers: int = DRIVE_DOWNLOAD_WORKERS):
         """
         Initialize the Google Drive service.
 
@@ -39,13 +109,22 @@ class GoogleDriveService:
             credentials_path (str): Path to the Google OAuth2 credentials JSON file
             token_path (str): Path where the OAuth2 token will be saved/loaded
             monitored_folder_id (Optional[str]): ID of the folder to monitor (optional)
+            download_workers (int): Maximum number of concurrent downloads
         """
         self.credentials_path = credentials_path
         self.token_path = token_path
         self.monitored_folder_id = monitored_folder_id
         self.service = None
+        self.credentials = None
         self.user_email = None
         self.logger = logging.getLogger(__name__)
+        self._thread_local = threading.local()
+        self._auth_lock = threading.RLock()
+        self._download_executor = ThreadPoolExecutor(max_workers=max(1, download_workers),
+                                                     thread_name_prefix="drive-download")
+        # Partial file path -> [lock, number of downloads holding or waiting for it]
+        self._partial_locks: Dict[str, list] = {}
+        self._partial_locks_guard = threading.Lock()
 
     def login(self) -> None:
         """
@@ -62,22 +141,25 @@ class GoogleDriveService:
         Raises:
             Exception: If authentication fails
         """
-        creds = None
-        if os.path.exists(self.token_path):
-            creds = Credentials.from_authorized_user_file(self.token_path, self.SCOPES)
+        with self._auth_lock:
+            creds = None
+            if os.path.exists(self.token_path):
+                creds = Credentials.from_authorized_user_file(self.token_path, self.SCOPES)
 
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, self.SCOPES)
-                creds = flow.run_local_server(port=0)
-            with open(self.token_path, 'w') as token:
-                token.write(creds.to_json())
+            if not creds or not creds.valid:
+                if creds and creds.expired and creds.refresh_token:
+                    creds.refresh(Request())
+                else:
+                    flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, self.SCOPES)
+                    creds = flow.run_local_server(port=0)
+                self._save_token(creds)
 
-        self.service = build('drive', 'v3', credentials=creds)
+            self.credentials = creds
+            # Connections authorized with previous credentials are dropped
+            self._thread_local = threading.local()
+            self.service = build('drive', 'v3', credentials=creds, cache_discovery=False)
 
-        about = self.service.about().get(fields='user').execute()
+        about = self._execute(self.service.about().get(fields='user'))
         self.user_email = about['user']['emailAddress']
         self.logger.info(f"Logged in as: {self.user_email}")
 
@@ -89,59 +171,326 @@ class GoogleDriveService:
         performs login if necessary.
         """
         if not self.service:
-            self.login()
+            with self._auth_lock:
+                if not self.service:
+                    self.login()
+        elif not self.credentials.valid:
+            self._refresh_credentials()
+
+    def _refresh_credentials(self) -> None:
+        """
+        Refresh expired credentials once, even when many threads notice at the same time.
+        """
+        with self._auth_lock:
+            if self.credentials.valid:
+                return
+            self.credentials.refresh(Request())
+            self._save_token(self.credentials)
+            self.logger.info("Refreshed Google Drive access token")
+
+    def _save_token(self, creds: Credentials) -> None:
+        with open(self.token_path, 'w') as token:
+            token.write(creds.to_json())
+
+    def _execute(self, request):
+        """
+        Execute an API request over the calling thread's pooled connection.
+        """
+        return request.execute(http=self._thread_http())
+
+    def _execute_batch(self, requests: List) -> List[Tuple[Optional[dict], Optional[Exception]]]:
+        """
+        Execute API requests in batched HTTP calls of up to DRIVE_BATCH_SIZE requests.
+
+        Args:
+            requests (List[HttpRequest]): Requests built from self.service
+
+        Returns:
+            List[Tuple[Optional[dict], Optional[Exception]]]: Per request, in order,
+                the response and the error (one of them is None)
+        """
+        results = [(None, None)] * len(requests)
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+
+        for start in range(0, len(requests), DRIVE_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index, request in enumerate(requests[start:start + DRIVE_BATCH_SIZE], start):
+                batch.add(request, request_id=str(index))
+            batch.execute(http=self._thread_http())
+        return results
 
     def list_files(self, folder_id: str) -> List[Dict[str, str]]:
         """
-        List all files in a specified Google Drive folder.
+        List all files in a specified Google Drive folder, following every result page.
 
         Args:
             folder_id (str): The ID of the Google Drive folder to list
 
         Returns:
-            List[Dict[str, str]]: List of dictionaries containing file metadata:
+            List[Dict[str, str]]: Downloadable files (folders and Google-native
+                documents are left out), with metadata:
                 - id: File ID
                 - name: File name
                 - mimeType: File MIME type
                 - createdTime: File creation timestamp
+                - size, md5Checksum: Content size in bytes and checksum
 
         Raises:
             Exception: If API request fails
         """
         self._ensure_authenticated()
 
-        results = self.service.files().list(
-            q=f"'{folder_id}' in parents and trashed=false",
-            spaces='drive',
-            fields='files(id, name, mimeType, createdTime)'
-        ).execute()
+        files = []
+        page_token = None
+        while True:
+            results = self._execute(self.service.files().list(
+                q=f"'{folder_id}' in parents and trashed=false",
+                spaces='drive',
+                fields='nextPageToken, files(id, name, mimeType, createdTime, size, md5Checksum)',
+                pageSize=1000,
+                pageToken=page_token
+            ))
+            files.extend(file for file in results.get('files', []) if is_downloadable(file))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def get_start_page_token(self) -> str:
+        """
+        Get the page token marking the current position of the Drive change feed.
 
-        return results.get('files', [])
+        Returns:
+            str: Start page token for changes.list
+        """
+        self._ensure_authenticated()
+        return self._execute(self.service.changes().getStartPageToken())['startPageToken']
 
-    def download_file(self, file_id: str, save_path: str) -> None:
+    def list_changes(self, page_token: str, folder_id: Optional[str] = None) -> Tuple[List[Dict[str, str]], str]:
         """
-        Download a file from Google Drive.
+        Read the Drive change feed from a page token.
+
+        Args:
+            page_token (str): Token returned by get_start_page_token() or a previous call
+            folder_id (Optional[str]): Only return files whose parent is this folder
+
+        Returns:
+            Tuple[List[Dict[str, str]], str]: Added or modified files (id, name,
+                mimeType, createdTime, size, md5Checksum) that are not trashed,
+                folders or Google-native documents, and the token to use for the next call
+        """
+        self._ensure_authenticated()
+
+        files = []
+        while True:
+            results = self._execute(self.service.changes().list(
+                pageToken=page_token,
+                spaces='drive',
+                pageSize=1000,
+                fields='nextPageToken, newStartPageToken, '
+                       'changes(fileId, removed, file(id, name, mimeType, createdTime, size, md5Checksum, parents, trashed))'
+            ))
+
+            for change in results.get('changes', []):
+                file = change.get('file')
+                if change.get('removed') or not file or file.get('trashed'):
+                    continue
+                if not is_downloadable(file):
+                    continue
+                if folder_id and folder_id not in file.get('parents', []):
+                    continue
+                files.append({key: file.get(key)
+                              for key in ('id', 'name', 'mimeType', 'createdTime', 'size', 'md5Checksum')})
+
+            if 'newStartPageToken' in results:
+                return files, results['newStartPageToken']
+            page_token = results['nextPageToken']
+
+    def poll_folder(self, folder_id: str, state: MonitorState) -> Tuple[List[Dict[str, str]], str]:
+        """
+        Find files in a folder that have not been processed (or permanently failed) yet.
+
+        On the first poll of a folder (no saved page token) the whole folder
+        is listed once; afterwards only the change feed is read.
+
+        Args:
+            folder_id (str): ID of the monitored folder
+            state (MonitorState): Saved page tokens and processed file IDs
+
+        Returns:
+            Tuple[List[Dict[str, str]], str]: Unprocessed files and the page token to
+                save once they have been handled
+        """
+        page_token = state.get_page_token(folder_id)
+        if page_token is None:
+            # Take the token before listing so changes made during the listing are not missed
+            next_token = self.get_start_page_token()
+            files = self.list_files(folder_id)
+        else:
+            files, next_token = self.list_changes(page_token, folder_id)
+
+        new_files = []
+        seen = set()
+        for file in files:
+            if file['id'] in seen or state.is_processed(folder_id, file['id']) or state.is_failed(folder_id, file['id']):
+                continue
+            seen.add(file['id'])
+            new_files.append(file)
+        return new_files, next_token
+
+    def _thread_http(self):
+        """
+        Return an authorized HTTP client owned by the calling thread.
+
+        httplib2 connections are not thread-safe, so parallel downloads each
+        use their own connection.
+        """
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._thread_local.http = http
+        return http
+
+    def get_file_metadata(self, file_id: str) -> Dict[str, str]:
+        """
+        Get the size and MD5 checksum of a file.
+
+        Args:
+            file_id (str): The ID of the file
+
+        Returns:
+            Dict[str, str]: Metadata with 'id', 'name', 'size' and 'md5Checksum'
+        """
+        self._ensure_authenticated()
+        return self._execute(self.service.files().get(fileId=file_id, fields='id, name, size, md5Checksum'))
+
+    @contextmanager
+    def _partial_lock(self, part_path: str):
+        """
+        Hold the lock of a partial file, so one download at a time writes to it.
+        """
+        key = os.path.abspath(part_path)
+        with self._partial_locks_guard:
+            entry = self._partial_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._partial_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._partial_locks[key]
+
+    def download_file(self, file_id: str, save_path: str, chunk_size: int = DRIVE_CHUNK_SIZE,
+                      metadata: Optional[Dict[str, str]] = None) -> None:
+        """
+        Download a file from Google Drive, streaming it to disk.
+
+        Chunks are appended to '.partial/<file_id>' next to save_path, which is
+        renamed to save_path once its size and MD5 checksum match Drive's, so
+        a partial or corrupt file never appears under its final name. If a
+        partial file is left over from an interrupted transfer, the download
+        resumes from its current size with a Range request. Downloads of the
+        same file ID into the same directory (e.g. from overlapping polls) take
+        turns, so they never write to the partial file at the same time.
 
         Args:
             file_id (str): The ID of the file to download
             save_path (str): Local path where the file should be saved
+            chunk_size (int): Bytes requested per chunk
+            metadata (Optional[Dict[str, str]]): File metadata holding 'size' and
+                'md5Checksum' (e.g. from list_files()); fetched when missing
 
         Raises:
-            IOError: If file cannot be saved
-            Exception: If download fails
+            IOError: If file cannot be saved or does not match Drive's size or checksum
+            HttpError: If download fails
+        """
+        self._ensure_authenticated()
+        if not metadata or metadata.get('size') is None:
+            metadata = self.get_file_metadata(file_id)
+        size = int(metadata['size'])
+        expected_md5 = metadata.get('md5Checksum')
+
+        partial_dir = os.path.join(os.path.dirname(save_path) or '.', '.partial')
+        os.makedirs(partial_dir, exist_ok=True)
+        part_path = os.path.join(partial_dir, file_id)
+        with self._partial_lock(part_path):
+            self._download_to(file_id, part_path, save_path, size, expected_md5, chunk_size)
+
+    def _download_to(self, file_id: str, part_path: str, save_path: str, size: int, expected_md5: Optional[str],
+                     chunk_size: int) -> None:
+        # Caller holds the partial file's lock
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset > size:
+            # Left over from an older version of the file
+            offset = 0
+
+        md5 = hashlib.md5()
+        if offset:
+            with open(part_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    md5.update(block)
+            self.logger.info(f"Resuming download of {file_id} at byte {offset}")
+
+        uri = self.service.files().get_media(fileId=file_id).uri
+        http = self._thread_http()
+        with open(part_path, 'r+b' if offset else 'wb') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            while offset < size:
+                end = min(offset + chunk_size, size) - 1
+                response, content = http.request(uri, headers={'range': f'bytes={offset}-{end}'})
+                if response.status not in (200, 206):
+                    raise HttpError(response, content, uri=uri)
+                if response.status == 200 and offset:
+                    # Range ignored: the whole file was sent again
+                    f.seek(0)
+                    f.truncate()
+                    md5 = hashlib.md5()
+                    offset = 0
+                if not content:
+                    break
+                f.write(content)
+                md5.update(content)
+                offset += len(content)
+
+        if offset != size or (expected_md5 and md5.hexdigest() != expected_md5):
+            os.remove(part_path)
+            raise IOError(f"Download of {file_id} does not match Drive's size or checksum "
+                          f"({offset} of {size} bytes)")
+        os.replace(part_path, save_path)
+
+    def download_files(self, files: List[Dict[str, str]],
+                       directory: str = 'downloads') -> Dict[str, Optional[Exception]]:
+        """
+        Download several files in parallel on the service's download pool.
+
+        Args:
+            files (List[Dict[str, str]]): File metadata with at least 'id' and 'name'
+            directory (str): Local directory to save the files in
+
+        Returns:
+            Dict[str, Optional[Exception]]: Per file ID, None on success or the error raised
         """
         self._ensure_authenticated()
+        if not files:
+            return {}
 
-        request = self.service.files().get_media(fileId=file_id)
-        with io.BytesIO() as file_stream:
-            downloader = MediaIoBaseDownload(file_stream, request)
-            done = False
-            while not done:
-                _, done = downloader.next_chunk()
+        def download(file):
+            try:
+                self.download_file(file['id'], os.path.join(directory, file['name']), metadata=file)
+                return None
+            except Exception as e:
+                if is_rate_limited(e):
+                    self.logger.warning(f"Download of {file['name']} throttled by Drive; retrying on the next poll")
+                else:
+                    self.logger.error(f"Failed to download {file['name']}: {e}")
+                return e
 
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            with open(save_path, 'wb') as f:
-                f.write(file_stream.getvalue())
+        outcomes = list(self._download_executor.map(download, files))
+        return {file['id']: outcome for file, outcome in zip(files, outcomes)}
 
     def get_folder_id_by_name(self, folder_name: str) -> str:
         """
@@ -157,48 +506,127 @@ class GoogleDriveService:
             ValueError: If folder is not found
             Exception: If API request fails
         """
+        return self.get_folder_ids_by_name([folder_name])[folder_name]
+
+    def get_folder_ids_by_name(self, folder_names: List[str]) -> Dict[str, str]:
+        """
+        Resolve several folder names to IDs with batched API calls.
+
+        Args:
+            folder_names (List[str]): Names of the folders to find
+
+        Returns:
+            Dict[str, str]: Folder ID per name
+
+        Raises:
+            ValueError: If a folder is not found
+            Exception: If API request fails
+        """
         self._ensure_authenticated()
-        results = self.service.files().list(
-            q=f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false",
-            spaces='drive',
-            fields='files(id)'
-        ).execute()
+        names = list(dict.fromkeys(folder_names))
+        requests = []
+        for name in names:
+            escaped = name.replace('\\', '\\\\').replace("'", "\\'")
+            requests.append(self.service.files().list(
+                q=f"name='{escaped}' and mimeType='{self.FOLDER_MIME_TYPE}' and trashed=false",
+                spaces='drive',
+                fields='files(id)'
+            ))
 
-        files = results.get('files', [])
-        if not files:
-            raise ValueError(f"Folder '{folder_name}' not found")
-        return files[0]['id']
+        folder_ids = {}
+        for name, (response, exception) in zip(names, self._execute_batch(requests)):
+            if exception is not None:
+                raise exception
+            files = response.get('files', [])
+            if not files:
+                raise ValueError(f"Folder '{name}' not found")
+            folder_ids[name] = files[0]['id']
+        return folder_ids
 
-    def monitor_folder(self, folder_id: str, interval: int = 60) -> None:
+    def sync_folder(self, folder_id: str, state: MonitorState, directory: str = 'downloads') -> int:
+        """
+        Poll a folder once and download its new files.
+
+        Args:
+            folder_id (str): ID of the monitored folder
+            state (MonitorState): Saved page tokens and processed file IDs
+            directory (str): Local directory to save the files in
+
+        Returns:
+            int: Number of new files found
+        """
+        files, next_token = self.poll_folder(folder_id, state)
+        for file in files:
+            self.logger.info(f"New file detected: {file['name']}")
+
+        errors = self.download_files(files, directory)
+        retry = False
+        for file in files:
+            error = errors[file['id']]
+            if error is None:
+                state.mark_processed(folder_id, file['id'])
+                self.logger.info(f"Downloaded: {file['name']}")
+            elif is_permanent_error(error):
+                # Retrying cannot help, so the file must not hold back the page token
+                state.mark_failed(folder_id, file['id'], str(error))
+            elif not state.record_failed_attempt(folder_id, file['id'], str(error)):
+                retry = True
+
+        # Keep the old page token after a transient failure so the file is picked up again next time
+        if not retry:
+            state.set_page_token(folder_id, next_token)
+        else:
+            state.flush()
+        return len(files)
+
+    def monitor_folder(self, folder_id: str, interval: int = 60, state: Optional[MonitorState] = None) -> None:
         """
         Continuously monitor a Google Drive folder for new files.
 
         This method runs in an infinite loop and:
-        - Checks for new files every {interval} seconds
-        - Downloads any new files to the downloads directory
-        - Keeps track of processed files to avoid duplicates
+        - Reads the Drive change feed every {interval} seconds
+        - Downloads any new files in the folder to the downloads directory,
+          several at a time
+        - Persists the page token and processed file IDs, so a restart
+          resumes without downloading the folder again
 
         Args:
             folder_id (str): ID of the folder to monitor
             interval (int): Time between checks in seconds (default: 60)
+            state (Optional[MonitorState]): Progress store (default: the configured state file)
 
         Raises:
             Exception: If monitoring fails
         """
         self._ensure_authenticated()
-        known_files: Set[str] = set()
+        state = state or MonitorState()
 
         while True:
             try:
-                files = self.list_files(folder_id)
-                for file in files:
-                    if file['id'] not in known_files:
-                        self.logger.info(f"New file detected: {file['name']}")
-                        save_path = os.path.join('downloads', file['name'])
-                        self.download_file(file['id'], save_path)
-                        known_files.add(file['id'])
-                        self.logger.info(f"Downloaded: {file['name']}")
+                self.sync_folder(folder_id, state)
                 time.sleep(interval)
             except Exception as e:
                 self.logger.error(f"Error in monitor loop: {e}")
-                time.sleep(interval)
\ No newline at end of file
+                time.sleep(interval)
+
+
+_shared_service: Optional[GoogleDriveService] = None
+_shared_service_lock = threading.Lock()
+
+def get_drive_service() -> GoogleDriveService:
+    """
+    Return the Google Drive service shared by the whole process.
+
+    All blueprints use this single instance so the user logs in once and
+    the authenticated API client is reused.
+
+    Returns:
+        GoogleDriveService: Shared service instance (login happens on first API call)
+    """
+    global _shared_service
+    if _shared_service is None:
+        from app.utils.config import CREDENTIALS_PATH, TOKEN_PATH
+        with _shared_service_lock:
+            if _shared_service is None:
+                _shared_service = GoogleDriveService(CREDENTIALS_PATH, TOKEN_PATH)
+    return _shared_service
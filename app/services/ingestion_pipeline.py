@@ -0,0 +1,373 @@
+"""
+Drive-to-extraction streaming pipeline.
+
+Turns a monitored Google Drive folder into a hands-off ingestion flow:
+
+    detect -> download -> decode -> ocr -> parse -> sink
+
+Stages are joined by bounded queues, so a slow stage (usually OCR) applies
+backpressure to the ones before it instead of letting work pile up. Each
+stage runs its own configurable number of worker threads and reports
+processed/failed counts, mean latency and the depth of its input queue.
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+from app.services.google_drive_service import is_permanent_error
+from app.services.monitor_state import MonitorState
+from app.services.ocr.image_loader import load_regions
+from app.services.ocr.registry import backend_registry, backend_options
+from app.services.ocr.templates import template_registry
+from app.services.extraction_service import GENAI_PROMPT
+from app.utils.text_parser import parse_ocr_results
+from app.utils.config import (DOWNLOADS_DIR, DEFAULT_TEMPLATE, PIPELINE_QUEUE_SIZE, PIPELINE_CONCURRENCY, PIPELINE_RESULTS_PATH,
+                              PIPELINE_POLL_INTERVAL)
+
+STAGES = ('download', 'decode', 'ocr', 'parse', 'sink')
+
+
+def _is_unreadable(stage: str, error: Exception) -> bool:
+    """
+    Return True if a stage failed on the file's content, which fails the same way on every attempt.
+    """
+    # load_regions raises IOError for files that are not decodable images (e.g. PDFs)
+    return (stage == 'decode' and isinstance(error, OSError)) or stage == 'parse'
+
+
+class _PollBatch:
+    """
+    Files found by one poll and the page token to save once they are handled.
+    """
+
+    def __init__(self, gate: "_TokenGate", sequence: int, next_token: str, file_ids: list):
+        self.gate = gate
+        self.sequence = sequence
+        self.next_token = next_token
+        self.file_ids = file_ids
+        self.remaining = len(file_ids)
+        self.failed = False
+        # Set when a file of an earlier poll failed while this poll skipped it as in flight
+        self.missed_failure = False
+
+    def done(self, success: bool) -> None:
+        self.gate.done(self, success)
+
+
+class _TokenGate:
+    """
+    Orders page token saves across overlapping polls of one folder.
+
+    A poll skips files that are still in flight from earlier polls, so its
+    token may only be saved once every earlier poll has finished too. When a
+    file fails, the polls taken while it was in flight left it out, so none
+    of their tokens is saved; the next poll reads the feed from the old token
+    and finds the file again.
+    """
+
+    def __init__(self, folder_id: str, state: MonitorState):
+        self.folder_id = folder_id
+        self.state = state
+        self._batches = deque()
+        self._next_sequence = 0
+        self._lock = threading.Lock()
+
+    def open(self, next_token: str, file_ids: list) -> _PollBatch:
+        """
+        Register the files of a new poll; call _PollBatch.done() once per file.
+        """
+        with self._lock:
+            batch = _PollBatch(self, self._next_sequence, next_token, file_ids)
+            self._next_sequence += 1
+            self._batches.append(batch)
+            self._advance()
+        return batch
+
+    def done(self, batch: _PollBatch, success: bool) -> None:
+        with self._lock:
+            batch.remaining -= 1
+            if not success and not batch.failed:
+                batch.failed = True
+                for later in self._batches:
+                    if later.sequence > batch.sequence:
+                        later.missed_failure = True
+            self._advance()
+
+    def _advance(self) -> None:
+        # Caller holds the lock, so no poll can start between picking the token and saving it
+        token = None
+        while self._batches and self._batches[0].remaining <= 0:
+            batch = self._batches.popleft()
+            if not batch.failed and not batch.missed_failure:
+                token = batch.next_token
+        if token is not None:
+            keep_ids = [file_id for batch in self._batches for file_id in batch.file_ids]
+            self.state.set_page_token(self.folder_id, token, keep_ids)
+
+
+class _StageStats:
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, success: bool) -> None:
+        with self.lock:
+            if success:
+                self.processed += 1
+            else:
+                self.failed += 1
+            self.busy_seconds += seconds
+
+
+class IngestionPipeline:
+    """
+    Streaming pipeline from a Drive folder to extracted invoice records.
+
+    The sink appends one JSON line per invoice to results_path:
+        {"file_id", "name", "invoice": {...}, "finished_at"} on success, or
+        {"file_id", "name", "error", "stage", "finished_at"} on failure
+
+    Attributes:
+        folder_id (str): ID of the monitored Drive folder
+        backend_name (str): OCR backend used by the 'ocr' stage
+        template (str): Detection template used by the 'decode' stage
+        concurrency (Dict[str, int]): Worker threads per stage
+        results_path (str): JSON lines file receiving the extracted invoices
+    """
+
+    def __init__(self, drive_service, folder_id: str, backend_name: str = 'pytesseract',
+                 genai_api_key: Optional[str] = None, concurrency: Optional[Dict[str, int]] = None,
+                 queue_size: int = PIPELINE_QUEUE_SIZE, results_path: str = PIPELINE_RESULTS_PATH,
+                 interval: int = PIPELINE_POLL_INTERVAL, state: Optional[MonitorState] = None,
+                 template: str = DEFAULT_TEMPLATE):
+        """
+        Build the pipeline; call start() to run it.
+
+        Args:
+            drive_service (GoogleDriveService): Authenticated Drive service
+            folder_id (str): ID of the folder to ingest from
+            backend_name (str): OCR backend to use
+            genai_api_key (Optional[str]): API key, required for 'genai'
+            concurrency (Optional[Dict[str, int]]): Worker threads per stage, overriding the defaults
+            queue_size (int): Capacity of each inter-stage queue
+            results_path (str): JSON lines file receiving the results
+            interval (int): Seconds between polls of the Drive change feed
+            state (Optional[MonitorState]): Progress store (default: the configured state file)
+            template (str): Name of the detection template
+        """
+        self.drive_service = drive_service
+        self.folder_id = folder_id
+        self.backend_name = backend_name
+        self.genai_api_key = genai_api_key
+        self.template = template
+        self.concurrency = {**PIPELINE_CONCURRENCY, **(concurrency or {})}
+        self.results_path = results_path
+        self.interval = interval
+        self.state = state or MonitorState()
+        self.logger = logging.getLogger(__name__)
+
+        self._queues = {stage: queue.Queue(maxsize=queue_size) for stage in STAGES}
+        self._stats = {stage: _StageStats() for stage in STAGES}
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self._token_gate = _TokenGate(folder_id, self.state)
+        self._sink_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.last_poll_at = None
+
+    def start(self, detect: bool = True) -> None:
+        """
+        Start the worker threads of every stage.
+
+        Args:
+            detect (bool): Also start a thread polling the folder every interval seconds;
+                pass False when an external scheduler calls poll_once()
+        """
+        handlers = {
+            'download': self._download,
+            'decode': self._decode,
+            'ocr': self._ocr,
+            'parse': self._parse,
+            'sink': self._sink,
+        }
+        for index, stage in enumerate(STAGES):
+            next_stage = STAGES[index + 1] if index + 1 < len(STAGES) else None
+            for i in range(max(1, self.concurrency.get(stage, 1))):
+                thread = threading.Thread(target=self._run_stage, args=(stage, handlers[stage], next_stage),
+                                          name=f"pipeline-{stage}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+        if detect:
+            thread = threading.Thread(target=self._detect, name="pipeline-detect", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        Ask all stages to stop; items still queued are picked up again after a restart.
+        """
+        self._stop.set()
+        self.state.flush()
+
+    def is_running(self) -> bool:
+        return not self._stop.is_set() and any(thread.is_alive() for thread in self._threads)
+
+    def _put(self, stage: str, item: dict) -> bool:
+        # Block while the next stage is saturated, but give up when stopping
+        while not self._stop.is_set():
+            try:
+                self._queues[stage].put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def poll_once(self) -> int:
+        """
+        Read the change feed once and feed new files into the pipeline.
+
+        Returns:
+            int: Number of files enqueued
+        """
+        files, next_token = self.drive_service.poll_folder(self.folder_id, self.state)
+        self.last_poll_at = time.time()
+        with self._in_flight_lock:
+            files = [file for file in files if file['id'] not in self._in_flight]
+            self._in_flight.update(file['id'] for file in files)
+
+        batch = self._token_gate.open(next_token, [file['id'] for file in files])
+        for file in files:
+            self.logger.info(f"New file detected: {file['name']}")
+            if not self._put('download', {"file": file, "batch": batch, "started_at": time.time()}):
+                break
+        return len(files)
+
+    def _detect(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.logger.error(f"Error polling folder {self.folder_id}: {e}")
+            self._stop.wait(self.interval)
+
+    def _run_stage(self, stage: str, handler, next_stage: Optional[str]) -> None:
+        stats = self._stats[stage]
+        while not self._stop.is_set():
+            try:
+                item = self._queues[stage].get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                handler(item)
+            except Exception as e:
+                stats.record(time.perf_counter() - start, success=False)
+                self._fail(stage, item, e)
+                continue
+
+            stats.record(time.perf_counter() - start, success=True)
+            if next_stage is None:
+                self._finish(item, success=True)
+            elif not self._put(next_stage, item):
+                return
+
+    def _fail(self, stage: str, item: dict, error: Exception) -> None:
+        file = item['file']
+        self.logger.error(f"Pipeline stage '{stage}' failed for {file['name']}: {error}")
+        self._write_record({"file_id": file['id'], "name": file['name'], "error": str(error), "stage": stage})
+        if is_permanent_error(error) or _is_unreadable(stage, error):
+            # Retrying cannot help, so the file must not hold back the page token
+            self.state.mark_failed(self.folder_id, file['id'], str(error))
+            self._finish(item, success=True)
+        else:
+            # Retried on later polls until the state gives up on it
+            given_up = self.state.record_failed_attempt(self.folder_id, file['id'], str(error))
+            self._finish(item, success=given_up)
+
+    def _finish(self, item: dict, success: bool) -> None:
+        # Leave the in-flight set first: a poll racing with this call then includes
+        # the file, and the token gate treats that poll as having missed a failure
+        with self._in_flight_lock:
+            self._in_flight.discard(item['file']['id'])
+        item['batch'].done(success)
+
+    def _download(self, item: dict) -> None:
+        file = item['file']
+        item['path'] = os.path.join(DOWNLOADS_DIR, file['name'])
+        self.drive_service.download_file(file['id'], item['path'], metadata=file)
+
+    def _backend(self):
+        return backend_registry.get(self.backend_name, **backend_options(self.backend_name, self.genai_api_key))
+
+    def _decode(self, item: dict) -> None:
+        template = template_registry.get(self.template)
+        item['regions'], _ = load_regions(item['path'], template.areas, page_steps=template.page_steps)
+        item['area_options'] = template.region_options
+        item['field_mapping'] = template.field_mapping
+
+    def _ocr(self, item: dict) -> None:
+        kwargs = {"prompt": GENAI_PROMPT} if self.backend_name in ('genai', 'cascade') else {}
+        if self.backend_name == 'cascade':
+            kwargs['tier_counts'] = item['tiers'] = {}
+        item['results'] = self._backend().recognize_regions(item.pop('regions'), item['area_options'], **kwargs)
+
+    def _parse(self, item: dict) -> None:
+        item['invoice'] = parse_ocr_results(item.pop('results'), item['field_mapping'])
+
+    def _sink(self, item: dict) -> None:
+        file = item['file']
+        record = {"file_id": file['id'], "name": file['name'], "invoice": item['invoice'],
+                  "latency_seconds": round(time.time() - item['started_at'], 3)}
+        if 'tiers' in item:
+            record['tiers'] = item['tiers']
+        self._write_record(record)
+        self.state.mark_processed(self.folder_id, file['id'])
+
+    def _write_record(self, record: dict) -> None:
+        record["finished_at"] = time.time()
+        with self._sink_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.results_path)), exist_ok=True)
+            with open(self.results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def stats(self) -> dict:
+        """
+        Return per-stage throughput, latency and queue depth.
+
+        Returns:
+            dict: Pipeline settings, last poll time, in-flight count and, per stage,
+                'workers', 'queue_depth', 'processed', 'failed' and 'mean_latency_ms'
+        """
+        stages = {}
+        for stage in STAGES:
+            stats = self._stats[stage]
+            with stats.lock:
+                count = stats.processed + stats.failed
+                stages[stage] = {
+                    "workers": max(1, self.concurrency.get(stage, 1)),
+                    "queue_depth": self._queues[stage].qsize(),
+                    "processed": stats.processed,
+                    "failed": stats.failed,
+                    "mean_latency_ms": round(1000 * stats.busy_seconds / count, 1) if count else None,
+                }
+        with self._in_flight_lock:
+            in_flight = len(self._in_flight)
+        return {
+            "folder_id": self.folder_id,
+            "backend": self.backend_name,
+            "template": self.template,
+            "running": self.is_running(),
+            "last_poll_at": self.last_poll_at,
+            "in_flight": in_flight,
+            "results_path": self.results_path,
+            "stages": stages,
+        }
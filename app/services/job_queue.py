@@ -0,0 +1,154 @@
+"""
+Asynchronous job queue.
+
+Slow extractions (EasyOCR on CPU, multi-call GenAI) are run by a pool of
+background worker threads instead of the Flask request thread. Jobs wait in
+a bounded queue; when it is full, submission fails immediately so callers can
+answer with 429/503 instead of letting latency pile up.
+"""
+import time
+import uuid
+import queue
+import logging
+import threading
+from typing import Callable, Dict, Optional
+from app.utils.config import JOB_QUEUE_SIZE, JOB_WORKERS, JOB_RESULT_TTL
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity.
+    """
+    pass
+
+
+class JobQueue:
+    """
+    Bounded in-process job queue served by a fixed pool of worker threads.
+
+    Job states: 'queued', 'running', 'succeeded', 'failed'. Finished jobs are
+    kept for result_ttl seconds so clients can fetch their results.
+
+    Attributes:
+        max_pending (int): Maximum number of queued (not yet running) jobs
+        workers (int): Number of worker threads
+        result_ttl (int): Seconds finished jobs are kept
+    """
+
+    def __init__(self, max_pending: int = JOB_QUEUE_SIZE, workers: int = JOB_WORKERS,
+                 result_ttl: int = JOB_RESULT_TTL):
+        """
+        Initialize the job queue. Worker threads start on the first submission.
+
+        Args:
+            max_pending (int): Maximum number of queued jobs
+            workers (int): Number of worker threads
+            result_ttl (int): Seconds finished jobs are kept
+        """
+        self.max_pending = max_pending
+        self.workers = max(1, workers)
+        self.result_ttl = result_ttl
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._jobs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._rejected = 0
+
+    def _start_workers(self) -> None:
+        # Caller holds the lock
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ocr-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func: Callable, *args, **kwargs) -> str:
+        """
+        Queue a job.
+
+        Args:
+            func (Callable): Function to run; its return value becomes the job result
+            *args, **kwargs: Arguments passed to func
+
+        Returns:
+            str: Job ID
+
+        Raises:
+            QueueFullError: If the queue is at capacity
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._purge_expired()
+            self._start_workers()
+            try:
+                self._queue.put_nowait((job_id, func, args, kwargs))
+            except queue.Full:
+                self._rejected += 1
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+            self._jobs[job_id] = job
+        return job_id
+
+    def _work(self) -> None:
+        while True:
+            job_id, func, args, kwargs = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job["status"] = "running"
+                    job["started_at"] = time.time()
+            try:
+                result = func(*args, **kwargs)
+                update = {"status": "succeeded", "result": result}
+            except Exception as e:
+                self.logger.error(f"Job {job_id} failed: {e}")
+                update = {"status": "failed", "error": str(e)}
+            finally:
+                self._queue.task_done()
+
+            with self._lock:
+                if job is not None:
+                    job.update(update, finished_at=time.time())
+
+    def _purge_expired(self) -> None:
+        # Caller holds the lock
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Return a snapshot of a job, or None if it is unknown or expired.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self) -> dict:
+        """
+        Return queue depth and job counts by status.
+        """
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {
+                "pending": self._queue.qsize(),
+                "max_pending": self.max_pending,
+                "workers": self.workers,
+                "rejected": self._rejected,
+                "jobs": counts,
+            }
@@ -0,0 +1,244 @@
+"""
+Scheduler for monitoring many Google Drive folders.
+
+Instead of one thread per folder sleeping in an endless loop, a single
+scheduler thread hands due polls to a shared pool of worker threads. Each
+folder's polling interval adapts to its activity: it halves while new
+files keep arriving and doubles while the folder is idle, within
+configured bounds. Monitors can be listed, paused, resumed and stopped.
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from app.services.monitor_state import MonitorState
+from app.utils.config import MONITOR_WORKERS, MONITOR_INTERVAL, MONITOR_MIN_INTERVAL, MONITOR_MAX_INTERVAL
+
+
+class MonitorScheduler:
+    """
+    Polls many Drive folders from a shared worker pool.
+
+    A monitor either downloads new files ('download' mode) or feeds them to
+    an IngestionPipeline ('pipeline' mode). Monitor states: 'active',
+    'paused'; stopped monitors are removed.
+
+    Attributes:
+        drive_service (GoogleDriveService): Shared Drive service
+        workers (int): Number of threads running polls
+        min_interval (float): Shortest polling interval in seconds
+        max_interval (float): Longest polling interval in seconds
+    """
+
+    def __init__(self, drive_service, workers: int = MONITOR_WORKERS, min_interval: float = MONITOR_MIN_INTERVAL,
+                 max_interval: float = MONITOR_MAX_INTERVAL, state: Optional[MonitorState] = None):
+        """
+        Initialize the scheduler. Its threads start with the first monitor.
+
+        Args:
+            drive_service (GoogleDriveService): Shared Drive service
+            workers (int): Number of threads running polls
+            min_interval (float): Shortest polling interval in seconds
+            max_interval (float): Longest polling interval in seconds
+            state (Optional[MonitorState]): Progress store (default: the configured state file)
+        """
+        self.drive_service = drive_service
+        self.workers = max(1, workers)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.state = state or MonitorState()
+        self.logger = logging.getLogger(__name__)
+
+        self._monitors: Dict[str, dict] = {}
+        self._wakeup = threading.Condition()
+        self._executor = None
+        self._thread = None
+
+    def _start(self) -> None:
+        # Caller holds the condition
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="drive-monitor")
+            self._thread = threading.Thread(target=self._run, name="drive-monitor-scheduler", daemon=True)
+            self._thread.start()
+
+    def add(self, folder_id: str, folder_name: Optional[str] = None, pipeline=None,
+            interval: float = MONITOR_INTERVAL) -> dict:
+        """
+        Start monitoring a folder; the first poll runs immediately.
+
+        Args:
+            folder_id (str): ID of the folder to monitor
+            folder_name (Optional[str]): Display name of the folder
+            pipeline (Optional[IngestionPipeline]): Pipeline receiving new files;
+                without one, new files are only downloaded
+            interval (float): Initial polling interval in seconds
+
+        Returns:
+            dict: Snapshot of the new monitor
+
+        Raises:
+            ValueError: If the folder is already monitored
+        """
+        return self.add_many([(folder_id, folder_name, pipeline)], interval=interval)[0]
+
+    def add_many(self, folders: List[tuple], interval: float = MONITOR_INTERVAL) -> List[dict]:
+        """
+        Start monitoring several folders at once; either all of them are added or none.
+
+        Args:
+            folders (List[tuple]): (folder_id, folder_name, pipeline) per folder, as for add()
+            interval (float): Initial polling interval in seconds
+
+        Returns:
+            List[dict]: Snapshots of the new monitors, in input order
+
+        Raises:
+            ValueError: If a folder is already monitored or listed twice
+        """
+        with self._wakeup:
+            seen = set()
+            for folder_id, folder_name, _ in folders:
+                if folder_id in self._monitors or folder_id in seen:
+                    raise ValueError(f"Folder '{folder_name or folder_id}' is already monitored")
+                seen.add(folder_id)
+
+            for folder_id, folder_name, pipeline in folders:
+                if pipeline is not None:
+                    pipeline.start(detect=False)
+                self._monitors[folder_id] = {
+                    "folder_id": folder_id,
+                    "folder_name": folder_name,
+                    "mode": "pipeline" if pipeline is not None else "download",
+                    "status": "active",
+                    "pipeline": pipeline,
+                    "interval": min(max(interval, self.min_interval), self.max_interval),
+                    "next_poll_at": time.time(),
+                    "polling": False,
+                    "polls": 0,
+                    "files": 0,
+                    "errors": 0,
+                    "last_poll_at": None,
+                    "last_poll_seconds": None,
+                    "last_poll_files": None,
+                    "last_error": None,
+                }
+            self._start()
+            self._wakeup.notify()
+            return [self._snapshot(self._monitors[folder_id]) for folder_id, _, _ in folders]
+
+    def pause(self, folder_id: str) -> dict:
+        """
+        Stop polling a folder until it is resumed.
+
+        Raises:
+            KeyError: If the folder is not monitored
+        """
+        with self._wakeup:
+            monitor = self._monitors[folder_id]
+            monitor["status"] = "paused"
+            return self._snapshot(monitor)
+
+    def resume(self, folder_id: str) -> dict:
+        """
+        Resume a paused monitor; it polls immediately.
+
+        Raises:
+            KeyError: If the folder is not monitored
+        """
+        with self._wakeup:
+            monitor = self._monitors[folder_id]
+            monitor["status"] = "active"
+            monitor["next_poll_at"] = time.time()
+            self._wakeup.notify()
+            return self._snapshot(monitor)
+
+    def stop(self, folder_id: str) -> dict:
+        """
+        Stop and remove a monitor. A poll already running finishes first.
+
+        Raises:
+            KeyError: If the folder is not monitored
+        """
+        with self._wakeup:
+            monitor = self._monitors.pop(folder_id)
+            monitor["status"] = "stopped"
+        if monitor["pipeline"] is not None:
+            monitor["pipeline"].stop()
+        self.state.flush()
+        return self._snapshot(monitor)
+
+    def get(self, folder_id: str) -> Optional[dict]:
+        """
+        Return a snapshot of one monitor, or None if the folder is not monitored.
+        """
+        with self._wakeup:
+            monitor = self._monitors.get(folder_id)
+            return self._snapshot(monitor) if monitor is not None else None
+
+    def list(self) -> List[dict]:
+        """
+        Return snapshots of all monitors.
+        """
+        with self._wakeup:
+            return [self._snapshot(monitor) for monitor in self._monitors.values()]
+
+    def _snapshot(self, monitor: dict) -> dict:
+        snapshot = {key: value for key, value in monitor.items() if key != "pipeline"}
+        if monitor["pipeline"] is not None:
+            snapshot["pipeline"] = monitor["pipeline"].stats()
+        return snapshot
+
+    def _run(self) -> None:
+        while True:
+            with self._wakeup:
+                now = time.time()
+                due = [monitor for monitor in self._monitors.values()
+                       if monitor["status"] == "active" and not monitor["polling"] and monitor["next_poll_at"] <= now]
+                for monitor in due:
+                    monitor["polling"] = True
+                    self._executor.submit(self._poll, monitor)
+
+                waiting = [monitor["next_poll_at"] for monitor in self._monitors.values()
+                           if monitor["status"] == "active" and not monitor["polling"]]
+                # Finished polls and new monitors notify the condition
+                self._wakeup.wait(timeout=max(0.0, min(waiting) - now) if waiting else None)
+
+    def _poll(self, monitor: dict) -> None:
+        folder_id = monitor["folder_id"]
+        started_at = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            if monitor["pipeline"] is not None:
+                found = monitor["pipeline"].poll_once()
+            else:
+                found = self.drive_service.sync_folder(folder_id, self.state)
+        except Exception as e:
+            self.logger.error(f"Error polling folder {folder_id}: {e}")
+            found, error = 0, str(e)
+        elapsed = time.perf_counter() - start
+
+        with self._wakeup:
+            # Poll more often while files are arriving, back off while the folder is idle
+            if found:
+                interval = max(self.min_interval, monitor["interval"] / 2)
+            else:
+                interval = min(self.max_interval, monitor["interval"] * 2)
+            next_poll_at = time.time() + interval
+            if monitor["next_poll_at"] > started_at:
+                # resume() during the poll asked for the next one to run right away
+                next_poll_at = monitor["next_poll_at"]
+            monitor.update(
+                polling=False,
+                interval=interval,
+                next_poll_at=next_poll_at,
+                polls=monitor["polls"] + 1,
+                files=monitor["files"] + found,
+                errors=monitor["errors"] + (error is not None),
+                last_poll_at=time.time(),
+                last_poll_seconds=round(elapsed, 3),
+                last_poll_files=found,
+                last_error=error if error is not None else monitor["last_error"],
+            )
+            self._wakeup.notify()
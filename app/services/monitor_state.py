@@ -0,0 +1,202 @@
+"""
+Persistent state for Google Drive folder monitoring.
+
+Stores, per monitored folder, the Drive changes page token, the IDs of
+files already processed and of files that failed permanently (e.g. a 403
+or 404 on download), so a restarted monitor resumes from where it stopped
+instead of downloading the whole folder again.
+
+A file failing with an error that may go away is tried again on later
+polls, up to max_attempts times; it is then recorded as failed, so it
+cannot hold back the page token forever.
+
+File IDs are only needed until the page token moves past them, so they
+are dropped whenever a token is saved. Recording a file does not rewrite
+the file every time: the state is saved with each page token, and at
+most every save_interval seconds in between.
+"""
+import os
+import json
+import logging
+import time
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional, Set
+from app.utils.config import MONITOR_STATE_PATH, MONITOR_STATE_SAVE_INTERVAL, MONITOR_MAX_ATTEMPTS
+
+
+class MonitorState:
+    """
+    Thread-safe JSON file holding monitor progress per folder.
+
+    File format:
+        {
+            "<folder_id>": {
+                "page_token": "<changes page token>",
+                "processed_ids": ["<file_id>", ...],
+                "failed": {"<file_id>": "<error>", ...},
+                "attempts": {"<file_id>": <failed attempts>, ...}
+            },
+            ...
+        }
+
+    Attributes:
+        path (str): Location of the state file
+        save_interval (float): Minimum seconds between saves triggered by recorded files
+        max_attempts (int): Failed attempts after which a file is recorded as failed
+    """
+
+    def __init__(self, path: str = MONITOR_STATE_PATH, save_interval: float = MONITOR_STATE_SAVE_INTERVAL,
+                 max_attempts: int = MONITOR_MAX_ATTEMPTS):
+        """
+        Load the state file if it exists.
+
+        Args:
+            path (str): Location of the state file
+            save_interval (float): Minimum seconds between saves triggered by recorded files
+            max_attempts (int): Failed attempts after which a file is recorded as failed
+        """
+        self.path = path
+        self.save_interval = save_interval
+        self.max_attempts = max(1, max_attempts)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._folders: Dict[str, dict] = {}
+        self._processed: Dict[str, Set[str]] = {}
+        self._failed: Dict[str, Dict[str, str]] = {}
+        self._attempts: Dict[str, Dict[str, int]] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for folder_id, folder in data.items():
+                    self._folders[folder_id] = {"page_token": folder.get("page_token")}
+                    self._processed[folder_id] = set(folder.get("processed_ids", []))
+                    self._failed[folder_id] = dict(folder.get("failed", {}))
+                    self._attempts[folder_id] = dict(folder.get("attempts", {}))
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Ignoring unreadable monitor state {path}: {e}")
+
+    def get_page_token(self, folder_id: str) -> Optional[str]:
+        """
+        Return the saved changes page token of a folder, if any.
+        """
+        with self._lock:
+            return self._folders.get(folder_id, {}).get("page_token")
+
+    def set_page_token(self, folder_id: str, page_token: str, keep_ids: Iterable[str] = ()) -> None:
+        """
+        Save the changes page token of a folder.
+
+        The change feed never returns files from before the saved token
+        again, so the processed and failed IDs of the folder are dropped.
+
+        Args:
+            folder_id (str): ID of the monitored folder
+            page_token (str): Token to resume the change feed from
+            keep_ids (Iterable[str]): IDs to keep, from polls newer than the token that are still in progress
+        """
+        keep_ids = set(keep_ids)
+        with self._lock:
+            self._folders.setdefault(folder_id, {})["page_token"] = page_token
+            self._processed[folder_id] = self._processed.get(folder_id, set()) & keep_ids
+            self._failed[folder_id] = {file_id: error for file_id, error in self._failed.get(folder_id, {}).items()
+                                       if file_id in keep_ids}
+            self._save()
+
+    def is_processed(self, folder_id: str, file_id: str) -> bool:
+        """
+        Return True if the file was already processed for this folder.
+        """
+        with self._lock:
+            return file_id in self._processed.get(folder_id, ())
+
+    def mark_processed(self, folder_id: str, file_id: str) -> None:
+        """
+        Record a processed file; it is saved with the next page token or within save_interval.
+        """
+        with self._lock:
+            self._folders.setdefault(folder_id, {"page_token": None})
+            self._processed.setdefault(folder_id, set()).add(file_id)
+            self._attempts.get(folder_id, {}).pop(file_id, None)
+            self._save_if_due()
+
+    def is_failed(self, folder_id: str, file_id: str) -> bool:
+        """
+        Return True if the file failed permanently for this folder.
+        """
+        with self._lock:
+            return file_id in self._failed.get(folder_id, {})
+
+    def mark_failed(self, folder_id: str, file_id: str, error: str) -> None:
+        """
+        Record a file that cannot be processed, so it no longer holds back the page token.
+        """
+        with self._lock:
+            self._folders.setdefault(folder_id, {"page_token": None})
+            self._failed.setdefault(folder_id, {})[file_id] = error
+            self._attempts.get(folder_id, {}).pop(file_id, None)
+            self._save_if_due()
+
+    def record_failed_attempt(self, folder_id: str, file_id: str, error: str) -> bool:
+        """
+        Count a failed attempt at a file, recording it as failed after max_attempts.
+
+        Attempts are kept until the file is processed or failed, even when a
+        page token is saved, since a failing file holds the token back.
+
+        Returns:
+            bool: True if the file has now been recorded as failed
+        """
+        with self._lock:
+            self._folders.setdefault(folder_id, {"page_token": None})
+            attempts = self._attempts.setdefault(folder_id, {})
+            attempts[file_id] = attempts.get(file_id, 0) + 1
+            given_up = attempts[file_id] >= self.max_attempts
+            if given_up:
+                del attempts[file_id]
+                self._failed.setdefault(folder_id, {})[file_id] = f"Gave up after {self.max_attempts} attempts: {error}"
+            self._save_if_due()
+            return given_up
+
+    def flush(self) -> None:
+        """
+        Save recorded files that have not been written yet.
+        """
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save_if_due(self) -> None:
+        # Caller holds the lock
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self._save()
+
+    def _save(self) -> None:
+        # Caller holds the lock; write to a temporary file and rename so the state is never half-written
+        data = {
+            folder_id: {
+                "page_token": folder.get("page_token"),
+                "processed_ids": sorted(self._processed.get(folder_id, ())),
+                "failed": self._failed.get(folder_id, {}),
+                "attempts": self._attempts.get(folder_id, {}),
+            }
+            for folder_id, folder in self._folders.items()
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        except OSError as e:
+            self.logger.error(f"Failed to save monitor state {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
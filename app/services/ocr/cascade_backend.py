@@ -0,0 +1,142 @@
+"""
+Cascade of OCR engines with per-field escalation.
+
+Most invoice fields are read correctly by the cheapest engine. The cascade
+runs the first tier (Tesseract by default) on every area, checks each
+field, and re-runs only the doubtful areas on the next tier up (EasyOCR,
+then GenAI when an API key is given). A field is doubtful when:
+
+- the engine's confidence is below the minimum confidence,
+- its text does not match the field's format (see field_formats.py), or
+- it is empty and the area is not marked 'optional: true' in the template.
+
+The answer of the last tier is always accepted. Callers can pass a
+'tier_counts' dict to extract_text() to learn how many fields each tier
+handled for their request.
+"""
+import logging
+import threading
+import cv2
+from app.services.ocr.field_formats import field_format, matches_format
+from app.services.ocr.ocr_interface import OCRInterface
+from app.services.ocr.registry import OCR_BACKENDS, backend_registry, backend_options
+from app.utils.config import CASCADE_TIERS, CASCADE_MIN_CONFIDENCE
+from app.utils.text_parser import AREA_MAPPING
+
+
+class CascadeOCRBackend(OCRInterface):
+    """
+    OCR backend escalating doubtful fields through a list of engines.
+
+    The tier backends come from the backend registry, so they share their
+    engines, region caches and GenAI clients with direct requests; the
+    cascade itself keeps no region cache.
+
+    Attributes:
+        tiers (list): Backend names, cheapest first
+        min_confidence (float): Lowest engine confidence accepted without escalation
+    """
+
+    def __init__(self, api_key=None, tiers=CASCADE_TIERS, min_confidence=CASCADE_MIN_CONFIDENCE):
+        """
+        Configure the tiers.
+
+        Args:
+            api_key (str, optional): GenAI API key; the 'genai' tier is skipped without one
+            tiers (list): Backend names, cheapest first
+            min_confidence (float): Lowest engine confidence (0-1) accepted without escalation
+
+        Raises:
+            ValueError: If no usable tier remains or a tier is not a known backend
+        """
+        super().__init__(region_cache_size=0)
+        unknown = [tier for tier in tiers if tier not in OCR_BACKENDS or tier == 'cascade']
+        if unknown:
+            raise ValueError(f"Unknown cascade tier(s): {', '.join(unknown)}")
+        self.tiers = [tier for tier in tiers if tier != 'genai' or api_key]
+        if not self.tiers:
+            raise ValueError("The cascade backend needs at least one tier")
+        self.api_key = api_key
+        self.min_confidence = min_confidence
+        self._fields_per_tier = dict.fromkeys(self.tiers, 0)
+        self._requests = 0
+        self._lock = threading.Lock()
+        logging.info(f"Cascade backend with tiers {' -> '.join(self.tiers)}")
+
+    def _tier(self, name):
+        return backend_registry.get(name, **backend_options(name, self.api_key))
+
+    def preprocess_image(self, image):
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    def recognize(self, image, area_name, **kwargs):
+        return self._tier(self.tiers[0]).recognize(image, area_name, **kwargs)
+
+    def _is_doubtful(self, text, confidence, options, area_name):
+        if not text:
+            return not options.get('optional', False)
+        if confidence is not None and confidence < self.min_confidence:
+            return True
+        return not matches_format(text, field_format(options, options.get('field', AREA_MAPPING.get(area_name))))
+
+    def _recognize_region_sets(self, region_sets, area_options=None, with_confidence=False, tier_counts=None,
+                               **kwargs):
+        """
+        Recognize the regions of one or more images, escalating doubtful fields tier by tier.
+
+        Args:
+            region_sets (list): Region images per image, [{'area_name': numpy.ndarray}, ...]
+            area_options (dict, optional): Template options per area (see Template.region_options)
+            with_confidence (bool): Return (text, confidence) pairs instead of text
+            tier_counts (dict, optional): Receives the number of fields accepted from each tier
+            **kwargs: Backend specific options passed to every tier
+
+        Returns:
+            list: Recognized text (or (text, confidence) pairs) per area for each
+                region set, in input order
+        """
+        area_options = area_options or {}
+        results = [dict.fromkeys(regions) for regions in region_sets]
+        pending = [(index, area_name) for index, regions in enumerate(region_sets) for area_name in regions]
+        counts = dict.fromkeys(self.tiers, 0)
+
+        for position, tier in enumerate(self.tiers):
+            last = position == len(self.tiers) - 1
+            subsets = {}
+            for index, area_name in pending:
+                subsets.setdefault(index, {})[area_name] = region_sets[index][area_name]
+            indexes = list(subsets)
+            outputs = self._tier(tier)._recognize_region_sets([subsets[index] for index in indexes], area_options,
+                                                              with_confidence=True, **kwargs)
+
+            doubtful = []
+            for index, output in zip(indexes, outputs):
+                for area_name, (text, confidence) in output.items():
+                    if not last and self._is_doubtful(text, confidence, area_options.get(area_name, {}), area_name):
+                        doubtful.append((index, area_name))
+                        continue
+                    results[index][area_name] = (text, confidence) if with_confidence else text
+                    counts[tier] += 1
+            pending = doubtful
+            if not pending:
+                break
+
+        with self._lock:
+            self._requests += len(region_sets)
+            for tier, count in counts.items():
+                self._fields_per_tier[tier] += count
+        if tier_counts is not None:
+            for tier, count in counts.items():
+                tier_counts[tier] = tier_counts.get(tier, 0) + count
+        return results
+
+    def stats(self):
+        """
+        Return how many fields each tier has handled since start-up.
+
+        Returns:
+            dict: {'tiers', 'min_confidence', 'images', 'fields_per_tier'}
+        """
+        with self._lock:
+            return {"tiers": list(self.tiers), "min_confidence": self.min_confidence, "images": self._requests,
+                    "fields_per_tier": dict(self._fields_per_tier)}
@@ -2,9 +2,69 @@ from app.services.ocr.ocr_interface import OCRInterface
 import os
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
 import cv2
-import yaml
+import math
+import numpy as np
+import torch
 import easyocr
+from easyocr.recognition import get_text
 import logging
+from app.utils.config import (EASYOCR_MODE, EASYOCR_SPLIT_LINES, EASYOCR_BATCH_SIZE, EASYOCR_WIDTH_BUCKET,
+                              EASYOCR_INTRA_OP_THREADS, EASYOCR_INTER_OP_THREADS, EASYOCR_QUANTIZE)
+
+def configure_torch_threads(intra_op_threads=0, inter_op_threads=0):
+    """
+    Limit the CPU threads torch uses, so several workers on one host do not oversubscribe cores.
+
+    Torch thread settings are process-wide. The inter-op pool can only be
+    sized before torch runs its first parallel operation; later attempts
+    are logged and ignored.
+
+    Args:
+        intra_op_threads (int): Threads used inside one operator (0 keeps the torch default)
+        inter_op_threads (int): Threads used to run independent operators (0 keeps the torch default)
+    """
+    if intra_op_threads > 0:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads > 0 and torch.get_num_interop_threads() != inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            logging.warning(f"Could not set torch inter-op threads to {inter_op_threads}: {e}")
+
+def split_text_lines(image, min_gap=2, padding=2):
+    """
+    Split a grayscale region into text line boxes with a row projection profile.
+
+    Args:
+        image (numpy.ndarray): Grayscale region, dark text on a light background
+        min_gap (int): Minimum number of blank rows separating two lines
+        padding (int): Rows added above and below each line
+
+    Returns:
+        list: Boxes in EasyOCR horizontal_list format, [[x_min, x_max, y_min, y_max], ...]
+    """
+    height, width = image.shape[:2]
+    _, ink = cv2.threshold(image, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    rows = np.flatnonzero(ink.sum(axis=1) > 0)
+    if rows.size == 0:
+        return [[0, width, 0, height]]
+
+    # Start a new line wherever consecutive ink rows are separated by a large enough gap
+    breaks = np.flatnonzero(np.diff(rows) > min_gap)
+    starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+    ends = np.concatenate((rows[breaks], [rows[-1]]))
+    return [[0, width, max(0, int(start) - padding), min(height, int(end) + 1 + padding)]
+            for start, end in zip(starts, ends)]
+
+
+def _join_predictions(predictions):
+    """
+    Join (text, confidence) line predictions into the text of a region and its mean confidence.
+    """
+    if not predictions:
+        return "", 0.0
+    return " ".join(text for text, _ in predictions), float(sum(conf for _, conf in predictions) / len(predictions))
+
 
 class EasyOCRBackend(OCRInterface):
     """
@@ -16,40 +76,150 @@ class EasyOCRBackend(OCRInterface):
     - Performs region-based text detection
     - Optimized for accuracy over speed
     
+    Modes:
+    - 'detect': run the text detector on every region (readtext)
+    - 'recognize': treat each region as a known text box and send it straight
+      to the recognizer, optionally split into lines by a projection profile;
+      the detector model is not loaded at all
+
+    In 'recognize' mode with batch_size > 1, all lines of all pending regions
+    (of one invoice, or of several via extract_text_many()) are resized to
+    the recognizer's input height, grouped into width buckets to limit
+    padding, and run through the recognizer in shared batches.
+
+    Regions are not spread over the shared region executor: every torch
+    operator already runs on the intra-op thread pool, so recognizing
+    regions in parallel would only multiply the threads competing for the
+    same cores. Regions not batched are recognized one by one.
+
     Note:
         Initializes without GPU support by default
         Uses DBNet as the text detector
+        With quantize=True (EasyOCR's default) the CPU models are converted
+        to dynamically quantized int8; set it to False for fp32 weights
     """
-    def __init__(self):
-        self.reader = easyocr.Reader(['en', 'ar'], gpu=False, detector='dbnet')
+    # The recognizer reads lines scaled to a 64px input height
+    TARGET_TEXT_HEIGHT = 64
 
-    def load_detection_areas(self, yaml_path='detection_areas.yaml'):
-        with open(yaml_path, 'r') as f:
-            areas = yaml.safe_load(f)
-        return areas
+    def __init__(self, mode=EASYOCR_MODE, split_lines=EASYOCR_SPLIT_LINES, batch_size=EASYOCR_BATCH_SIZE,
+                 width_bucket=EASYOCR_WIDTH_BUCKET, intra_op_threads=EASYOCR_INTRA_OP_THREADS,
+                 inter_op_threads=EASYOCR_INTER_OP_THREADS, quantize=EASYOCR_QUANTIZE):
+        super().__init__()
+        configure_torch_threads(intra_op_threads, inter_op_threads)
+        if mode not in ('detect', 'recognize'):
+            raise ValueError(f"Unknown EasyOCR mode '{mode}'")
+        self.mode = mode
+        self.split_lines = split_lines
+        self.batch_size = max(1, batch_size)
+        self.width_bucket = max(1, width_bucket)
+        self.quantize = quantize
+        self.reader = easyocr.Reader(['en', 'ar'], gpu=False, detector='dbnet' if mode == 'detect' else False,
+                                     quantize=quantize)
 
     def preprocess_image(self, image):
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # Enhance contrast here if needed
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        # Contrast and binarization steps are set per template (see preprocessing.py)
         return gray
 
-    def perform_ocr(self, image_path, detection_areas=None, output_file='detected_text.txt'):
-        image = cv2.imread(image_path)
-        if detection_areas is None:
-            detection_areas = self.load_detection_areas()
+    def _line_boxes(self, image):
+        height, width = image.shape[:2]
+        return split_text_lines(image) if self.split_lines else [[0, width, 0, height]]
 
-        try:
-            with open(output_file, "w", encoding="utf-8") as file:
-                for area_name, area in detection_areas.items():
-                    x, y, w, h = area
-                    roi = image[y:y+h, x:x+w]
-                    preprocessed_roi = self.preprocess_image(roi)
-                    enlarged_roi = cv2.resize(preprocessed_roi, None, fx=3, fy=3, interpolation=cv2.INTER_LANCZOS4)
-
-                    result = self.reader.readtext(enlarged_roi, detail=0)
-                    text = " ".join(result)
-                    file.write(f"Text in {area_name}: {text.strip()}\n")
-                    file.write("-" * 50 + "\n")
-            logging.info(f"Detected text saved to: {output_file}")
-        except IOError as e:
-            logging.error(f"Error saving file: {e}")
\ No newline at end of file
+    def recognize(self, image, area_name, profile=None, **kwargs):
+        allowlist = profile.whitelist if profile is not None else None
+        if self.mode == 'recognize':
+            result = self.reader.recognize(image, horizontal_list=self._line_boxes(image), free_list=[], detail=0,
+                                           allowlist=allowlist)
+        else:
+            result = self.reader.readtext(image, detail=0, allowlist=allowlist)
+        return " ".join(result)
+
+    def recognize_with_confidence(self, image, area_name, profile=None, **kwargs):
+        """
+        Recognize a region and report the mean confidence of its lines.
+
+        Returns:
+            tuple: Recognized text and its confidence between 0 and 1 (0 when nothing was read)
+        """
+        allowlist = profile.whitelist if profile is not None else None
+        if self.mode == 'recognize':
+            result = self.reader.recognize(image, horizontal_list=self._line_boxes(image), free_list=[], detail=1,
+                                           allowlist=allowlist)
+        else:
+            result = self.reader.readtext(image, detail=1, allowlist=allowlist)
+        return _join_predictions([(text, conf) for _, text, conf in result])
+
+    def recognize_many_with_confidence(self, images, profiles=None, **kwargs):
+        """
+        Recognize several regions in shared recognizer batches, with the mean confidence of each.
+
+        Args:
+            images (list): (area_name, image) pairs ready for recognition
+            profiles (list, optional): RecognitionProfile or None for each pair
+
+        Returns:
+            list: (text, confidence) for each pair, in input order
+        """
+        profiles = profiles or [None] * len(images)
+        if self.mode != 'recognize' or self.batch_size == 1:
+            # Torch parallelizes inside each region (see the class docstring)
+            return [self.recognize_with_confidence(image, area_name, profile=profile)
+                    for (area_name, image), profile in zip(images, profiles)]
+        return self._recognize_batched(images, profiles)
+
+    def recognize_many(self, images, profiles=None, **kwargs):
+        """
+        Recognize several regions in shared recognizer batches.
+
+        Falls back to one recognize() call per region, one after the other, in
+        'detect' mode or when batch_size is 1. Lines of regions with different
+        character whitelists are batched separately.
+
+        Args:
+            images (list): (area_name, image) pairs ready for recognition
+            profiles (list, optional): RecognitionProfile or None for each pair
+
+        Returns:
+            list: Recognized text for each pair, in input order
+        """
+        profiles = profiles or [None] * len(images)
+        if self.mode != 'recognize' or self.batch_size == 1:
+            return [self.recognize(image, area_name, profile=profile)
+                    for (area_name, image), profile in zip(images, profiles)]
+        return [text for text, _ in self._recognize_batched(images, profiles)]
+
+    def _recognize_batched(self, images, profiles):
+        """
+        Run the line crops of all regions through the recognizer in width-bucketed batches.
+
+        Returns:
+            list: (text, confidence) for each pair, in input order
+        """
+        model_height = getattr(self.reader, 'imgH', 64)
+
+        # Cut every region into line crops resized to the recognizer height,
+        # remembering which region each line belongs to
+        buckets = {}
+        for index, ((_, image), profile) in enumerate(zip(images, profiles)):
+            whitelist = profile.whitelist if profile is not None else None
+            for line, (x_min, x_max, y_min, y_max) in enumerate(self._line_boxes(image)):
+                crop = image[y_min:y_max, x_min:x_max]
+                if crop.size == 0:
+                    continue
+                width = max(1, math.ceil(model_height * crop.shape[1] / crop.shape[0]))
+                crop = cv2.resize(crop, (width, model_height), interpolation=cv2.INTER_LINEAR)
+                bucket_width = math.ceil(width / self.width_bucket) * self.width_bucket
+                buckets.setdefault((bucket_width, whitelist), []).append(((index, line), crop))
+
+        lines = [dict() for _ in images]
+        for (bucket_width, whitelist), crops in buckets.items():
+            ignore_char = ''.join(set(self.reader.character) - set(whitelist or self.reader.lang_char))
+            # get_text keeps the input order, so results line up with the crops
+            predictions = get_text(self.reader.character, model_height, bucket_width, self.reader.recognizer,
+                                   self.reader.converter, crops, ignore_char, batch_size=self.batch_size,
+                                   workers=0, device=self.reader.device)
+            for ((index, line), _), (_, text, conf) in zip(crops, predictions):
+                lines[index][line] = (text, conf)
+
+        return [_join_predictions([prediction for _, prediction in sorted(region_lines.items())])
+                for region_lines in lines]
@@ -0,0 +1,72 @@
+"""
+Expected formats of invoice fields.
+
+The cascade backend (see cascade_backend.py) checks the text read for an
+area against the format of its field and sends the area to the next
+engine when it does not match. A template sets the format per area,
+either by name or as a regular expression:
+
+    areas:
+      area_1: {box: [...], field: invoice_number, format: invoice_number}
+      area_5: {box: [...], field: vat_id, format: '\\d{15}'}
+
+Areas without a 'format' use DEFAULT_FIELD_FORMATS for their field, if
+any. Patterns must match the whole text (whitespace trimmed); '\\d' also
+matches Arabic-Indic digits.
+"""
+import re
+
+FORMATS = {
+    'digits': r'\d+',
+    'date': r'\d{1,4}[/.-]\d{1,2}[/.-]\d{1,4}',
+    'amount': r'\d{1,3}(?:[,٬]?\d{3})*(?:[.٫]\d{1,3})?',
+    'invoice_number': r'[A-Za-z0-9\d/#-]*\d[A-Za-z0-9\d/#-]*',
+}
+
+# Format of the default invoice fields (text_parser.AREA_MAPPING)
+DEFAULT_FIELD_FORMATS = {
+    'invoice_number': 'invoice_number',
+    'date': 'date',
+    'second_product_amount': 'amount',
+    'total_amount': 'amount',
+}
+
+
+def compile_format(value):
+    """
+    Compile a template 'format' option.
+
+    Args:
+        value (str): Name from FORMATS or a regular expression
+
+    Returns:
+        re.Pattern: Pattern matched against the whole text
+
+    Raises:
+        ValueError: If the format is not a string or not a valid regular expression
+    """
+    if not isinstance(value, str) or not value:
+        raise ValueError("'format' must be a format name or a regular expression")
+    try:
+        return re.compile(FORMATS.get(value, value))
+    except re.error as e:
+        raise ValueError(f"Invalid 'format' pattern '{value}': {e}")
+
+
+def field_format(options, field=None):
+    """
+    Return the pattern an area's text must match, or None when it is unchecked.
+
+    Args:
+        options (dict): Region options of the area (see Template.region_options)
+        field (str, optional): Invoice field the area fills
+    """
+    value = options.get('format') or DEFAULT_FIELD_FORMATS.get(field)
+    return compile_format(value) if value else None
+
+
+def matches_format(text, pattern) -> bool:
+    """
+    Return True if the whole text matches the pattern (or there is no pattern).
+    """
+    return pattern is None or pattern.fullmatch(" ".join(text.split())) is not None
@@ -1,9 +1,277 @@
 from app.services.ocr.ocr_interface import OCRInterface
-import os
 import cv2
-import yaml
-import google.generativeai as genai
+import json
+import time
+import random
+import threading
+import numpy as np
+from google.ai import generativelanguage as glm
+from google.generativeai.types import content_types, generation_types
+from google.api_core import exceptions as google_exceptions
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import logging
+from app.utils.config import (GENAI_MODE, GENAI_MAX_CONCURRENCY, GENAI_REQUESTS_PER_SECOND, GENAI_BURST,
+                              GENAI_MAX_RETRIES, GENAI_BACKOFF_BASE, GENAI_BACKOFF_MAX)
+
+MODEL_NAME = "gemini-exp-1121"
+
+SINGLE_CALL_PROMPT = (
+    "This image is a composite of {count} regions cropped from one invoice. "
+    "Each region is shown under a white band holding its label. {prompt}\n"
+    "Reply with a single JSON object whose keys are exactly these labels: {labels}. "
+    "Each value must be the text of the region under that label, or an empty string if it is blank."
+)
+
+# Errors worth retrying: throttling and transient server-side failures
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+class GenAIRequestError(Exception):
+    """
+    Raised when a GenAI request fails after all retries.
+    """
+    pass
+
+class KeyedGenerativeModel:
+    """
+    GenerativeModel equivalent bound to a single API key.
+
+    genai.configure() sets one key for the whole process, so backends
+    created with different keys would send each other's requests with the
+    wrong key. This model owns a GenerativeServiceClient created with its
+    own key instead; the client, and its connection, are reused for every call.
+
+    Attributes:
+        model_name (str): Full model resource name, e.g. 'models/gemini-exp-1121'
+    """
+    def __init__(self, api_key, model_name=MODEL_NAME, transport=None, api_endpoint=None):
+        """
+        Args:
+            api_key (str): API key sent with every request
+            model_name (str): Model name, with or without the 'models/' prefix
+            transport (optional): Client transport name or factory (default: gRPC)
+            api_endpoint (str, optional): Host to send requests to (default: the public API)
+        """
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        client_options = {"api_key": api_key}
+        if api_endpoint:
+            client_options["api_endpoint"] = api_endpoint
+        self._client = glm.GenerativeServiceClient(transport=transport, client_options=client_options)
+
+    def generate_content(self, contents, generation_config=None):
+        """
+        Generate content, like GenerativeModel.generate_content.
+
+        Args:
+            contents (list): Content parts (inline image blobs and text)
+            generation_config (dict, optional): Generation settings, e.g. response_mime_type
+
+        Returns:
+            GenerateContentResponse: Model response
+        """
+        request = glm.GenerateContentRequest(
+            model=self.model_name,
+            contents=content_types.to_contents(contents),
+            generation_config=generation_types.to_generation_config_dict(generation_config or {}),
+        )
+        # GenAIClient retries with its own backoff and rate limit, so the client library must not retry too
+        return generation_types.GenerateContentResponse.from_response(
+            self._client.generate_content(request, retry=None))
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Attributes:
+        rate (float): Tokens added per second (0 disables limiting)
+        capacity (float): Maximum number of tokens, i.e. the allowed burst
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available and take it.
+        """
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class GenAIClient:
+    """
+    Concurrent, rate-limited wrapper around a reusable model handle.
+
+    This client:
+    - Reuses one model handle (and its HTTP/gRPC connection) for every call
+    - Caps in-flight requests and smooths the request rate with a token bucket
+    - Retries throttling and transient errors with jittered exponential backoff
+    - Records per-call latency statistics
+
+    Attributes:
+        model: Object with a generate_content() method (e.g. KeyedGenerativeModel) used for every call
+        max_concurrency (int): Maximum number of requests in flight
+        max_retries (int): Retries after the first attempt
+    """
+    def __init__(self, model, max_concurrency=GENAI_MAX_CONCURRENCY, requests_per_second=GENAI_REQUESTS_PER_SECOND,
+                 burst=GENAI_BURST, max_retries=GENAI_MAX_RETRIES, backoff_base=GENAI_BACKOFF_BASE,
+                 backoff_max=GENAI_BACKOFF_MAX):
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._bucket = TokenBucket(requests_per_second, burst)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="genai")
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._counters = {"calls": 0, "retries": 0, "failures": 0}
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def generate(self, contents, **kwargs):
+        """
+        Call generate_content with rate limiting, concurrency limiting and retries.
+
+        Args:
+            contents (list): Content parts (inline image blobs and text)
+            **kwargs: Passed to the model's generate_content()
+
+        Returns:
+            GenerateContentResponse: Model response
+
+        Raises:
+            GenAIRequestError: If the call fails after all retries or with a non-retryable error
+        """
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            start = time.perf_counter()
+            try:
+                with self._slots:
+                    response = self.model.generate_content(contents, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self._record(None, failed=True)
+                    raise GenAIRequestError(f"GenAI request failed after {attempt + 1} attempts: {e}") from e
+                delay = self._backoff(attempt)
+                logging.warning(f"GenAI request throttled or unavailable ({e}); retrying in {delay:.1f}s")
+                with self._lock:
+                    self._counters["retries"] += 1
+                attempt += 1
+                time.sleep(delay)
+                continue
+            except Exception as e:
+                self._record(None, failed=True)
+                raise GenAIRequestError(f"GenAI request failed: {e}") from e
+
+            self._record(time.perf_counter() - start)
+            return response
+
+    def _record(self, latency, failed=False):
+        with self._lock:
+            self._counters["calls"] += 1
+            if failed:
+                self._counters["failures"] += 1
+            else:
+                self._latencies.append(latency)
+
+    def submit(self, contents, **kwargs):
+        """
+        Run generate() on the client's thread pool.
+
+        Returns:
+            concurrent.futures.Future: Future resolving to the model response
+        """
+        return self._executor.submit(self.generate, contents, **kwargs)
+
+    def stats(self):
+        """
+        Return call counters and latency statistics of recent successful calls.
+
+        Returns:
+            dict: calls, retries, failures and latency mean/p50/p95/max in milliseconds
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self._counters)
+        if not latencies:
+            return {**counters, "latency_ms": None}
+        def percentile(q):
+            return round(1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))], 1)
+        return {
+            **counters,
+            "latency_ms": {
+                "mean": round(1000 * sum(latencies) / len(latencies), 1),
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(1000 * latencies[-1], 1),
+            },
+        }
+
+def encode_image(image, extension='.png'):
+    """
+    Encode an image in memory for inline upload.
+
+    Args:
+        image (numpy.ndarray): Image to encode
+        extension (str): Target format, '.png' or '.jpg'
+
+    Returns:
+        dict: Inline blob, {'mime_type': ..., 'data': bytes}
+
+    Raises:
+        ValueError: If the image cannot be encoded
+    """
+    ok, buffer = cv2.imencode(extension, image)
+    if not ok:
+        raise ValueError(f"Could not encode image as {extension}")
+    mime_type = 'image/png' if extension == '.png' else 'image/jpeg'
+    return {"mime_type": mime_type, "data": buffer.tobytes()}
+
+def compose_regions(images, labels, band_height=40, spacing=16):
+    """
+    Stack grayscale regions vertically, each under a white band holding its label.
+
+    Args:
+        images (list): Grayscale region images
+        labels (list): Label drawn above each region
+        band_height (int): Height of the label band in pixels
+        spacing (int): Blank rows between consecutive regions
+
+    Returns:
+        numpy.ndarray: Composite grayscale image
+    """
+    width = max(max(image.shape[1] for image in images), 400)
+    blocks = []
+    for image, label in zip(images, labels):
+        band = np.full((band_height, width), 255, dtype=np.uint8)
+        cv2.putText(band, label, (8, band_height - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+        region = np.full((image.shape[0], width), 255, dtype=np.uint8)
+        region[:, :image.shape[1]] = image
+        blocks.extend([band, region, np.full((spacing, width), 255, dtype=np.uint8)])
+    return np.vstack(blocks)
 
 class GenAIOCRBackend(OCRInterface):
     """
@@ -14,48 +282,35 @@ class GenAIOCRBackend(OCRInterface):
     - Supports multiple languages
     - Can handle complex document layouts
     - Allows custom prompts for extraction
-    
+
+    Modes:
+    - 'per_region': one model call per area
+    - 'single_call': all areas of a request are sent as one labelled composite
+      image, encoded in memory, and the model returns every field as JSON
+
     Note:
         Requires valid Google GenAI API key
         Uses experimental Gemini model version
     """
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-
-    def load_detection_areas(self, yaml_path='detection_areas.yaml'):
-        """
-        Load detection areas from a YAML configuration file.
-
-        Args:
-            yaml_path (str): Path to the YAML configuration file
-
-        Returns:
-            dict: Dictionary containing area coordinates in format:
-                {
-                    'area_name': [x, y, width, height],
-                    ...
-                }
-
-        Raises:
-            IOError: If YAML file cannot be read
-            yaml.YAMLError: If YAML file is malformed
-        """
-        with open(yaml_path, 'r') as f:
-            areas = yaml.safe_load(f)
-        return areas
+    def __init__(self, api_key, mode=GENAI_MODE):
+        super().__init__()
+        if mode not in ('per_region', 'single_call'):
+            raise ValueError(f"Unknown GenAI mode '{mode}'")
+        self.mode = mode
+        self.client = GenAIClient(KeyedGenerativeModel(api_key))
 
     def preprocess_image(self, image):
         """
         Preprocess image before OCR processing.
 
         Args:
-            image (numpy.ndarray): Input image in BGR format
+            image (numpy.ndarray): Input image in BGR or grayscale format
 
         Returns:
             numpy.ndarray: Preprocessed image (typically grayscale)
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # Enhance contrast here if needed
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        # Contrast and binarization steps are set per template (see preprocessing.py)
         return gray
 
     def send_to_genai_api(self, image, prompt):
@@ -69,53 +324,66 @@ class GenAIOCRBackend(OCRInterface):
         Returns:
             str: Extracted text from the image
 
+        Raises:
+            GenAIRequestError: If the request fails after all retries
+
         Note:
-            Creates a temporary file for API upload
+            The image is encoded in memory and sent inline
             Uses Gemini experimental model for OCR
         """
-        try:
-            temp_image_path = 'temp_image.jpg'
-            cv2.imwrite(temp_image_path, image)
-            myfile = genai.upload_file(temp_image_path)
-            model = genai.GenerativeModel(model_name="gemini-exp-1121")
-            result = model.generate_content([myfile, "\n\n", prompt])
-            os.remove(temp_image_path)
+        result = self.client.generate([encode_image(image, '.jpg'), "\n\n", prompt])
+        return result.text.strip()
 
-            return result.text.strip()
-        except Exception as e:
-            logging.error(f"GenAI request failed: {e}")
-            return ""
+    def recognize(self, image, area_name, prompt="Provide OCR text from this image.", **kwargs):
+        """
+        Recognize the text in a single region through the GenAI API.
 
-    def perform_ocr(self, image_path, detection_areas=None, output_file='detected_text.txt', prompt="Provide OCR text from this image."):
+        Args:
+            image (numpy.ndarray): Preprocessed and enlarged region
+            area_name (str): Name of the area the region belongs to
+            prompt (str): Instruction prompt for the AI model
+
+        Returns:
+            str: Extracted text from the region
+        """
+        return self.send_to_genai_api(image, prompt)
+
+    def recognize_many(self, images, prompt="Provide OCR text from this image.", **kwargs):
         """
-        Perform OCR on specified image regions.
+        Recognize several regions, in a single model call in 'single_call' mode.
 
         Args:
-            image_path (str): Path to the input image
-            detection_areas (dict, optional): Dictionary of areas to process
-                Format: {'area_name': [x, y, width, height]}
-            output_file (str): Path where detected text will be saved
+            images (list): (area_name, image) pairs ready for recognition
             prompt (str): Instruction prompt for the AI model
 
-        Raises:
-            IOError: If image cannot be read or output cannot be saved
-            Exception: If OCR processing fails
+        Returns:
+            list: Extracted text for each pair, in input order
         """
-        image = cv2.imread(image_path)
-        if detection_areas is None:
-            detection_areas = self.load_detection_areas()
+        if self.mode != 'single_call' or len(images) < 2:
+            return self._recognize_concurrently(images, prompt)
 
+        # Labels are positions: area names repeat across invoices and could clash with derived names
+        labels = [f"region_{index}" for index in range(1, len(images) + 1)]
+
+        composite = compose_regions([image for _, image in images], labels)
+        instruction = SINGLE_CALL_PROMPT.format(count=len(labels), prompt=prompt, labels=", ".join(labels))
+        result = self.client.generate(
+            [encode_image(composite), instruction],
+            generation_config={"response_mime_type": "application/json"},
+        )
         try:
-            with open(output_file, "w", encoding="utf-8") as file:
-                for area_name, area in detection_areas.items():
-                    x, y, w, h = area
-                    roi = image[y:y+h, x:x+w]
-                    preprocessed_roi = self.preprocess_image(roi)
-                    enlarged_roi = cv2.resize(preprocessed_roi, None, fx=3, fy=3, interpolation=cv2.INTER_LANCZOS4)
-
-                    text = self.send_to_genai_api(enlarged_roi, prompt)
-                    file.write(f"Text in {area_name}: {text}\n")
-                    file.write("-" * 50 + "\n")
-            logging.info(f"Detected text saved to: {output_file}")
-        except IOError as e:
-            logging.error(f"Error saving file: {e}")
\ No newline at end of file
+            fields = json.loads(result.text)
+            if not isinstance(fields, dict):
+                raise ValueError("Expected a JSON object")
+        except ValueError as e:
+            logging.warning(f"Single-call GenAI reply was not usable, falling back to per-region calls: {e}")
+            return self._recognize_concurrently(images, prompt)
+
+        return [str(fields.get(label) or "") for label in labels]
+
+    def _recognize_concurrently(self, images, prompt):
+        """
+        Send one request per region, up to the client's concurrency limit at a time.
+        """
+        futures = [self.client.submit([encode_image(image, '.jpg'), "\n\n", prompt]) for _, image in images]
+        return [future.result().text.strip() for future in futures]
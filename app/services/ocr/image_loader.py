@@ -0,0 +1,90 @@
+"""
+Region-aware image loading.
+
+OCR only needs a few small rectangles of each scan, in grayscale. Instead
+of decoding the whole page into a full-resolution BGR array, the loader:
+
+- decodes straight to grayscale (one byte per pixel instead of three)
+- optionally lets libjpeg decode JPEGs at 1/2, 1/4 or 1/8 scale when
+  every area stays at least `min_region_height` pixels tall after the
+  reduction (off by default, see DECODE_MIN_REGION_HEIGHT)
+- runs page-level preprocessing steps (see preprocessing.py) once on
+  the decoded page instead of once per area
+- returns copies of the cropped regions only, so the page buffer is
+  released as soon as the crops are taken
+"""
+import os
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+from app.services.ocr.preprocessing import apply_steps
+from app.utils.config import DECODE_MIN_REGION_HEIGHT
+
+JPEG_EXTENSIONS = ('.jpg', '.jpeg', '.jpe', '.jfif')
+
+_REDUCED_GRAYSCALE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+}
+
+
+def choose_reduction(detection_areas: dict, min_region_height: int) -> int:
+    """
+    Pick the largest JPEG decode reduction that keeps every area legible.
+
+    Args:
+        detection_areas (dict): Areas to process, {'area_name': [x, y, w, h]}
+        min_region_height (int): Minimum height in pixels an area may shrink to
+            (0 disables reduced decoding)
+
+    Returns:
+        int: Reduction factor (1, 2, 4 or 8)
+    """
+    if not min_region_height or not detection_areas:
+        return 1
+    smallest_height = min(area[3] for area in detection_areas.values())
+    for factor in sorted(_REDUCED_GRAYSCALE_FLAGS, reverse=True):
+        if smallest_height / factor >= min_region_height:
+            return factor
+    return 1
+
+
+def load_regions(image_path: str, detection_areas: dict,
+                 min_region_height: int = DECODE_MIN_REGION_HEIGHT,
+                 page_steps: Optional[list] = None) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Decode an image and return only its detection areas, in grayscale.
+
+    Args:
+        image_path (str): Path to the input image
+        detection_areas (dict): Areas to process, {'area_name': [x, y, w, h]},
+            in full-resolution pixel coordinates
+        min_region_height (int): Minimum area height after reduced JPEG decoding
+        page_steps (Optional[list]): Preprocessing steps run on the decoded page (see Template.page_steps)
+
+    Returns:
+        Tuple[Dict[str, numpy.ndarray], int]: Grayscale crop per area, in the
+            order of detection_areas, and the decode reduction factor used
+
+    Raises:
+        IOError: If the image cannot be read
+    """
+    factor = 1
+    if os.path.splitext(image_path)[1].lower() in JPEG_EXTENSIONS:
+        factor = choose_reduction(detection_areas, min_region_height)
+
+    image = cv2.imread(image_path, _REDUCED_GRAYSCALE_FLAGS.get(factor, cv2.IMREAD_GRAYSCALE))
+    if image is None:
+        raise IOError(f"Could not read image: {image_path}")
+    if page_steps:
+        image = apply_steps(image, page_steps, level='page')
+
+    regions = {}
+    for area_name, area in detection_areas.items():
+        x, y, w, h = area
+        # Round outwards so the reduced crop still covers the whole area
+        x0, y0 = x // factor, y // factor
+        x1, y1 = -(-(x + w) // factor), -(-(y + h) // factor)
+        regions[area_name] = image[y0:y1, x0:x1].copy()
+    return regions, factor
@@ -0,0 +1,121 @@
+"""
+Ink-density gate and tight text cropping.
+
+Areas are drawn generously around where a field may be printed, so many
+regions are blank (an unused field) or mostly background. Before a region
+is enlarged and sent to an engine, an ink policy:
+
+- skips it when it holds no ink: its pixel standard deviation or its
+  share of ink pixels is too low, so blank fields cost no engine call
+- crops it to the bounds of its text, found with row and column
+  projection profiles of the ink mask, plus a small margin
+
+Ink is the minority side of the threshold halfway between the darkest and
+the lightest pixel, so dark-on-light and inverted regions both work.
+Policies can be overridden per template or per area with an 'ink' option
+in the extended template format:
+
+    areas:
+      area_1:
+        box: [x, y, width, height]
+        ink: {crop: false, min_ratio: 0.01}
+"""
+import numpy as np
+from app.utils.config import INK_GATE, INK_CROP, INK_MIN_STD, INK_MIN_RATIO, INK_MARGIN
+
+# Rows and columns with fewer ink pixels are treated as specks when cropping
+_MIN_LINE_PIXELS = 2
+
+
+class InkPolicy:
+    """
+    How a preprocessed region is checked for ink and cropped before resizing.
+
+    Attributes:
+        gate (bool): Skip regions without ink
+        crop (bool): Crop regions to the bounds of their ink
+        min_std (float): Pixel standard deviation below which a region is blank
+        min_ratio (float): Share of ink pixels below which a region is blank
+        margin (int): Pixels kept around the ink bounds when cropping
+    """
+
+    OPTIONS = ('gate', 'crop', 'min_std', 'min_ratio', 'margin')
+
+    def __init__(self, gate=INK_GATE, crop=INK_CROP, min_std=INK_MIN_STD, min_ratio=INK_MIN_RATIO,
+                 margin=INK_MARGIN):
+        """
+        Create a policy.
+
+        Raises:
+            ValueError: If an option is out of range
+        """
+        if not isinstance(gate, bool) or not isinstance(crop, bool):
+            raise ValueError("'gate' and 'crop' must be true or false")
+        if min_std < 0 or not 0 <= min_ratio < 1 or margin < 0:
+            raise ValueError("'min_std' and 'margin' must not be negative and 'min_ratio' must be between 0 and 1")
+        self.gate = gate
+        self.crop = crop
+        self.min_std = float(min_std)
+        self.min_ratio = float(min_ratio)
+        self.margin = int(margin)
+
+    def with_options(self, options) -> "InkPolicy":
+        """
+        Return a copy of the policy with some options overridden.
+
+        Args:
+            options (dict): Policy options, e.g. {'crop': False}
+
+        Raises:
+            ValueError: If an option is unknown or invalid
+        """
+        if not isinstance(options, dict):
+            raise ValueError("'ink' must be a mapping of ink options")
+        unknown = set(options) - set(self.OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown ink option(s): {', '.join(sorted(map(str, unknown)))}")
+        return InkPolicy(**{**self.describe(), **options})
+
+    def describe(self) -> dict:
+        return {name: getattr(self, name) for name in self.OPTIONS}
+
+    @staticmethod
+    def ink_mask(image):
+        """
+        Return the boolean mask of ink pixels of a grayscale region.
+        """
+        middle = (int(image.min()) + int(image.max())) / 2
+        dark = image < middle
+        # Text covers less of a region than its background
+        return dark if np.count_nonzero(dark) * 2 <= dark.size else ~dark
+
+    def apply(self, image):
+        """
+        Check a region for ink and crop it to its text.
+
+        Args:
+            image (numpy.ndarray): Preprocessed grayscale region
+
+        Returns:
+            Optional[numpy.ndarray]: None for a blank region, otherwise the
+                cropped region (a view of the input)
+        """
+        if not (self.gate or self.crop) or image.size == 0:
+            return image
+        if self.gate and image.std() < self.min_std:
+            return None
+
+        mask = self.ink_mask(image)
+        if self.gate and np.count_nonzero(mask) < self.min_ratio * mask.size:
+            return None
+        if not self.crop:
+            return image
+
+        rows = np.flatnonzero(np.count_nonzero(mask, axis=1) >= _MIN_LINE_PIXELS)
+        columns = np.flatnonzero(np.count_nonzero(mask, axis=0) >= _MIN_LINE_PIXELS)
+        if rows.size == 0 or columns.size == 0:
+            return image
+        height, width = image.shape[:2]
+        top, bottom = max(0, rows[0] - self.margin), min(height, rows[-1] + 1 + self.margin)
+        left, right = max(0, columns[0] - self.margin), min(width, columns[-1] + 1 + self.margin)
+        return image[top:bottom, left:right]
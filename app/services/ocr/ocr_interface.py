@@ -1,60 +1,355 @@
 from abc import ABC, abstractmethod
+import logging
+from app.services.ocr.image_loader import load_regions
+from app.services.ocr.ink import InkPolicy
+from app.services.ocr.region_cache import RegionCache
+from app.services.ocr.region_executor import region_executor
+from app.services.ocr.preprocessing import apply_steps
+from app.services.ocr.profiles import RecognitionProfile
+from app.services.ocr.resize import ResizePolicy
+from app.services.ocr.templates import template_registry
+from app.utils.config import REGION_CACHE_MAX_ENTRIES
 
 class OCRInterface(ABC):
     """
     Abstract base class defining the interface for OCR implementations.
-    
+
     All OCR backend implementations must inherit from this class and
-    implement its abstract methods.
+    implement its abstract methods. The region loop is shared: backends
+    only provide how a single preprocessed region is recognized.
+
+    Attributes:
+        TARGET_TEXT_HEIGHT (int): Text line height in pixels the engine reads best
+        region_cache (RegionCache): Memo of recognized text per region pixels
+        resize_policy (ResizePolicy): Default scaling of regions before recognition
+        ink_policy (InkPolicy): Default blank-region gate and text cropping
     """
 
-    @abstractmethod
+    TARGET_TEXT_HEIGHT = 48
+
+    def __init__(self, region_cache_size=REGION_CACHE_MAX_ENTRIES):
+        """
+        Initialize state shared by all backends.
+
+        Args:
+            region_cache_size (int): Maximum number of regions memoized
+                by this backend (0 disables the region cache)
+        """
+        self.region_cache = RegionCache(region_cache_size)
+        self.resize_policy = ResizePolicy(target_height=self.TARGET_TEXT_HEIGHT)
+        self.ink_policy = InkPolicy()
+
     def load_detection_areas(self, yaml_path='detection_areas.yaml'):
         """
         Load detection areas from a YAML configuration file.
-        
+
+        The file is parsed once and cached by the template registry until
+        its modification time changes.
+
         Args:
-            yaml_path (str): Path to the YAML configuration file
-            
+            yaml_path (str): Path to the YAML configuration file (legacy or extended template format)
+
         Returns:
             dict: Dictionary containing area coordinates in format:
                 {
                     'area_name': [x, y, width, height],
                     ...
                 }
-            
+
         Raises:
             IOError: If YAML file cannot be read
-            yaml.YAMLError: If YAML file is malformed
+            ValueError: If YAML file is malformed
         """
-        pass
+        return template_registry.load(yaml_path).areas
 
     @abstractmethod
     def preprocess_image(self, image):
         """
         Preprocess image before OCR processing.
-        
+
         Args:
-            image (numpy.ndarray): Input image in BGR format
-            
+            image (numpy.ndarray): Input image in BGR or grayscale format
+
         Returns:
             numpy.ndarray: Preprocessed image (typically grayscale)
         """
         pass
 
     @abstractmethod
-    def perform_ocr(self, image_path, detection_areas=None, output_file='detected_text.txt'):
+    def recognize(self, image, area_name, **kwargs):
         """
-        Perform OCR on specified image regions.
-        
+        Recognize the text in a single preprocessed and enlarged region.
+
+        Args:
+            image (numpy.ndarray): Region image ready for recognition
+            area_name (str): Name of the area the region belongs to
+            **kwargs: Backend specific options (e.g. a prompt), and 'profile',
+                the RecognitionProfile of the area or None
+
+        Returns:
+            str: Recognized text
+        """
+        pass
+
+    def extract_text(self, image_path, detection_areas=None, area_options=None, page_steps=None, **kwargs):
+        """
+        Perform OCR on specified image regions and return the text in memory.
+
+        Args:
+            image_path (str): Path to the input image
+            detection_areas (dict, optional): Dictionary of areas to process
+                Format: {'area_name': [x, y, width, height]}
+            area_options (dict, optional): Template options per area (see Template.region_options)
+            page_steps (list, optional): Preprocessing steps run once on the decoded page
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            dict: Recognized text per area, {'area_name': 'text', ...},
+                in the order of detection_areas
+
+        Raises:
+            IOError: If image cannot be read
+            Exception: If OCR processing fails
+        """
+        if detection_areas is None:
+            detection_areas = self.load_detection_areas()
+
+        # Decode only the areas, in grayscale, instead of the full BGR page
+        regions, _ = load_regions(image_path, detection_areas, page_steps=page_steps)
+        return self.recognize_regions(regions, area_options, **kwargs)
+
+    def extract_text_many(self, image_paths, detection_areas=None, area_options=None, page_steps=None, **kwargs):
+        """
+        Perform OCR on several images, recognizing all their regions together.
+
+        Backends that support batched inference (see recognize_many()) process
+        the regions of every image in shared batches.
+
+        Args:
+            image_paths (list): Paths to the input images
+            detection_areas (dict, optional): Dictionary of areas to process
+                Format: {'area_name': [x, y, width, height]}
+            area_options (dict, optional): Template options per area (see Template.region_options)
+            page_steps (list, optional): Preprocessing steps run once on each decoded page
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            list: Recognized text per area for each image, in input order
+
+        Raises:
+            IOError: If an image cannot be read
+            Exception: If OCR processing fails
+        """
+        if detection_areas is None:
+            detection_areas = self.load_detection_areas()
+
+        region_sets = [load_regions(image_path, detection_areas, page_steps=page_steps)[0]
+                       for image_path in image_paths]
+        return self._recognize_region_sets(region_sets, area_options, **kwargs)
+
+    def recognize_regions(self, regions, area_options=None, **kwargs):
+        """
+        Recognize already decoded regions.
+
+        Args:
+            regions (dict): Region image per area, {'area_name': numpy.ndarray}
+            area_options (dict, optional): Template options per area (see Template.region_options)
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            dict: Recognized text per area, in the order of regions
+        """
+        return self._recognize_region_sets([regions], area_options, **kwargs)[0]
+
+    def recognize_regions_with_confidence(self, regions, area_options=None, **kwargs):
+        """
+        Recognize already decoded regions and report the engine's confidence.
+
+        Args:
+            regions (dict): Region image per area, {'area_name': numpy.ndarray}
+            area_options (dict, optional): Template options per area (see Template.region_options)
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            dict: (text, confidence) per area, in the order of regions; confidence is
+                between 0 and 1, or None when the backend does not report one
+        """
+        return self._recognize_region_sets([regions], area_options, with_confidence=True, **kwargs)[0]
+
+    def recognize_many_with_confidence(self, images, profiles=None, **kwargs):
+        """
+        Recognize several prepared regions and report the engine's confidence.
+
+        The default implementation reports no confidence; backends whose
+        engines score their output override it, usually by mapping their
+        recognize_with_confidence() over region_executor.
+
+        Args:
+            images (list): (area_name, image) pairs ready for recognition
+            profiles (list, optional): RecognitionProfile or None for each pair
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            list: (text, confidence or None) for each pair, in input order
+        """
+        return [(text, None) for text in self.recognize_many(images, profiles=profiles, **kwargs)]
+
+    def recognize_many(self, images, profiles=None, **kwargs):
+        """
+        Recognize several prepared regions.
+
+        The default implementation calls recognize() once per region on the
+        shared region thread pool, keeping the input order; backends with
+        batched inference override it.
+
+        Args:
+            images (list): (area_name, image) pairs ready for recognition
+            profiles (list, optional): RecognitionProfile or None for each pair
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            list: Recognized text for each pair, in input order
+        """
+        def recognize_one(area_name, image, profile):
+            return self.recognize(image, area_name, profile=profile, **kwargs)
+
+        profiles = profiles or [None] * len(images)
+        return region_executor.map(recognize_one, [(area_name, image, profile)
+                                                   for (area_name, image), profile in zip(images, profiles)])
+
+    def _prepare_region(self, preprocessed_roi, policy=None):
+        """
+        Scale a preprocessed region for recognition.
+
+        Args:
+            preprocessed_roi (numpy.ndarray): Output of preprocess_image()
+            policy (ResizePolicy, optional): Policy of the area (default: resize_policy)
+        """
+        return (policy or self.resize_policy).apply(preprocessed_roi)
+
+    def _resize_policies(self, area_options):
+        """
+        Resolve the resize policy of every area that overrides it.
+        """
+        return {area_name: self.resize_policy.with_options(options['resize'])
+                for area_name, options in (area_options or {}).items() if 'resize' in options}
+
+    def _ink_policies(self, area_options):
+        """
+        Resolve the ink policy of every area that overrides it.
+        """
+        return {area_name: self.ink_policy.with_options(options['ink'])
+                for area_name, options in (area_options or {}).items() if 'ink' in options}
+
+    @staticmethod
+    def _recognition_profiles(area_options):
+        """
+        Build the recognition profile of every area that has one.
+        """
+        return {area_name: RecognitionProfile(**options['profile'])
+                for area_name, options in (area_options or {}).items() if 'profile' in options}
+
+    def _recognize_region_sets(self, region_sets, area_options=None, with_confidence=False, **kwargs):
+        """
+        Recognize the regions of one or more images, reusing the text of identical regions.
+
+        Blank regions are answered with empty text without calling the engine,
+        and the others are cropped to their text before they are resized.
+
+        Args:
+            region_sets (list): Region images per image, [{'area_name': numpy.ndarray}, ...]
+            area_options (dict, optional): Template options per area (see Template.region_options)
+            with_confidence (bool): Return (text, confidence) pairs instead of text
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            list: Recognized text (or (text, confidence) pairs) per area for each
+                region set, in input order
+        """
+        policies = self._resize_policies(area_options)
+        ink_policies = self._ink_policies(area_options)
+        profiles = self._recognition_profiles(area_options)
+        results = [dict.fromkeys(regions) for regions in region_sets]
+        pending = []
+        for index, regions in enumerate(region_sets):
+            for area_name, roi in regions.items():
+                preprocessed_roi = self.preprocess_image(roi)
+                policy = policies.get(area_name, self.resize_policy)
+                profile = profiles.get(area_name)
+                steps = (area_options or {}).get(area_name, {}).get('preprocess')
+                if steps:
+                    preprocessed_roi = apply_steps(preprocessed_roi, steps)
+                if profile is not None and profile.preprocess:
+                    preprocessed_roi = apply_steps(preprocessed_roi, profile.preprocess)
+
+                preprocessed_roi = ink_policies.get(area_name, self.ink_policy).apply(preprocessed_roi)
+                if preprocessed_roi is None:
+                    results[index][area_name] = ("", None) if with_confidence else ""
+                    continue
+
+                key = None
+                if self.region_cache.enabled:
+                    key = self.region_cache.make_key(preprocessed_roi, sorted(kwargs.items()),
+                                                     sorted(policy.describe().items()),
+                                                     sorted(profile.describe().items()) if profile else None,
+                                                     with_confidence)
+                    cached = self.region_cache.get(key)
+                    if cached is not None:
+                        results[index][area_name] = cached
+                        continue
+
+                pending.append((index, area_name, key, self._prepare_region(preprocessed_roi, policy), profile))
+
+        if pending:
+            images = [(area_name, image) for _, area_name, _, image, _ in pending]
+            recognize_many = self.recognize_many_with_confidence if with_confidence else self.recognize_many
+            if profiles:
+                outputs = recognize_many(images, profiles=[profile for *_, profile in pending], **kwargs)
+            else:
+                outputs = recognize_many(images, **kwargs)
+            for (index, area_name, key, _, _), output in zip(pending, outputs):
+                output = (output[0].strip(), output[1]) if with_confidence else output.strip()
+                results[index][area_name] = output
+                if key is not None:
+                    self.region_cache.put(key, output)
+        return results
+
+    def perform_ocr(self, image_path, detection_areas=None, output_file='detected_text.txt', **kwargs):
+        """
+        Perform OCR on specified image regions and export the text to a file.
+
         Args:
             image_path (str): Path to the input image
             detection_areas (dict, optional): Dictionary of areas to process
                 Format: {'area_name': [x, y, width, height]}
             output_file (str): Path where detected text will be saved
-            
+            **kwargs: Backend specific options passed to recognize()
+
+        Returns:
+            dict: Recognized text per area, as returned by extract_text()
+
         Raises:
-            IOError: If image cannot be read or output cannot be saved
+            IOError: If image cannot be read
             Exception: If OCR processing fails
         """
-        pass 
\ No newline at end of file
+        results = self.extract_text(image_path, detection_areas, **kwargs)
+        self.export_text(results, output_file)
+        return results
+
+    @staticmethod
+    def export_text(results, output_file):
+        """
+        Write recognized text in the 'Text in area_X: ...' export format.
+
+        Args:
+            results (dict): Recognized text per area
+            output_file (str): Path where detected text will be saved
+        """
+        try:
+            with open(output_file, "w", encoding="utf-8") as file:
+                for area_name, text in results.items():
+                    file.write(f"Text in {area_name}: {text}\n")
+                    file.write("-" * 50 + "\n")
+            logging.info(f"Detected text saved to: {output_file}")
+        except IOError as e:
+            logging.error(f"Error saving file: {e}")
@@ -0,0 +1,218 @@
+"""
+Declarative preprocessing pipeline.
+
+Poor scans (low contrast, noise, slight rotation) are cheaper to fix before
+recognition than to re-run. Pipelines are lists of steps, each a step name
+or a one-key mapping of a name to its parameters:
+
+    preprocess: [clahe, {adaptive: {block_size: 41}}, median]
+
+Pages are already decoded straight to grayscale (see image_loader.py).
+Steps can run at three levels, all configured in the extended template
+format:
+
+- 'page_preprocess' (template-wide): run once on the decoded page, before
+  the areas are cropped, so one vectorized pass serves every area
+- 'preprocess' (template-wide or per area): run on each region after the
+  backend's preprocess_image()
+- a recognition profile's 'preprocess' (see profiles.py): run after the above
+
+    page_preprocess: [clahe, deskew]
+    preprocess: [normalize]
+    areas:
+      area_1: {box: [...], preprocess: [denoise, otsu]}
+
+A page-level 'deskew' rotates the whole page, so boxes must be drawn on the
+deskewed layout. The time spent in every step is recorded in step_timer.
+"""
+import inspect
+import threading
+import time
+import cv2
+
+# Largest skew corrected by 'deskew'; larger angles are layout, not skew
+_MAX_SKEW_DEGREES = 15.0
+
+
+def _otsu(image):
+    return cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def _adaptive(image, block_size=31, c=10):
+    return cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                 int(block_size) | 1, c)
+
+
+def _invert(image):
+    return cv2.bitwise_not(image)
+
+
+def _median(image, size=3):
+    return cv2.medianBlur(image, int(size) | 1)
+
+
+def _normalize(image):
+    return cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
+
+
+def _clahe(image, clip_limit=2.0, tile_size=8):
+    return cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(int(tile_size), int(tile_size))).apply(image)
+
+
+def _denoise(image, strength=10):
+    return cv2.fastNlMeansDenoising(image, None, h=strength)
+
+
+def _deskew(image, max_angle=_MAX_SKEW_DEGREES):
+    # Ink pixels: the darker side of Otsu's threshold
+    ink = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    points = cv2.findNonZero(ink)
+    if points is None or len(points) < 2:
+        return image
+    angle = cv2.minAreaRect(points)[-1]
+    # minAreaRect reports angles in [0, 90) or [-90, 0) depending on the OpenCV version
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if abs(angle) < 0.1 or abs(angle) > max_angle:
+        return image
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+STEPS = {
+    'otsu': _otsu,
+    'adaptive': _adaptive,
+    'invert': _invert,
+    'median': _median,
+    'normalize': _normalize,
+    'clahe': _clahe,
+    'denoise': _denoise,
+    'deskew': _deskew,
+}
+
+# Accepted parameter values per step: (type, minimum, maximum)
+PARAMETERS = {
+    'adaptive': {'block_size': (int, 3, 255), 'c': (float, -255, 255)},
+    'median': {'size': (int, 1, 31)},
+    'clahe': {'clip_limit': (float, 0.1, 40), 'tile_size': (int, 1, 64)},
+    'denoise': {'strength': (float, 0, 100)},
+    'deskew': {'max_angle': (float, 0, 45)},
+}
+
+
+def _check_parameter(step, name, value):
+    kind, low, high = PARAMETERS[step][name]
+    # bool is an int subclass, but 'true' is never a meaningful size
+    numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if not numeric or (kind is int and not isinstance(value, int)):
+        expected = "an integer" if kind is int else "a number"
+        raise ValueError(f"Parameter '{name}' of preprocessing step '{step}' must be {expected}")
+    if not low <= value <= high:
+        raise ValueError(f"Parameter '{name}' of preprocessing step '{step}' must be between {low} and {high}")
+
+
+def _split_step(step):
+    if isinstance(step, dict):
+        (name, params), = step.items()
+        return name, params or {}
+    return step, {}
+
+
+def parse_step(step):
+    """
+    Split a step into its name and parameters.
+
+    Args:
+        step: Step name, or a one-key mapping {name: {parameter: value}}
+
+    Returns:
+        tuple: (name, parameters)
+
+    Raises:
+        ValueError: If the step is unknown, or its parameters are unknown or out of range
+    """
+    if isinstance(step, dict) and len(step) != 1:
+        raise ValueError("A preprocessing step with parameters must be a one-key mapping {step: {...}}")
+    step, params = _split_step(step)
+    if not isinstance(params, dict):
+        raise ValueError(f"Parameters of preprocessing step '{step}' must be a mapping")
+    if not isinstance(step, str) or step not in STEPS:
+        raise ValueError(f"Unknown preprocessing step: {step}")
+    try:
+        inspect.signature(STEPS[step]).bind(None, **params)
+    except TypeError:
+        raise ValueError(f"Invalid parameters for preprocessing step '{step}': {', '.join(map(str, params))}")
+    for name, value in params.items():
+        _check_parameter(step, name, value)
+    return step, params
+
+
+def validate_steps(steps) -> list:
+    """
+    Check a list of steps.
+
+    Raises:
+        ValueError: If steps is not a list or contains an invalid step
+    """
+    if not isinstance(steps, list):
+        raise ValueError("'preprocess' must be a list of steps")
+    for step in steps:
+        parse_step(step)
+    return steps
+
+
+class StepTimer:
+    """
+    Process-wide call counts and durations of preprocessing steps, per level.
+    """
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, level: str, step: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._totals.setdefault((level, step), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def stats(self) -> dict:
+        """
+        Return the timings of every step that ran.
+
+        Returns:
+            dict: {level: {step: {'calls', 'total_seconds', 'mean_ms'}}}
+        """
+        with self._lock:
+            stats = {}
+            for (level, step), (calls, seconds) in sorted(self._totals.items()):
+                stats.setdefault(level, {})[step] = {"calls": calls, "total_seconds": round(seconds, 4),
+                                                     "mean_ms": round(seconds * 1000 / calls, 3)}
+            return stats
+
+
+# Step timings shared by every backend and request in the process
+step_timer = StepTimer()
+
+
+def apply_steps(image, steps, level='region'):
+    """
+    Run preprocessing steps on a grayscale image, in order.
+
+    Args:
+        image (numpy.ndarray): 8-bit grayscale page or region
+        steps (list): Steps as accepted by validate_steps()
+        level (str): 'page' or 'region', the level the timings are recorded under
+
+    Returns:
+        numpy.ndarray: Processed image
+    """
+    for step in steps:
+        name, params = _split_step(step)
+        start = time.perf_counter()
+        image = STEPS[name](image, **params)
+        step_timer.record(level, name, time.perf_counter() - start)
+    return image
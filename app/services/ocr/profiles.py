@@ -0,0 +1,110 @@
+"""
+Per-area recognition profiles.
+
+Invoice fields such as dates, amounts and invoice numbers are single lines
+of digits, yet by default every area is read as sparse free text in all
+languages. A profile narrows the work the engine does for one area:
+
+- psm: Tesseract page segmentation mode (e.g. 7 for a single text line)
+- lang: Tesseract language subset (e.g. 'eng' instead of 'ara2+eng'), one of
+  TESSERACT_LANGUAGES
+- whitelist: the only characters the engine may output
+- preprocess: preprocessing steps run before resizing (see preprocessing.STEPS)
+
+Profiles are set per area (or for a whole template) in the extended
+template format, either inline or by name:
+
+    profiles:
+      invoice_no: {psm: 7, whitelist: "0123456789-"}
+    areas:
+      area_1: {box: [...], field: invoice_number, profile: invoice_no}
+      area_2: {box: [...], field: date, profile: date}
+      area_3: {box: [...], profile: {psm: 7, lang: eng}}
+
+Named profiles are looked up in the template's 'profiles' first, then in
+the built-in PROFILES. Tesseract applies every setting; EasyOCR applies the
+whitelist and the preprocessing steps; GenAI applies the preprocessing steps.
+"""
+from typing import Optional
+from app.services.ocr.preprocessing import validate_steps
+from app.utils.config import TESSERACT_LANGUAGES
+
+# Western and Arabic-Indic digits
+DIGITS = "0123456789٠١٢٣٤٥٦٧٨٩"
+
+PROFILES = {
+    'text': {},
+    'line': {'psm': 7},
+    'digits': {'psm': 7, 'whitelist': DIGITS},
+    'date': {'psm': 7, 'whitelist': DIGITS + "/-."},
+    'amount': {'psm': 7, 'whitelist': DIGITS + ".,"},
+}
+
+
+class RecognitionProfile:
+    """
+    Recognition settings of one area; None means the backend default.
+
+    Attributes:
+        psm (Optional[int]): Tesseract page segmentation mode
+        lang (Optional[str]): Tesseract language string
+        whitelist (Optional[str]): Characters the engine may output
+        preprocess (list): Preprocessing steps (names or {name: parameters} mappings)
+    """
+
+    OPTIONS = ('psm', 'lang', 'whitelist', 'preprocess')
+
+    def __init__(self, psm: Optional[int] = None, lang: Optional[str] = None, whitelist: Optional[str] = None,
+                 preprocess: Optional[list] = None):
+        """
+        Create a profile.
+
+        Raises:
+            ValueError: If an option is invalid
+        """
+        if psm is not None and (not isinstance(psm, int) or not 0 <= psm <= 13):
+            raise ValueError("'psm' must be a Tesseract page segmentation mode between 0 and 13")
+        if lang is not None and (not isinstance(lang, str) or not lang):
+            raise ValueError("'lang' must be a Tesseract language string such as 'eng' or 'ara2+eng'")
+        if lang is not None and lang not in TESSERACT_LANGUAGES:
+            # Every language in use costs a pool of loaded engines
+            raise ValueError(f"'lang' must be one of the configured languages: {', '.join(TESSERACT_LANGUAGES)}")
+        if whitelist is not None and (not isinstance(whitelist, str) or not whitelist):
+            raise ValueError("'whitelist' must be a non-empty string of characters")
+        self.psm = psm
+        self.lang = lang
+        self.whitelist = whitelist
+        self.preprocess = validate_steps(list(preprocess or []))
+
+    def describe(self) -> dict:
+        return {name: getattr(self, name) for name in self.OPTIONS}
+
+
+def resolve_profile(value, named: Optional[dict] = None) -> RecognitionProfile:
+    """
+    Build the profile referenced by a template 'profile' option.
+
+    Args:
+        value: Profile name or inline mapping of profile options
+        named (Optional[dict]): The template's own named profiles
+
+    Returns:
+        RecognitionProfile: Resolved profile
+
+    Raises:
+        ValueError: If the profile is unknown or invalid
+    """
+    if isinstance(value, str):
+        named = named or {}
+        if value in named:
+            value = named[value]
+        elif value in PROFILES:
+            value = PROFILES[value]
+        else:
+            raise ValueError(f"Unknown recognition profile '{value}'")
+    if not isinstance(value, dict):
+        raise ValueError("A recognition profile must be a name or a mapping of profile options")
+    unknown = set(value) - set(RecognitionProfile.OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown profile option(s): {', '.join(sorted(map(str, unknown)))}")
+    return RecognitionProfile(**value)
@@ -1,9 +1,13 @@
 from app.services.ocr.ocr_interface import OCRInterface
 import os
 import cv2
-import yaml
+import shlex
 import pytesseract
 import logging
+import threading
+from app.services.ocr.region_executor import region_executor
+from app.services.ocr.tesseract_pool import TesseractEnginePool, TESSEROCR_AVAILABLE, parse_tesseract_config
+from app.utils.config import TESSERACT_MODE, TESSERACT_POOL_SIZE, TESSERACT_LANGUAGES, TESSDATA_PATH
 
 class PytesseractOCR(OCRInterface):
     """
@@ -15,42 +19,117 @@ class PytesseractOCR(OCRInterface):
     - Performs image preprocessing
     - Handles region-based text extraction
     
+    Modes:
+    - 'subprocess': one `tesseract` process per region through pytesseract
+    - 'pool': a pool of long-lived in-process engines (requires tesserocr)
+    - 'auto': 'pool' when tesserocr is installed, otherwise 'subprocess'
+
+    Recognition profiles can override the page segmentation mode, language
+    and character whitelist per area; in 'pool' mode an extra engine pool
+    is started the first time a profile asks for another language, among
+    TESSERACT_LANGUAGES. Regions are recognized on the shared region
+    executor, so by default each pool holds one engine per region worker.
+
     Note:
         Requires Tesseract to be installed and accessible in system PATH
     """
-    def __init__(self):
+    LANG = 'ara2+eng'
+    CONFIG = "--psm 12 --oem 1"
+    # Tesseract is most accurate with capitals around 30px tall
+    TARGET_TEXT_HEIGHT = 40
+
+    def __init__(self, mode=TESSERACT_MODE, pool_size=TESSERACT_POOL_SIZE):
+        super().__init__()
         # Configure the path to Tesseract executable if needed
         # Uncomment and update the line below if Tesseract is not in your PATH
         # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        pass
+        if mode == 'auto':
+            mode = 'pool' if TESSEROCR_AVAILABLE else 'subprocess'
+        if mode not in ('pool', 'subprocess'):
+            raise ValueError(f"Unknown Tesseract mode '{mode}'")
+        self.mode = mode
+        # More engines than region threads would sit idle
+        self.pool_size = pool_size if pool_size > 0 else max(1, region_executor.workers)
+        self.options = parse_tesseract_config(self.CONFIG)
+        self.engine_pool = None
+        self._language_pools = {}
+        self._pools_lock = threading.Lock()
+        if mode == 'pool':
+            self.engine_pool = TesseractEnginePool(self.pool_size, self.LANG, self.CONFIG, tessdata_path=TESSDATA_PATH)
+            self._language_pools[self.LANG] = self.engine_pool
+        logging.info(f"Tesseract backend running in '{self.mode}' mode")
 
-    def load_detection_areas(self, yaml_path='detection_areas.yaml'):
-        with open(yaml_path, 'r') as f:
-            areas = yaml.safe_load(f)
-        return areas
+    def _pool_for(self, lang):
+        with self._pools_lock:
+            pool = self._language_pools.get(lang)
+            if pool is None:
+                if lang not in TESSERACT_LANGUAGES:
+                    raise ValueError(f"Tesseract language '{lang}' is not in the configured languages")
+                pool = TesseractEnginePool(self.pool_size, lang, self.CONFIG, tessdata_path=TESSDATA_PATH)
+                self._language_pools[lang] = pool
+            return pool
+
+    def _config(self, psm, whitelist):
+        if psm is None and not whitelist:
+            return self.CONFIG
+        psm = psm if psm is not None else self.options["psm"]
+        parts = [f"--psm {psm}"] if psm is not None else []
+        if self.options["oem"] is not None:
+            parts.append(f"--oem {self.options['oem']}")
+        parts.extend(f"-c {name}={value}" for name, value in self.options["variables"].items())
+        if whitelist:
+            parts.append("-c " + shlex.quote(f"tessedit_char_whitelist={whitelist}"))
+        return " ".join(parts)
 
     def preprocess_image(self, image):
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # Enhance contrast here if needed
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        # Contrast and binarization steps are set per template (see preprocessing.py)
         return gray
 
-    def perform_ocr(self, image_path, detection_areas=None, output_file='detected_text.txt'):
-        image = cv2.imread(image_path)
-        if detection_areas is None:
-            detection_areas = self.load_detection_areas()
-
-        try:
-            with open(output_file, "w", encoding="utf-8") as file:
-                for area_name, area in detection_areas.items():
-                    x, y, w, h = area
-                    roi = image[y:y+h, x:x+w]
-                    preprocessed_roi = self.preprocess_image(roi)
-                    enlarged_roi = cv2.resize(preprocessed_roi, None, fx=3, fy=3, interpolation=cv2.INTER_LANCZOS4)
-                    
-                    config = "--psm 12 --oem 1"
-                    text = pytesseract.image_to_string(enlarged_roi, lang='ara2+eng', config=config)
-                    file.write(f"Text in {area_name}: {text.strip()}\n")
-                    file.write("-" * 50 + "\n")
-            logging.info(f"Detected text saved to: {output_file}")
-        except IOError as e:
-            logging.error(f"Error saving file: {e}")
\ No newline at end of file
+    def recognize(self, image, area_name, profile=None, **kwargs):
+        psm = profile.psm if profile is not None else None
+        whitelist = profile.whitelist if profile is not None else None
+        lang = (profile.lang if profile is not None else None) or self.LANG
+        if self.engine_pool is not None:
+            return self._pool_for(lang).image_to_string(image, psm=psm, whitelist=whitelist)
+        return pytesseract.image_to_string(image, lang=lang, config=self._config(psm, whitelist))
+
+    def recognize_with_confidence(self, image, area_name, profile=None, **kwargs):
+        """
+        Recognize a region and report Tesseract's mean word confidence.
+
+        Args:
+            image (numpy.ndarray): Region image ready for recognition
+            area_name (str): Name of the area the region belongs to
+            profile (RecognitionProfile, optional): Recognition profile of the area
+
+        Returns:
+            tuple: Recognized text and its confidence between 0 and 1
+        """
+        psm = profile.psm if profile is not None else None
+        whitelist = profile.whitelist if profile is not None else None
+        lang = (profile.lang if profile is not None else None) or self.LANG
+        if self.engine_pool is not None:
+            return self._pool_for(lang).image_to_string_with_confidence(image, psm=psm, whitelist=whitelist)
+
+        data = pytesseract.image_to_data(image, lang=lang, config=self._config(psm, whitelist),
+                                         output_type=pytesseract.Output.DICT)
+        lines = {}
+        confidences = []
+        for word, conf, block, par, line in zip(data['text'], data['conf'], data['block_num'],
+                                                data['par_num'], data['line_num']):
+            # Rows with a negative confidence are layout entries, not words
+            if float(conf) < 0 or not word.strip():
+                continue
+            lines.setdefault((block, par, line), []).append(word)
+            confidences.append(float(conf))
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, (sum(confidences) / len(confidences) / 100 if confidences else 0.0)
+
+    def recognize_many_with_confidence(self, images, profiles=None, **kwargs):
+        def recognize_one(area_name, image, profile):
+            return self.recognize_with_confidence(image, area_name, profile=profile, **kwargs)
+
+        profiles = profiles or [None] * len(images)
+        return region_executor.map(recognize_one, [(area_name, image, profile)
+                                                   for (area_name, image), profile in zip(images, profiles)])
@@ -0,0 +1,105 @@
+"""
+Region-level recognition cache.
+
+Invoices printed from the same template produce many identical crops
+(fixed labels, pre-printed values, blank fields). This cache memoizes the
+recognized text per preprocessed region so only regions whose pixels
+actually changed are sent to the OCR engine.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class RegionCache:
+    """
+    Bounded LRU cache mapping a region pixel hash to recognized text.
+
+    Attributes:
+        max_entries (int): Maximum number of regions kept (0 disables caching)
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        Initialize the region cache.
+
+        Args:
+            max_entries (int): Maximum number of regions kept (0 disables caching)
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(image, *extra) -> bytes:
+        """
+        Hash a region image together with any options that affect recognition.
+
+        Args:
+            image (numpy.ndarray): Preprocessed region
+            *extra: Additional values (e.g. a prompt) folded into the key
+
+        Returns:
+            bytes: Digest identifying the region pixels and options
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((image.shape, image.dtype.str, extra)).encode('utf-8'))
+        digest.update(memoryview(image).cast('B') if image.flags['C_CONTIGUOUS'] else image.tobytes())
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        """
+        Return the cached text for a region, or None on a miss.
+        """
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: bytes, text: str) -> None:
+        """
+        Store the recognized text for a region, evicting the oldest entries.
+        """
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Remove all cached regions.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return cache counters and size.
+
+        Returns:
+            dict: Hits, misses, evictions, hit ratio and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
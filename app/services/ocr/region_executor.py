@@ -0,0 +1,73 @@
+"""
+Shared thread pool for per-area recognition.
+
+Most of the time spent on a region is inside calls that release the GIL:
+the `tesseract` subprocess or C-API and GenAI network I/O. Running the
+areas of an invoice on a thread pool makes its latency follow the slowest
+field instead of the sum of all fields. EasyOCR does not use the pool,
+since torch already runs each operator on its own threads. The pool is
+bounded and shared by every backend and request in the process, so
+concurrent requests cannot start an unbounded number of engine calls.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List
+from app.utils.config import REGION_WORKERS
+
+
+class RegionExecutor:
+    """
+    Bounded thread pool mapping a recognition function over regions.
+
+    Attributes:
+        workers (int): Maximum number of regions recognized at once (1 or less runs them in the caller)
+    """
+
+    def __init__(self, workers: int = REGION_WORKERS):
+        """
+        Initialize the executor; threads are started on first use.
+
+        Args:
+            workers (int): Maximum number of regions recognized at once
+        """
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr-region",
+                                                    initializer=self._mark_worker)
+            return self._executor
+
+    def _mark_worker(self) -> None:
+        self._local.worker = True
+
+    def map(self, fn: Callable, items: Iterable[tuple]) -> List:
+        """
+        Call fn(*item) for every item and return the results in input order.
+
+        Runs in the calling thread when the pool is disabled, when there is
+        only one item, or when called from a pool thread (a nested map would
+        otherwise wait on the threads it occupies).
+
+        Args:
+            fn (Callable): Recognition function
+            items (Iterable[tuple]): Positional arguments of each call
+
+        Returns:
+            list: Result of each call, in input order
+
+        Raises:
+            Exception: The first exception raised by a call, in input order
+        """
+        items = list(items)
+        if self.workers <= 1 or len(items) < 2 or getattr(self._local, 'worker', False):
+            return [fn(*item) for item in items]
+        return list(self._get_executor().map(lambda item: fn(*item), items))
+
+
+# Region threads shared by every backend and request in the process
+region_executor = RegionExecutor()
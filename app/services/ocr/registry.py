@@ -0,0 +1,236 @@
+"""
+Lazy OCR backend registry.
+
+Backends are created the first time they are requested instead of at
+import time, so the application starts serving immediately and only
+loads the libraries (torch, EasyOCR models, GenAI client) it actually
+uses. Backends can also be warmed up in the background ahead of traffic.
+
+Instances built with options (one per GenAI API key) are capped: past
+max_keyed_instances, the least recently used one is dropped. Requests
+still holding it finish normally; it is garbage collected afterwards.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+from app.utils.config import BACKEND_MAX_KEYED_INSTANCES
+
+OCR_BACKENDS = ('pytesseract', 'easyocr', 'genai', 'cascade')
+
+
+def backend_options(name: str, genai_api_key: Optional[str] = None) -> dict:
+    """
+    Return the construction options of a backend for a request.
+
+    Args:
+        name (str): Backend name
+        genai_api_key (Optional[str]): API key sent with the request
+
+    Returns:
+        dict: Options for BackendRegistry.get(); 'genai' always takes the API key,
+            'cascade' only when one is given (it then adds a GenAI tier)
+    """
+    if name == 'genai' or (name == 'cascade' and genai_api_key):
+        return {"api_key": genai_api_key}
+    return {}
+
+
+def _create_pytesseract():
+    from app.services.ocr.pytesseract_backend import PytesseractOCR
+    return PytesseractOCR()
+
+
+def _create_easyocr():
+    from app.services.ocr.easyocr_backend import EasyOCRBackend
+    return EasyOCRBackend()
+
+
+def _create_genai(api_key):
+    from app.services.ocr.genai_backend import GenAIOCRBackend
+    return GenAIOCRBackend(api_key)
+
+
+def _create_cascade(api_key=None):
+    from app.services.ocr.cascade_backend import CascadeOCRBackend
+    return CascadeOCRBackend(api_key)
+
+
+class BackendRegistry:
+    """
+    Thread-safe registry creating OCR backends on first use.
+
+    Instances are keyed by backend name and construction options (e.g. the
+    GenAI API key), and each is built exactly once even under concurrent
+    requests.
+
+    Attributes:
+        max_keyed_instances (int): Instances built with options kept at most, least recently used evicted first
+    """
+
+    def __init__(self, max_keyed_instances: int = BACKEND_MAX_KEYED_INSTANCES):
+        self.max_keyed_instances = max(1, max_keyed_instances)
+        self._factories: Dict[str, Callable] = {}
+        self._instances: "OrderedDict[tuple, object]" = OrderedDict()
+        self._load_locks: Dict[tuple, threading.Lock] = {}
+        self._states: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, name: str, factory: Callable) -> None:
+        """
+        Register a backend factory.
+
+        Args:
+            name (str): Backend name used in requests
+            factory (Callable): Callable building the backend from keyword options
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._states.setdefault(name, {"state": "not_loaded", "load_seconds": None, "error": None})
+
+    def names(self):
+        """
+        Return the names of all registered backends.
+        """
+        return list(self._factories)
+
+    def get(self, name: str, **options):
+        """
+        Return a backend, creating it on first use.
+
+        Args:
+            name (str): Backend name
+            **options: Construction options (e.g. api_key for 'genai')
+
+        Returns:
+            OCRInterface: Backend instance
+
+        Raises:
+            ValueError: If the backend name is unknown
+            Exception: If the backend fails to initialize
+        """
+        if name not in self._factories:
+            raise ValueError(f"Unknown OCR backend '{name}'")
+
+        key = (name, tuple(sorted(options.items())))
+        instance = self._instances.get(key)
+        if instance is not None:
+            if options:
+                self._touch(key)
+            return instance
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            instance = self._instances.get(key)
+            if instance is not None:
+                return instance
+
+            self._update_state(name, state="loading", error=None)
+            start = time.perf_counter()
+            try:
+                instance = self._factories[name](**options)
+            except Exception as e:
+                self._update_state(name, state="failed", error=str(e))
+                self.logger.error(f"Failed to load OCR backend '{name}': {e}")
+                raise
+
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._instances[key] = instance
+                if options:
+                    self._evict_keyed()
+            self._update_state(name, state="ready", load_seconds=round(elapsed, 3))
+            self.logger.info(f"OCR backend '{name}' loaded in {elapsed:.2f}s")
+            return instance
+
+    def _touch(self, key: tuple) -> None:
+        with self._lock:
+            if key in self._instances:
+                self._instances.move_to_end(key)
+
+    def _evict_keyed(self) -> None:
+        # Caller holds the lock; the dict is in least recently used order
+        keyed = [key for key in self._instances if key[1]]
+        for key in keyed[:len(keyed) - self.max_keyed_instances]:
+            del self._instances[key]
+            self._load_locks.pop(key, None)
+            self.logger.info(f"Evicted least recently used OCR backend instance '{key[0]}'")
+
+    def _update_state(self, name: str, **fields) -> None:
+        with self._lock:
+            self._states[name].update(fields)
+
+    def is_ready(self, name: str) -> bool:
+        """
+        Return True if at least one instance of the backend is loaded.
+        """
+        with self._lock:
+            return self._states.get(name, {}).get("state") == "ready"
+
+    def instances(self, name: Optional[str] = None):
+        """
+        Return the loaded backend instances, optionally for one backend only.
+        """
+        with self._lock:
+            return [instance for (instance_name, _), instance in self._instances.items()
+                    if name is None or instance_name == name]
+
+    def warmup(self, names: Iterable[str], background: bool = True) -> Optional[threading.Thread]:
+        """
+        Preload backends so the first request does not pay their load time.
+
+        Args:
+            names (Iterable[str]): Backends to load; backends that need
+                construction options (such as 'genai') cannot be warmed up
+            background (bool): Load in a daemon thread instead of blocking
+
+        Returns:
+            Optional[threading.Thread]: The loader thread when running in the background
+
+        Raises:
+            ValueError: If a backend name is unknown
+        """
+        names = [name for name in names if name]
+        for name in names:
+            if name not in self._factories:
+                raise ValueError(f"Unknown OCR backend '{name}'")
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    # Failure is recorded in the backend state
+                    pass
+
+        if not background:
+            load_all()
+            return None
+
+        thread = threading.Thread(target=load_all, name="ocr-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        """
+        Return the load state of every registered backend.
+
+        Returns:
+            dict: {name: {'state', 'load_seconds', 'error', 'instances'}}
+        """
+        with self._lock:
+            counts = {}
+            for instance_name, _ in self._instances:
+                counts[instance_name] = counts.get(instance_name, 0) + 1
+            return {name: {**state, "instances": counts.get(name, 0)} for name, state in self._states.items()}
+
+
+backend_registry = BackendRegistry()
+backend_registry.register('pytesseract', _create_pytesseract)
+backend_registry.register('easyocr', _create_easyocr)
+backend_registry.register('genai', _create_genai)
+backend_registry.register('cascade', _create_cascade)
@@ -0,0 +1,130 @@
+"""
+Region resize policies.
+
+Engines read text best at a certain text height, so small regions are
+enlarged before recognition. The legacy policy enlarges every region 3x
+with Lanczos interpolation, which turns already large regions into 9x the
+pixels at the slowest interpolation. The adaptive policy instead derives
+the scale from the region height and the engine's target text height, and
+picks a cheaper interpolation when the scale allows it:
+
+- scale >= 2: bicubic (close to Lanczos on text at a fraction of the cost)
+- 1 < scale < 2: bilinear
+- scale < 1: area averaging
+
+Policies can be overridden per template or per area with a 'resize'
+option in the extended template format:
+
+    areas:
+      area_1:
+        box: [x, y, width, height]
+        resize: {target_height: 48, lines: 2, interpolation: cubic}
+"""
+import cv2
+from app.utils.config import RESIZE_MODE, RESIZE_MAX_SCALE, RESIZE_INTERPOLATION
+
+INTERPOLATIONS = {
+    'nearest': cv2.INTER_NEAREST,
+    'linear': cv2.INTER_LINEAR,
+    'area': cv2.INTER_AREA,
+    'cubic': cv2.INTER_CUBIC,
+    'lanczos': cv2.INTER_LANCZOS4,
+}
+
+RESIZE_MODES = ('adaptive', 'fixed')
+
+# Scales this close to 1 leave the region untouched
+_SCALE_TOLERANCE = 0.05
+
+
+class ResizePolicy:
+    """
+    How a preprocessed region is scaled before recognition.
+
+    Attributes:
+        mode (str): 'adaptive' (scale from the region height) or 'fixed' (always fixed_scale)
+        target_height (int): Text line height in pixels the engine works best at
+        lines (int): Text lines expected in the region, used to estimate the text height
+        min_scale (float): Smallest scale applied in 'adaptive' mode
+        max_scale (float): Largest scale applied in 'adaptive' mode
+        fixed_scale (float): Scale applied in 'fixed' mode
+        interpolation (str): 'auto' or one of INTERPOLATIONS
+    """
+
+    OPTIONS = ('mode', 'target_height', 'lines', 'min_scale', 'max_scale', 'fixed_scale', 'interpolation')
+
+    def __init__(self, mode=RESIZE_MODE, target_height=48, lines=1, min_scale=1.0, max_scale=RESIZE_MAX_SCALE,
+                 fixed_scale=3.0, interpolation=RESIZE_INTERPOLATION):
+        """
+        Create a policy.
+
+        Raises:
+            ValueError: If an option is out of range or unknown
+        """
+        if mode not in RESIZE_MODES:
+            raise ValueError(f"Unknown resize mode '{mode}'")
+        if interpolation != 'auto' and interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation '{interpolation}'")
+        if target_height <= 0 or lines < 1 or min_scale <= 0 or max_scale < min_scale or fixed_scale <= 0:
+            raise ValueError("Resize heights, line counts and scales must be positive, with min_scale <= max_scale")
+        self.mode = mode
+        self.target_height = target_height
+        self.lines = int(lines)
+        self.min_scale = float(min_scale)
+        self.max_scale = float(max_scale)
+        self.fixed_scale = float(fixed_scale)
+        self.interpolation = interpolation
+
+    def with_options(self, options) -> "ResizePolicy":
+        """
+        Return a copy of the policy with some options overridden.
+
+        Args:
+            options (dict): Policy options, e.g. {'target_height': 64, 'interpolation': 'linear'}
+
+        Raises:
+            ValueError: If an option is unknown or invalid
+        """
+        if not isinstance(options, dict):
+            raise ValueError("'resize' must be a mapping of resize options")
+        unknown = set(options) - set(self.OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown resize option(s): {', '.join(sorted(map(str, unknown)))}")
+        return ResizePolicy(**{**self.describe(), **options})
+
+    def describe(self) -> dict:
+        return {name: getattr(self, name) for name in self.OPTIONS}
+
+    def scale_for(self, height: int) -> float:
+        """
+        Return the scale applied to a region of the given height.
+        """
+        if self.mode == 'fixed':
+            return self.fixed_scale
+        text_height = max(1.0, height / self.lines)
+        return min(self.max_scale, max(self.min_scale, self.target_height / text_height))
+
+    def interpolation_for(self, scale: float) -> int:
+        """
+        Return the OpenCV interpolation flag used for a scale.
+        """
+        if self.interpolation != 'auto':
+            return INTERPOLATIONS[self.interpolation]
+        if scale >= 2:
+            return cv2.INTER_CUBIC
+        return cv2.INTER_LINEAR if scale > 1 else cv2.INTER_AREA
+
+    def apply(self, image):
+        """
+        Scale a region.
+
+        Args:
+            image (numpy.ndarray): Preprocessed region
+
+        Returns:
+            numpy.ndarray: Scaled region (the input itself when no scaling is needed)
+        """
+        scale = self.scale_for(image.shape[0])
+        if abs(scale - 1) < _SCALE_TOLERANCE:
+            return image
+        return cv2.resize(image, None, fx=scale, fy=scale, interpolation=self.interpolation_for(scale))
@@ -0,0 +1,325 @@
+"""
+Named detection templates.
+
+A template describes where the fields of one invoice layout are printed.
+Templates are YAML files named '<template>.yaml' in the templates
+directory; 'detection_areas' is the default one written by /upload_yaml.
+
+Two formats are accepted:
+
+    # Legacy: one box per area
+    area_1: [x, y, width, height]
+
+    # Extended: a box plus per-area options, and template-wide options
+    areas:
+      area_1:
+        box: [x, y, width, height]
+        field: invoice_number
+        <option>: <value>
+    <option>: <value>
+
+'field' names the invoice field an area fills (templates without any use
+text_parser.AREA_MAPPING); 'profile' and 'profiles' are described in
+profiles.py, 'resize' in resize.py, 'ink' in ink.py, 'preprocess' and
+'page_preprocess' in preprocessing.py, and 'format' and 'optional' (the
+cascade backend's field checks) in field_formats.py and cascade_backend.py.
+Any other option is rejected, so a misspelled option does not go unnoticed.
+
+Each file is parsed and validated once; the registry keeps the compiled
+template and only parses it again when the file's mtime changes.
+"""
+import os
+import re
+import logging
+import tempfile
+import threading
+from typing import Dict, List, Optional
+import yaml
+from app.services.ocr.field_formats import compile_format
+from app.services.ocr.ink import InkPolicy
+from app.services.ocr.preprocessing import validate_steps
+from app.services.ocr.profiles import resolve_profile
+from app.services.ocr.resize import ResizePolicy
+from app.utils.config import TEMPLATES_DIR, DEFAULT_TEMPLATE
+from app.utils.text_parser import AREA_MAPPING
+
+TEMPLATE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Options an area may set, and options only valid template-wide
+AREA_OPTIONS = ('field', 'profile', 'resize', 'ink', 'preprocess', 'format', 'optional')
+TEMPLATE_OPTIONS = ('profiles', 'page_preprocess')
+
+
+class Template:
+    """
+    Validated, compiled detection template.
+
+    Attributes:
+        name (Optional[str]): Template name
+        area_names (tuple): Area names in file order
+        areas (dict): Box per area, {'area_name': [x, y, w, h]}, as used by the OCR backends
+        area_options (Dict[str, dict]): Extra options per area (extended format)
+        options (dict): Template-wide options (extended format)
+        region_options (Dict[str, dict]): Options per area, template-wide options merged
+            with the area's own (nested mappings such as 'resize' are merged key by key);
+            'profile' holds the resolved profile options
+        page_steps (list): Preprocessing steps run once on the decoded page
+        field_mapping (Dict[str, str]): Invoice field per area
+        mtime (Optional[int]): Modification time (ns) of the file it was parsed from
+    """
+
+    def __init__(self, name: Optional[str], areas: Dict[str, List[int]], area_options: Dict[str, dict],
+                 options: dict, mtime: Optional[int] = None):
+        self.name = name
+        self.area_names = tuple(areas)
+        self.areas = areas
+        self.area_options = area_options
+        self.options = options
+        self.mtime = mtime
+
+        self.region_options = {}
+        for area_name in self.area_names:
+            merged = {key: value for key, value in options.items() if key not in ('profiles', 'page_preprocess')}
+            for key, value in area_options.get(area_name, {}).items():
+                if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                    value = {**merged[key], **value}
+                merged[key] = value
+            if 'profile' in merged:
+                try:
+                    merged['profile'] = resolve_profile(merged['profile'], options.get('profiles')).describe()
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Area '{area_name}' has an invalid profile: {e}")
+            self.region_options[area_name] = merged
+
+        try:
+            self.page_steps = validate_steps(options.get('page_preprocess', []))
+        except ValueError as e:
+            raise ValueError(f"Invalid 'page_preprocess' option: {e}")
+
+        fields = {area_name: area_options[area_name]['field'] for area_name in self.area_names
+                  if 'field' in area_options.get(area_name, {})}
+        if not all(isinstance(field, str) and field for field in fields.values()):
+            raise ValueError("Area 'field' options must be non-empty strings")
+        self.field_mapping = fields or dict(AREA_MAPPING)
+
+    def describe(self) -> dict:
+        return {"name": self.name, "areas": self.areas, "fields": self.field_mapping,
+                "area_options": self.area_options, "options": self.options}
+
+
+def _parse_box(area_name: str, box) -> List[int]:
+    if not isinstance(box, (list, tuple)) or len(box) != 4:
+        raise ValueError(f"Area '{area_name}' must be a list [x, y, width, height]")
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in box):
+        raise ValueError(f"Area '{area_name}' coordinates must be integers")
+    x, y, width, height = box
+    if x < 0 or y < 0 or width <= 0 or height <= 0:
+        raise ValueError(f"Area '{area_name}' must have a non-negative origin and a positive size")
+    return list(box)
+
+
+def parse_template(data, name: Optional[str] = None, mtime: Optional[int] = None) -> Template:
+    """
+    Validate parsed YAML and compile it into a Template.
+
+    Args:
+        data: Result of yaml.safe_load on a template file
+        name (Optional[str]): Template name
+        mtime (Optional[int]): Modification time (ns) of the source file
+
+    Returns:
+        Template: Compiled template
+
+    Raises:
+        ValueError: If the template is malformed
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValueError("A template must be a non-empty mapping of areas")
+
+    options = {}
+    area_options = {}
+    if 'areas' in data:
+        areas = data['areas']
+        if not isinstance(areas, dict) or not areas:
+            raise ValueError("'areas' must be a non-empty mapping")
+        options = {key: value for key, value in data.items() if key != 'areas'}
+        unknown = set(options) - set(AREA_OPTIONS) - set(TEMPLATE_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown template option(s): {', '.join(sorted(map(str, unknown)))}")
+        boxes = {}
+        for area_name, area in areas.items():
+            if isinstance(area, dict):
+                if 'box' not in area:
+                    raise ValueError(f"Area '{area_name}' has no 'box'")
+                boxes[str(area_name)] = _parse_box(area_name, area['box'])
+                area_options[str(area_name)] = {key: value for key, value in area.items() if key != 'box'}
+                unknown = set(area_options[str(area_name)]) - set(AREA_OPTIONS)
+                if unknown:
+                    raise ValueError(f"Area '{area_name}' has unknown option(s): "
+                                     f"{', '.join(sorted(map(str, unknown)))}")
+            else:
+                boxes[str(area_name)] = _parse_box(area_name, area)
+    else:
+        boxes = {str(area_name): _parse_box(area_name, box) for area_name, box in data.items()}
+
+    template = Template(name, boxes, area_options, options, mtime)
+    for area_name, region_options in template.region_options.items():
+        if 'resize' in region_options:
+            try:
+                ResizePolicy().with_options(region_options['resize'])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Area '{area_name}' has an invalid 'resize' option: {e}")
+        if 'preprocess' in region_options:
+            try:
+                validate_steps(region_options['preprocess'])
+            except ValueError as e:
+                raise ValueError(f"Area '{area_name}' has an invalid 'preprocess' option: {e}")
+        if 'ink' in region_options:
+            try:
+                InkPolicy().with_options(region_options['ink'])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Area '{area_name}' has an invalid 'ink' option: {e}")
+        if 'format' in region_options:
+            try:
+                compile_format(region_options['format'])
+            except ValueError as e:
+                raise ValueError(f"Area '{area_name}' has an invalid 'format' option: {e}")
+        if not isinstance(region_options.get('optional', False), bool):
+            raise ValueError(f"Area '{area_name}' option 'optional' must be true or false")
+    return template
+
+
+class TemplateRegistry:
+    """
+    Cache of compiled templates with mtime-based invalidation.
+
+    Attributes:
+        directory (str): Directory holding the '<template>.yaml' files
+    """
+
+    def __init__(self, directory: str = TEMPLATES_DIR):
+        """
+        Initialize an empty registry.
+
+        Args:
+            directory (str): Directory holding the template files
+        """
+        self.directory = directory
+        self.logger = logging.getLogger(__name__)
+        self._templates: Dict[str, Template] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> str:
+        """
+        Return the file path of a template.
+
+        Raises:
+            ValueError: If the name is not a valid template name
+        """
+        if not isinstance(name, str) or not TEMPLATE_NAME_PATTERN.match(name):
+            raise ValueError("Template names may only contain letters, digits, '_' and '-'")
+        return os.path.join(self.directory, f"{name}.yaml")
+
+    def get(self, name: Optional[str] = None) -> Template:
+        """
+        Return a template by name, parsing its file only if it changed.
+
+        Args:
+            name (Optional[str]): Template name (default: DEFAULT_TEMPLATE)
+
+        Returns:
+            Template: Compiled template
+
+        Raises:
+            ValueError: If the template does not exist or is malformed
+        """
+        name = name or DEFAULT_TEMPLATE
+        path = self.path_for(name)
+        if not os.path.exists(path):
+            raise ValueError(f"Template '{name}' does not exist")
+        return self.load(path, name)
+
+    def load(self, path: str, name: Optional[str] = None) -> Template:
+        """
+        Return the compiled template of a file, parsing it only if it changed.
+
+        Args:
+            path (str): Path to the template file
+            name (Optional[str]): Template name
+
+        Returns:
+            Template: Compiled template
+
+        Raises:
+            IOError: If the file cannot be read
+            ValueError: If the template is malformed
+        """
+        mtime = os.stat(path).st_mtime_ns
+        key = os.path.abspath(path)
+        with self._lock:
+            template = self._templates.get(key)
+        if template is not None and template.mtime == mtime:
+            return template
+
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Template '{name or path}' is not valid YAML: {e}")
+        template = parse_template(data, name, mtime)
+        with self._lock:
+            self._templates[key] = template
+        return template
+
+    def save(self, name: str, content: bytes) -> Template:
+        """
+        Validate and store a template, replacing any previous version atomically.
+
+        The file is written to a temporary path and renamed, so concurrent
+        requests see either the old or the new template, never a partial one.
+
+        Args:
+            name (str): Template name
+            content (bytes): YAML document
+
+        Returns:
+            Template: Compiled template
+
+        Raises:
+            ValueError: If the name or the template is invalid
+        """
+        path = self.path_for(name)
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Template '{name}' is not valid YAML: {e}")
+        template = parse_template(data, name)
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            with self._lock:
+                os.replace(tmp_path, path)
+                template.mtime = os.stat(path).st_mtime_ns
+                self._templates[os.path.abspath(path)] = template
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.logger.info(f"Saved template '{name}' with {len(template.area_names)} area(s)")
+        return template
+
+    def names(self) -> List[str]:
+        """
+        Return the names of the available templates.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(filename)[0] for filename in os.listdir(self.directory)
+                      if filename.endswith('.yaml') and TEMPLATE_NAME_PATTERN.match(os.path.splitext(filename)[0]))
+
+
+# Templates shared by every backend and request in the process
+template_registry = TemplateRegistry()
@@ -0,0 +1,192 @@
+"""
+Pool of in-process Tesseract engines.
+
+`pytesseract.image_to_string` starts a new `tesseract` process for every
+call, writes the region to a temporary file and reloads the traineddata.
+This module keeps a fixed number of initialized engines from the
+`tesserocr` C-API binding and hands them out per region, so start-up and
+model loading are paid once per engine instead of once per region.
+
+`tesserocr` is an optional dependency; callers should check
+`TESSEROCR_AVAILABLE` and fall back to pytesseract when it is missing.
+
+Engines already run on the region threads in parallel, so Tesseract's own
+OpenMP threads would oversubscribe the cores. OpenMP reads
+OMP_THREAD_LIMIT once, when its runtime loads, so the limit is set to 1
+while tesserocr is imported (unless already set) and restored afterwards,
+leaving other OpenMP users such as torch unaffected.
+"""
+import os
+import queue
+import shlex
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+_omp_limit_preset = 'OMP_THREAD_LIMIT' in os.environ
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    tesserocr = None
+    TESSEROCR_AVAILABLE = False
+finally:
+    if not _omp_limit_preset:
+        del os.environ['OMP_THREAD_LIMIT']
+
+
+def parse_tesseract_config(config: str) -> Dict[str, object]:
+    """
+    Parse a pytesseract style config string.
+
+    Args:
+        config (str): Command line options, e.g. "--psm 12 --oem 1 -c key=value"
+
+    Returns:
+        dict: {'psm': int or None, 'oem': int or None, 'variables': {name: value}}
+
+    Raises:
+        ValueError: If the config contains an option the engine pool cannot apply
+    """
+    options = {"psm": None, "oem": None, "variables": {}}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in ('--psm', '--oem') and i + 1 < len(tokens):
+            options[token[2:]] = int(tokens[i + 1])
+            i += 2
+        elif token == '-c' and i + 1 < len(tokens) and '=' in tokens[i + 1]:
+            name, value = tokens[i + 1].split('=', 1)
+            options["variables"][name] = value
+            i += 2
+        else:
+            raise ValueError(f"Unsupported Tesseract option for the engine pool: {token}")
+    return options
+
+
+class TesseractEnginePool:
+    """
+    Fixed-size pool of initialized tesserocr engines.
+
+    Each engine is used by one thread at a time; callers block until an
+    engine is free.
+
+    Attributes:
+        size (int): Number of engines in the pool
+        lang (str): Tesseract language string, e.g. 'ara2+eng'
+        config (str): pytesseract style options applied to every engine
+    """
+
+    def __init__(self, size: int, lang: str, config: str, tessdata_path: Optional[str] = None):
+        """
+        Start the engines.
+
+        Args:
+            size (int): Number of engines to start
+            lang (str): Tesseract language string
+            config (str): Options such as "--psm 12 --oem 1"
+            tessdata_path (Optional[str]): Directory holding the traineddata files
+
+        Raises:
+            ImportError: If tesserocr is not installed
+            RuntimeError: If an engine fails to initialize
+        """
+        if not TESSEROCR_AVAILABLE:
+            raise ImportError("tesserocr is required for the pooled Tesseract mode")
+
+        self.size = max(1, size)
+        self.lang = lang
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+
+        options = parse_tesseract_config(config)
+        init_kwargs = {"lang": lang}
+        if tessdata_path:
+            init_kwargs["path"] = tessdata_path
+        if options["psm"] is not None:
+            init_kwargs["psm"] = options["psm"]
+        if options["oem"] is not None:
+            init_kwargs["oem"] = options["oem"]
+
+        self._engines: "queue.Queue" = queue.Queue()
+        self._all = []
+        self.default_psm = None
+        for _ in range(self.size):
+            api = tesserocr.PyTessBaseAPI(**init_kwargs)
+            for name, value in options["variables"].items():
+                if not api.SetVariable(name, value):
+                    api.End()
+                    raise RuntimeError(f"Tesseract rejected variable {name}={value}")
+            self._all.append(api)
+            self._engines.put(api)
+        self.default_psm = self._all[0].GetPageSegMode()
+        self.logger.info(f"Started {self.size} Tesseract engine(s) for '{lang}' ({config})")
+
+    @contextmanager
+    def engine(self):
+        """
+        Check out an engine for the duration of a with-block.
+        """
+        api = self._engines.get()
+        try:
+            yield api
+        finally:
+            self._engines.put(api)
+
+    def image_to_string(self, image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> str:
+        """
+        Recognize a grayscale region with a pooled engine.
+
+        Args:
+            image (numpy.ndarray): 8-bit grayscale region
+            psm (Optional[int]): Page segmentation mode for this call only
+            whitelist (Optional[str]): Characters allowed in the output, for this call only
+
+        Returns:
+            str: Recognized text
+        """
+        return self.image_to_string_with_confidence(image, psm, whitelist)[0]
+
+    def image_to_string_with_confidence(self, image, psm: Optional[int] = None,
+                                        whitelist: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Recognize a grayscale region and report Tesseract's mean word confidence.
+
+        Args:
+            image (numpy.ndarray): 8-bit grayscale region
+            psm (Optional[int]): Page segmentation mode for this call only
+            whitelist (Optional[str]): Characters allowed in the output, for this call only
+
+        Returns:
+            Tuple[str, float]: Recognized text and its confidence between 0 and 1
+        """
+        if image.ndim != 2:
+            raise ValueError("The Tesseract engine pool expects a grayscale image")
+        height, width = image.shape
+        with self.engine() as api:
+            if psm is not None:
+                api.SetPageSegMode(psm)
+            if whitelist:
+                api.SetVariable("tessedit_char_whitelist", whitelist)
+            try:
+                api.SetImageBytes(image.tobytes(), width, height, 1, width)
+                text = api.GetUTF8Text()
+                confidence = api.MeanTextConf() / 100
+            finally:
+                # Restore the engine before it goes back to the pool
+                api.Clear()
+                if psm is not None:
+                    api.SetPageSegMode(self.default_psm)
+                if whitelist:
+                    api.SetVariable("tessedit_char_whitelist", "")
+        return text, confidence
+
+    def close(self) -> None:
+        """
+        Release all engines.
+        """
+        for api in self._all:
+            api.End()
+        self._all = []
@@ -0,0 +1,221 @@
+"""
+Content-addressed cache for invoice extraction results.
+
+Results are keyed by a hash of the image bytes, the detection areas, the
+OCR backend and the backend settings that decide its output, so the same
+invoice sent twice (by a client or by the Drive monitor) is answered
+without running OCR again. Two tiers are kept:
+
+- an in-memory LRU tier bounded by entry count
+- a persistent on-disk tier of JSON files bounded by total size
+
+The on-disk tier outlives the process, so CACHE_SCHEMA_VERSION is part of
+every key; bump it when a code change alters extraction results.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+from app.utils.config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_DISK_BYTES
+
+CACHE_SCHEMA_VERSION = 2
+
+
+class ExtractionCache:
+    """
+    Two-tier LRU cache for extraction results.
+
+    Attributes:
+        max_entries (int): Maximum number of results held in memory
+        cache_dir (Optional[str]): Directory of the on-disk tier (None disables it)
+        max_disk_bytes (int): Maximum total size of the on-disk tier
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, cache_dir: Optional[str] = RESULT_CACHE_DIR,
+                 max_disk_bytes: int = RESULT_CACHE_MAX_DISK_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of results held in memory
+            cache_dir (Optional[str]): Directory of the on-disk tier (None disables it)
+            max_disk_bytes (int): Maximum total size of the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.logger = logging.getLogger(__name__)
+
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    @staticmethod
+    def make_key(image_path: str, detection_areas: dict, backend_name: str,
+                 area_options: Optional[dict] = None, page_steps: Optional[list] = None,
+                 backend_config: Optional[dict] = None) -> str:
+        """
+        Build the cache key for an extraction request.
+
+        Args:
+            image_path (str): Path to the invoice image
+            detection_areas (dict): Areas to process, {'area_name': [x, y, w, h]}
+            backend_name (str): Name of the OCR backend
+            area_options (Optional[dict]): Template options per area that affect recognition
+            page_steps (Optional[list]): Preprocessing steps run on the decoded page
+            backend_config (Optional[dict]): Backend settings that affect recognition
+
+        Returns:
+            str: Hex digest identifying the image, area set, backend and its settings
+        """
+        digest = hashlib.sha256(f"v{CACHE_SCHEMA_VERSION}".encode('utf-8'))
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(json.dumps(detection_areas, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(backend_name.encode('utf-8'))
+        if area_options and any(area_options.values()):
+            digest.update(json.dumps(area_options, sort_keys=True, default=str).encode('utf-8'))
+        if page_steps:
+            digest.update(json.dumps(page_steps, sort_keys=True, default=str).encode('utf-8'))
+        if backend_config:
+            digest.update(json.dumps(backend_config, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _disk_entries(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.json'):
+                stat = entry.stat()
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def _remember(self, key: str, value: dict) -> None:
+        # Caller holds the lock
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["memory_evictions"] += 1
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a cached result.
+
+        Args:
+            key (str): Cache key from make_key()
+
+        Returns:
+            Optional[dict]: Cached result, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return self._memory[key]
+
+            if self.cache_dir:
+                path = self._disk_path(key)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        value = json.load(f)
+                    # Touch the file so disk eviction is least-recently-used too
+                    os.utime(path, None)
+                except FileNotFoundError:
+                    value = None
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+                    value = None
+                if value is not None:
+                    self._remember(key, value)
+                    self._counters["disk_hits"] += 1
+                    return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: dict) -> None:
+        """
+        Store a result in both tiers.
+
+        Args:
+            key (str): Cache key from make_key()
+            value (dict): JSON-serializable extraction result
+        """
+        with self._lock:
+            self._remember(key, value)
+            if not self.cache_dir:
+                return
+
+            path = self._disk_path(key)
+            try:
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(value, f)
+                os.replace(tmp_path, path)
+                self._disk_bytes += os.path.getsize(path) - previous
+            except OSError as e:
+                self.logger.error(f"Failed to write cache entry {key}: {e}")
+                return
+
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        # Caller holds the lock; remove least recently used files until under the limit
+        for path, _, size in sorted(self._disk_entries(), key=lambda entry: entry[1]):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                self._disk_bytes -= size
+                self._counters["disk_evictions"] += 1
+            except OSError as e:
+                self.logger.warning(f"Failed to evict cache entry {path}: {e}")
+
+    def clear(self) -> None:
+        """
+        Remove every entry from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self.cache_dir:
+                for path, _, _ in list(self._disk_entries()):
+                    os.remove(path)
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache counters and sizes.
+
+        Returns:
+            dict: Hit/miss/eviction counters, hit ratio and tier sizes
+        """
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else None,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+            }
@@ -5,12 +5,173 @@ Constants:
     CREDENTIALS_PATH (str): Path to Google OAuth2 credentials file
     TOKEN_PATH (str): Path to store OAuth2 tokens
     DOWNLOADS_DIR (str): Directory for downloaded and processed files
+    BATCH_WORKERS (int): Number of OCR worker processes per batch pool (one pool per backend and API key)
+    BATCH_MAX_POOLS (int): Batch worker pools kept alive at most (idle pools beyond this are shut down)
+    BATCH_MAX_FILES (int): Maximum number of files accepted by one batch request
+    RESULT_CACHE_DIR (str): Directory of the persistent extraction result cache
+    RESULT_CACHE_MAX_ENTRIES (int): Maximum number of results kept in memory
+    RESULT_CACHE_MAX_DISK_BYTES (int): Maximum total size of the on-disk result cache
+    REGION_CACHE_MAX_ENTRIES (int): Regions memoized per OCR backend (0 disables the region cache)
+    WARMUP_BACKENDS (List[str]): OCR backends preloaded in the background at startup
+    BACKEND_MAX_KEYED_INSTANCES (int): Backend instances built per API key kept loaded at most
+        (least recently used evicted first)
+    DECODE_MIN_REGION_HEIGHT (int): Smallest area height allowed after reduced JPEG decoding
+        (0, the default, always decodes at full resolution; reduced decoding trades detail
+        the engines may need for decode speed, so enable it only after checking accuracy)
+    TESSERACT_MODE (str): 'pool' (in-process engines via tesserocr), 'subprocess' (pytesseract) or 'auto'
+    TESSERACT_POOL_SIZE (int): Number of in-process Tesseract engines per language in 'pool' mode
+        (0 matches the region workers, which is 1 inside batch worker processes)
+    TESSERACT_LANGUAGES (List[str]): Language strings recognition profiles may request;
+        in 'pool' mode each one in use has its own engine pool
+    TESSDATA_PATH (Optional[str]): Directory holding the traineddata files for the engine pool
+    EASYOCR_MODE (str): 'detect' (detector + recognizer) or 'recognize' (recognizer only on the known areas)
+    EASYOCR_SPLIT_LINES (bool): Split areas into lines with a projection profile in 'recognize' mode
+    EASYOCR_BATCH_SIZE (int): Recognizer batch size in 'recognize' mode (1 recognizes regions one by one)
+    EASYOCR_WIDTH_BUCKET (int): Width step in pixels used to group line crops into batches
+    EASYOCR_INTRA_OP_THREADS (int): Torch threads per operator for EasyOCR (0 keeps the torch default)
+    EASYOCR_INTER_OP_THREADS (int): Torch threads across operators for EasyOCR (0 keeps the torch default)
+    EASYOCR_QUANTIZE (bool): Use dynamically int8-quantized EasyOCR models on CPU
+    GENAI_MODE (str): 'per_region' (one GenAI call per area) or 'single_call' (all areas in one call)
+    GENAI_MAX_CONCURRENCY (int): Maximum GenAI requests in flight per API key
+    GENAI_REQUESTS_PER_SECOND (float): Sustained GenAI request rate per API key (0 disables limiting)
+    GENAI_BURST (int): Requests allowed above the sustained rate in a burst
+    GENAI_MAX_RETRIES (int): Retries of throttled or transiently failing GenAI requests
+    GENAI_BACKOFF_BASE (float): Base delay in seconds of the jittered exponential backoff
+    GENAI_BACKOFF_MAX (float): Maximum backoff delay in seconds
+    JOB_QUEUE_SIZE (int): Maximum number of extraction jobs waiting in the queue
+    JOB_WORKERS (int): Number of threads running extraction jobs
+    JOB_RESULT_TTL (int): Seconds finished jobs are kept for polling
+    JOB_RETRY_AFTER (int): Retry-After hint in seconds returned when the job queue is full
+    MONITOR_STATE_PATH (str): File storing Drive change tokens and processed file IDs per monitored folder
+    MONITOR_MAX_ATTEMPTS (int): Failed attempts after which a monitored file is given up on
+        and no longer holds back the page token
+    MONITOR_STATE_SAVE_INTERVAL (float): Minimum seconds between monitor state saves
+        triggered by processed files (the state is always saved with a new page token)
+    DRIVE_CHUNK_SIZE (int): Bytes requested per chunk when streaming Drive downloads to disk
+    DRIVE_DOWNLOAD_WORKERS (int): Maximum number of concurrent Drive downloads
+    RESIZE_MODE (str): 'adaptive' (scale regions towards each engine's text height) or 'fixed' (always 3x)
+    RESIZE_MAX_SCALE (float): Largest enlargement applied by the adaptive resize policy
+    RESIZE_INTERPOLATION (str): 'auto' (bicubic/bilinear/area by scale) or a fixed
+        'nearest', 'linear', 'area', 'cubic' or 'lanczos'
+    TEMPLATES_DIR (str): Directory holding the named detection templates ('<template>.yaml')
+    DEFAULT_TEMPLATE (str): Template used when a request does not name one
+    DRIVE_BATCH_SIZE (int): Drive metadata requests sent in one batched HTTP call (Drive allows up to 100)
+    BATCH_INVOICES_PER_TASK (int): Invoices handed to a batch worker at once, so batched
+        backends can recognize the regions of several invoices together
+    PIPELINE_QUEUE_SIZE (int): Capacity of each queue between monitor pipeline stages
+    PIPELINE_CONCURRENCY (Dict[str, int]): Worker threads per pipeline stage
+        (download, decode, ocr, parse, sink), e.g. "download=4,ocr=2"
+    PIPELINE_RESULTS_PATH (str): JSON lines file receiving the invoices extracted by the monitor pipeline
+    PIPELINE_POLL_INTERVAL (int): Seconds between Drive change feed polls of a standalone pipeline
+    MONITOR_WORKERS (int): Threads shared by all folder monitors for polling
+    MONITOR_INTERVAL (float): Initial polling interval of a folder monitor in seconds
+    MONITOR_MIN_INTERVAL (float): Shortest adaptive polling interval in seconds (folder receiving files)
+    MONITOR_MAX_INTERVAL (float): Longest adaptive polling interval in seconds (idle folder)
+    CASCADE_TIERS (List[str]): Backends tried by the 'cascade' backend, cheapest first
+        ('genai' is skipped for requests without an API key)
+    CASCADE_MIN_CONFIDENCE (float): Lowest engine confidence (0-1) a field is accepted at
+        without escalating it to the next cascade tier
+    INK_GATE (bool): Skip regions without ink instead of sending them to the engine
+    INK_CROP (bool): Crop regions to the bounds of their text before resizing
+    INK_MIN_STD (float): Pixel standard deviation below which a region counts as blank
+    INK_MIN_RATIO (float): Share of ink pixels below which a region counts as blank
+    INK_MARGIN (int): Pixels kept around the text bounds when cropping
+    REGION_WORKERS (int): Threads shared by all backends to recognize the areas of an
+        invoice in parallel (1 recognizes them one by one)
 
 Note:
     All paths are relative to the application root directory
     Ensure write permissions for TOKEN_PATH and DOWNLOADS_DIR
+    Numeric settings can be overridden through environment variables
 """
+import os
 
 CREDENTIALS_PATH = 'client_secret.json'
 TOKEN_PATH = 'token.json'
-DOWNLOADS_DIR = 'downloads'
\ No newline at end of file
+DOWNLOADS_DIR = 'downloads'
+
+BATCH_WORKERS = int(os.environ.get('OCR_BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_MAX_POOLS = int(os.environ.get('OCR_BATCH_MAX_POOLS', 4))
+BATCH_MAX_FILES = int(os.environ.get('OCR_BATCH_MAX_FILES', 500))
+
+RESULT_CACHE_DIR = os.environ.get('OCR_RESULT_CACHE_DIR', os.path.join('cache', 'results'))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('OCR_RESULT_CACHE_MAX_ENTRIES', 1024))
+RESULT_CACHE_MAX_DISK_BYTES = int(os.environ.get('OCR_RESULT_CACHE_MAX_DISK_BYTES', 256 * 1024 * 1024))
+
+REGION_CACHE_MAX_ENTRIES = int(os.environ.get('OCR_REGION_CACHE_MAX_ENTRIES', 4096))
+
+WARMUP_BACKENDS = [name.strip() for name in os.environ.get('OCR_WARMUP_BACKENDS', 'pytesseract').split(',') if name.strip()]
+BACKEND_MAX_KEYED_INSTANCES = int(os.environ.get('OCR_BACKEND_MAX_KEYED_INSTANCES', 16))
+
+DECODE_MIN_REGION_HEIGHT = int(os.environ.get('OCR_DECODE_MIN_REGION_HEIGHT', 0))
+
+TESSERACT_MODE = os.environ.get('OCR_TESSERACT_MODE', 'auto')
+TESSERACT_POOL_SIZE = int(os.environ.get('OCR_TESSERACT_POOL_SIZE', 0))
+TESSERACT_LANGUAGES = [lang.strip() for lang in os.environ.get('OCR_TESSERACT_LANGUAGES', 'ara2+eng,eng,ara2').split(',')
+                       if lang.strip()]
+TESSDATA_PATH = os.environ.get('TESSDATA_PREFIX')
+
+EASYOCR_MODE = os.environ.get('OCR_EASYOCR_MODE', 'detect')
+EASYOCR_SPLIT_LINES = os.environ.get('OCR_EASYOCR_SPLIT_LINES', 'true').lower() in ('1', 'true', 'yes')
+
+EASYOCR_BATCH_SIZE = int(os.environ.get('OCR_EASYOCR_BATCH_SIZE', 16))
+EASYOCR_WIDTH_BUCKET = int(os.environ.get('OCR_EASYOCR_WIDTH_BUCKET', 64))
+BATCH_INVOICES_PER_TASK = int(os.environ.get('OCR_BATCH_INVOICES_PER_TASK', 1))
+
+EASYOCR_INTRA_OP_THREADS = int(os.environ.get('OCR_EASYOCR_INTRA_OP_THREADS', 0))
+EASYOCR_INTER_OP_THREADS = int(os.environ.get('OCR_EASYOCR_INTER_OP_THREADS', 0))
+EASYOCR_QUANTIZE = os.environ.get('OCR_EASYOCR_QUANTIZE', 'true').lower() in ('1', 'true', 'yes')
+
+GENAI_MODE = os.environ.get('OCR_GENAI_MODE', 'per_region')
+GENAI_MAX_CONCURRENCY = int(os.environ.get('OCR_GENAI_MAX_CONCURRENCY', 4))
+GENAI_REQUESTS_PER_SECOND = float(os.environ.get('OCR_GENAI_REQUESTS_PER_SECOND', 2))
+GENAI_BURST = int(os.environ.get('OCR_GENAI_BURST', 4))
+GENAI_MAX_RETRIES = int(os.environ.get('OCR_GENAI_MAX_RETRIES', 4))
+GENAI_BACKOFF_BASE = float(os.environ.get('OCR_GENAI_BACKOFF_BASE', 1.0))
+GENAI_BACKOFF_MAX = float(os.environ.get('OCR_GENAI_BACKOFF_MAX', 30.0))
+
+JOB_QUEUE_SIZE = int(os.environ.get('OCR_JOB_QUEUE_SIZE', 100))
+JOB_WORKERS = int(os.environ.get('OCR_JOB_WORKERS', 2))
+JOB_RESULT_TTL = int(os.environ.get('OCR_JOB_RESULT_TTL', 3600))
+JOB_RETRY_AFTER = int(os.environ.get('OCR_JOB_RETRY_AFTER', 5))
+
+MONITOR_STATE_PATH = os.environ.get('OCR_MONITOR_STATE_PATH', 'monitor_state.json')
+MONITOR_STATE_SAVE_INTERVAL = float(os.environ.get('OCR_MONITOR_STATE_SAVE_INTERVAL', 5))
+MONITOR_MAX_ATTEMPTS = int(os.environ.get('OCR_MONITOR_MAX_ATTEMPTS', 3))
+DRIVE_CHUNK_SIZE = int(os.environ.get('OCR_DRIVE_CHUNK_SIZE', 4 * 1024 * 1024))
+DRIVE_DOWNLOAD_WORKERS = int(os.environ.get('OCR_DRIVE_DOWNLOAD_WORKERS', 4))
+
+PIPELINE_QUEUE_SIZE = int(os.environ.get('OCR_PIPELINE_QUEUE_SIZE', 16))
+PIPELINE_CONCURRENCY = {'download': 4, 'decode': 2, 'ocr': 1, 'parse': 1, 'sink': 1}
+for _item in os.environ.get('OCR_PIPELINE_CONCURRENCY', '').split(','):
+    if '=' in _item:
+        _stage, _workers = _item.split('=', 1)
+        PIPELINE_CONCURRENCY[_stage.strip()] = int(_workers)
+PIPELINE_RESULTS_PATH = os.environ.get('OCR_PIPELINE_RESULTS_PATH', os.path.join('results', 'invoices.jsonl'))
+PIPELINE_POLL_INTERVAL = int(os.environ.get('OCR_PIPELINE_POLL_INTERVAL', 60))
+
+MONITOR_WORKERS = int(os.environ.get('OCR_MONITOR_WORKERS', 4))
+MONITOR_INTERVAL = float(os.environ.get('OCR_MONITOR_INTERVAL', 60))
+MONITOR_MIN_INTERVAL = float(os.environ.get('OCR_MONITOR_MIN_INTERVAL', 10))
+MONITOR_MAX_INTERVAL = float(os.environ.get('OCR_MONITOR_MAX_INTERVAL', 600))
+
+DRIVE_BATCH_SIZE = int(os.environ.get('OCR_DRIVE_BATCH_SIZE', 100))
+
+TEMPLATES_DIR = os.environ.get('OCR_TEMPLATES_DIR', DOWNLOADS_DIR)
+DEFAULT_TEMPLATE = os.environ.get('OCR_DEFAULT_TEMPLATE', 'detection_areas')
+
+RESIZE_MODE = os.environ.get('OCR_RESIZE_MODE', 'adaptive')
+RESIZE_MAX_SCALE = float(os.environ.get('OCR_RESIZE_MAX_SCALE', 3.0))
+RESIZE_INTERPOLATION = os.environ.get('OCR_RESIZE_INTERPOLATION', 'auto')
+
+CASCADE_TIERS = [name.strip() for name in os.environ.get('OCR_CASCADE_TIERS', 'pytesseract,easyocr,genai').split(',')
+                 if name.strip()]
+CASCADE_MIN_CONFIDENCE = float(os.environ.get('OCR_CASCADE_MIN_CONFIDENCE', 0.6))
+
+REGION_WORKERS = int(os.environ.get('OCR_REGION_WORKERS', min(8, os.cpu_count() or 1)))
+
+INK_GATE = os.environ.get('OCR_INK_GATE', 'true').lower() in ('1', 'true', 'yes')
+INK_CROP = os.environ.get('OCR_INK_CROP', 'true').lower() in ('1', 'true', 'yes')
+INK_MIN_STD = float(os.environ.get('OCR_INK_MIN_STD', 6.0))
+INK_MIN_RATIO = float(os.environ.get('OCR_INK_MIN_RATIO', 0.002))
+INK_MARGIN = int(os.environ.get('OCR_INK_MARGIN', 4))
@@ -0,0 +1,61 @@
+"""
+Helpers for the OCR benchmark scripts.
+
+Contains:
+- Character-level accuracy against expected text
+- Loading of benchmark samples (images and expected text per area)
+"""
+import os
+import yaml
+
+
+def edit_distance(a, b):
+    """
+    Levenshtein distance between two strings.
+
+    :param a: First string
+    :param b: Second string
+    :return: Minimum number of single-character edits turning a into b
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def char_accuracy(expected, actual):
+    """
+    Character accuracy, 1 - normalized edit distance (whitespace-insensitive).
+
+    :param expected: Ground truth text
+    :param actual: Recognized text
+    :return: Accuracy between 0.0 and 1.0
+    """
+    expected = "".join((expected or "").split())
+    actual = "".join((actual or "").split())
+    if not expected:
+        return 1.0 if not actual else 0.0
+    return max(0.0, 1.0 - edit_distance(expected, actual) / len(expected))
+
+
+def load_samples(image_paths, expected_path=None):
+    """
+    Pair benchmark images with their expected text.
+
+    The expected text file is YAML mapping an image file name to
+    {'area_name': 'text'}; images without an entry are only timed.
+
+    :param image_paths: Paths to the sample images
+    :param expected_path: Optional path to the expected text YAML file
+    :return: List of (image_path, {area_name: text} or None)
+    """
+    expected = {}
+    if expected_path:
+        with open(expected_path, 'r', encoding='utf-8') as f:
+            expected = yaml.safe_load(f) or {}
+    return [(path, expected.get(os.path.basename(path))) for path in image_paths]
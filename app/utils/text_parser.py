@@ -1,46 +1,67 @@
 import os
 import logging
 
-def parse_detected_text(file_path):
+SEPARATOR = "-" * 50
+
+AREA_MAPPING = {
+    "area_1": "invoice_number",
+    "area_2": "date",
+    "area_3": "second_product_amount",
+    "area_4": "total_amount"
+}
+
+def parse_ocr_results(results, field_mapping=None):
+    """
+    Map structured OCR results to invoice details.
+
+    :param results: Dictionary of recognized text per area, {'area_name': 'text'}
+    :param field_mapping: Field name per area, usually Template.field_mapping (default: AREA_MAPPING)
+    :return: Dictionary with extracted fields
+    """
+    field_mapping = field_mapping or AREA_MAPPING
+    extracted = {field: None for field in field_mapping.values()}
+
+    for area_name, text in results.items():
+        field = field_mapping.get(area_name)
+        if field:
+            extracted[field] = text.strip() if text is not None else None
+
+    return extracted
+
+def read_detected_text(file_path):
+    """
+    Read an exported detected text file back into structured OCR results.
+
+    :param file_path: Path to the detected text file
+    :return: Dictionary of recognized text per area, {'area_name': 'text'}
+    """
+    results = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    for area in content.split(SEPARATOR):
+        lines = area.strip().split("\n")
+        if lines:
+            header = lines[0]
+            if header.startswith("Text in "):
+                # Split "Text in area_X: value" into the area name and its text
+                area_name, _, value = header[len("Text in "):].partition(":")
+                results[area_name.strip()] = value.strip()
+    return results
+
+def parse_detected_text(file_path, field_mapping=None):
     """
     Parse the detected text file in plain text format with area mapping to extract invoice details.
 
+    Kept for exported files; in-process callers should pass the mapping
+    returned by OCRInterface.extract_text() to parse_ocr_results() instead.
+
     :param file_path: Path to the detected text file
+    :param field_mapping: Field name per area, usually Template.field_mapping (default: AREA_MAPPING)
     :return: Dictionary with extracted fields
     """
-    extracted = {
-        "invoice_number": None,
-        "date": None,
-        "second_product_amount": None,
-        "total_amount": None
-    }
-
-    area_mapping = {
-        "area_1": "invoice_number",
-        "area_2": "date",
-        "area_3": "second_product_amount",
-        "area_4": "total_amount"
-    }
-
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        areas = content.split("--------------------------------------------------")
-
-        for area in areas:
-            lines = area.strip().split("\n")
-            if lines:
-                header = lines[0]
-                if header.startswith("Text in "):
-                    # Extract the area number
-                    current_area = header.split(" ")[2].strip(":")
-                    field = area_mapping.get(current_area)
-                    if field:
-                        # Get everything after "Text in area_X: "
-                        value = header[header.find(": ") + 2:].strip()
-                        extracted[field] = value
+        return parse_ocr_results(read_detected_text(file_path), field_mapping)
     except Exception as e:
         logging.error(f"Error parsing detected text: {e}")
-
-    return extracted
\ No newline at end of file
+        return parse_ocr_results({}, field_mapping)
@@ -0,0 +1,68 @@
+"""
+Compare EasyOCR CPU settings on sample invoices.
+
+Runs every combination of int8 quantization and torch thread count over the
+detection areas of the given images, and prints the mean latency per region
+and, when expected text is provided, the character accuracy.
+
+Example:
+    python benchmark_easyocr.py downloads/invoice.jpg --expected expected.yaml --threads 1 2 4
+"""
+import argparse
+import itertools
+import time
+from app.services.ocr.easyocr_backend import EasyOCRBackend
+from app.services.ocr.image_loader import load_regions
+from app.services.ocr.region_cache import RegionCache
+from app.services.ocr.templates import template_registry
+from app.utils.ocr_metrics import char_accuracy, load_samples
+
+
+def run_configuration(samples, detection_areas, quantize, threads, mode, repeat):
+    backend = EasyOCRBackend(mode=mode, quantize=quantize, intra_op_threads=threads)
+    # Measure the engine itself, not the region memo
+    backend.region_cache = RegionCache(0)
+
+    region_sets = [(load_regions(path, detection_areas)[0], expected) for path, expected in samples]
+    backend.recognize_regions(region_sets[0][0])  # warm-up
+
+    elapsed = 0.0
+    regions = 0
+    scores = []
+    for _ in range(repeat):
+        for regions_by_area, expected in region_sets:
+            start = time.perf_counter()
+            results = backend.recognize_regions(regions_by_area)
+            elapsed += time.perf_counter() - start
+            regions += len(results)
+            if expected:
+                scores.extend(char_accuracy(expected.get(area), text) for area, text in results.items())
+
+    return {
+        "ms_per_region": 1000 * elapsed / max(regions, 1),
+        "accuracy": sum(scores) / len(scores) if scores else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='+', help="Sample invoice images")
+    parser.add_argument('--areas', default='downloads/detection_areas.yaml', help="Detection areas YAML")
+    parser.add_argument('--expected', help="YAML mapping image file name to {area_name: expected text}")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4], help="Intra-op thread counts to try")
+    parser.add_argument('--mode', choices=['detect', 'recognize'], default='detect', help="EasyOCR backend mode")
+    parser.add_argument('--repeat', type=int, default=3, help="Passes over the samples per configuration")
+    args = parser.parse_args()
+
+    detection_areas = template_registry.load(args.areas).areas
+    samples = load_samples(args.images, args.expected)
+
+    print(f"{'quantize':<10}{'threads':<9}{'ms/region':>10}{'accuracy':>10}")
+    for quantize, threads in itertools.product([False, True], args.threads):
+        result = run_configuration(samples, detection_areas, quantize, threads, args.mode, args.repeat)
+        accuracy = f"{result['accuracy']:.3f}" if result['accuracy'] is not None else "n/a"
+        print(f"{'int8' if quantize else 'fp32':<10}{threads:<9}{result['ms_per_region']:>10.1f}{accuracy:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+import pytest
+from app.services import batch_service
+from app.services.ocr.cascade_backend import CascadeOCRBackend
+from app.services.ocr.templates import parse_template
+
+
+class StubTier:
+    """
+    Tier returning scripted (text, confidence) pairs per area and recording the areas it was asked for.
+    """
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def _recognize_region_sets(self, region_sets, area_options=None, with_confidence=False, **kwargs):
+        self.calls.append([sorted(regions) for regions in region_sets])
+        return [{area_name: self.answers[area_name] for area_name in regions} for regions in region_sets]
+
+
+def _cascade(first, second, min_confidence=0.6):
+    cascade = CascadeOCRBackend(tiers=['pytesseract', 'easyocr'], min_confidence=min_confidence)
+    tiers = {'pytesseract': StubTier(first), 'easyocr': StubTier(second)}
+    cascade._tier = tiers.get
+    return cascade, tiers
+
+
+def _regions(*area_names):
+    return {area_name: np.zeros((8, 8), dtype=np.uint8) for area_name in area_names}
+
+
+@pytest.mark.parametrize('first', [('', 0.9), ('12.50', 0.2), ('twelve', 0.9)],
+                         ids=['empty', 'low_confidence', 'bad_format'])
+def test_doubtful_field_escalates(first):
+    cascade, tiers = _cascade({'total': first}, {'total': ('12.50', 0.9)})
+    counts = {}
+
+    results = cascade._recognize_region_sets([_regions('total')], {'total': {'format': 'amount'}}, tier_counts=counts)
+
+    assert results == [{'total': '12.50'}]
+    assert tiers['easyocr'].calls == [[['total']]]
+    assert counts == {'pytesseract': 0, 'easyocr': 1}
+
+
+def test_confident_fields_stay_on_first_tier():
+    cascade, tiers = _cascade({'total': ('12.50', 0.9), 'note': ('', 0.0)}, {'total': ('99', 0.9)})
+    area_options = {'total': {'format': 'amount'}, 'note': {'optional': True}}
+
+    results = cascade._recognize_region_sets([_regions('total', 'note')], area_options)
+
+    # An empty optional field is accepted, so the second tier is never called
+    assert results == [{'total': '12.50', 'note': ''}]
+    assert tiers['easyocr'].calls == []
+
+
+def test_last_tier_answer_is_accepted():
+    cascade, _ = _cascade({'total': ('', 0.0)}, {'total': ('', 0.0)})
+
+    assert cascade._recognize_region_sets([_regions('total')], with_confidence=True) == [{'total': ('', 0.0)}]
+
+
+def test_batch_reports_tier_counts(tmp_path, monkeypatch):
+    paths = []
+    for name in ('a.png', 'b.png'):
+        path = str(tmp_path / name)
+        cv2.imwrite(path, np.full((40, 40), 255, dtype=np.uint8))
+        paths.append(path)
+    template = parse_template({'areas': {'total': {'box': [0, 0, 20, 20], 'format': 'amount'},
+                                         'date': {'box': [20, 20, 20, 20], 'format': 'date'}}})
+    cascade, tiers = _cascade({'total': ('12.50', 0.9), 'date': ('soon', 0.9)}, {'date': ('01/02/2024', 0.9)})
+    monkeypatch.setattr(batch_service, '_worker_backend', cascade)
+    monkeypatch.setattr(batch_service, '_worker_backend_name', 'cascade')
+
+    outcomes, tier_counts = batch_service._extract_in_worker(paths, template)
+
+    assert [ok for ok, _ in outcomes] == [True, True]
+    assert tier_counts == {'pytesseract': 2, 'easyocr': 2}
+    assert tiers['easyocr'].calls == [[['date'], ['date']]]
+
+
+def test_batch_fallback_does_not_count_tiers_twice(tmp_path, monkeypatch):
+    paths = []
+    for name in ('a.png', 'b.png'):
+        path = str(tmp_path / name)
+        cv2.imwrite(path, np.full((40, 40), 255, dtype=np.uint8))
+        paths.append(path)
+    template = parse_template({'areas': {'total': {'box': [0, 0, 20, 20], 'format': 'amount'}}})
+    cascade, _ = _cascade({'total': ('12.50', 0.9)}, {})
+    extract_text_many = cascade.extract_text_many
+
+    def fail_after_counting(*args, **kwargs):
+        extract_text_many(*args, **kwargs)
+        raise RuntimeError('batch failed')
+
+    monkeypatch.setattr(cascade, 'extract_text_many', fail_after_counting)
+    monkeypatch.setattr(batch_service, '_worker_backend', cascade)
+    monkeypatch.setattr(batch_service, '_worker_backend_name', 'cascade')
+
+    outcomes, tier_counts = batch_service._extract_in_worker(paths, template)
+
+    assert [ok for ok, _ in outcomes] == [True, True]
+    assert tier_counts == {'pytesseract': 2, 'easyocr': 0}
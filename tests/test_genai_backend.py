@@ -0,0 +1,239 @@
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+from google.ai.generativelanguage_v1beta.services.generative_service.transports.rest import (
+    GenerativeServiceRestTransport)
+from google.api_core import exceptions as google_exceptions
+from app.services.ocr.genai_backend import (GenAIClient, GenAIOCRBackend, GenAIRequestError, KeyedGenerativeModel,
+                                            TokenBucket)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Stub model failing the first 'failures' calls with 'error', then echoing its contents.
+    """
+
+    def __init__(self, failures=0, error=google_exceptions.ResourceExhausted("quota"), delay=0.0):
+        self.failures = failures
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise self.error
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return FakeResponse(str(contents[-1]))
+
+
+def _client(model, **options):
+    options = {"requests_per_second": 0, "backoff_base": 0, **options}
+    return GenAIClient(model, **options)
+
+
+def test_retries_resource_exhausted():
+    model = FakeModel(failures=2)
+    client = _client(model, max_retries=3)
+
+    assert client.generate(["prompt"]).text == "prompt"
+    assert model.calls == 3
+    stats = client.stats()
+    assert (stats["calls"], stats["retries"], stats["failures"]) == (1, 2, 0)
+    assert stats["latency_ms"]["p50"] >= 0
+
+
+def test_gives_up_after_max_retries():
+    model = FakeModel(failures=10)
+    client = _client(model, max_retries=2)
+
+    with pytest.raises(GenAIRequestError):
+        client.generate(["prompt"])
+    assert model.calls == 3
+    assert client.stats()["failures"] == 1
+    assert client.stats()["latency_ms"] is None
+
+
+def test_does_not_retry_other_errors():
+    model = FakeModel(failures=1, error=google_exceptions.InvalidArgument("bad request"))
+    client = _client(model, max_retries=3)
+
+    with pytest.raises(GenAIRequestError):
+        client.generate(["prompt"])
+    assert model.calls == 1
+
+
+def test_caps_requests_in_flight():
+    model = FakeModel(delay=0.02)
+    client = _client(model, max_concurrency=2)
+
+    futures = [client.submit([str(i)]) for i in range(8)]
+
+    assert [future.result().text for future in futures] == [str(i) for i in range(8)]
+    assert model.max_in_flight <= 2
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+
+    # One token is available at once, the other five arrive at 50 per second
+    assert time.monotonic() - start >= 0.09
+
+
+class ScriptedModel:
+    """
+    Stub model answering the composite call with 'reply' and per-region calls with 'region'.
+    """
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    def generate_content(self, contents, **kwargs):
+        self.requests.append((contents, kwargs))
+        if kwargs.get("generation_config"):
+            return FakeResponse(self.reply)
+        return FakeResponse(" region ")
+
+
+def _single_call_backend(reply):
+    backend = GenAIOCRBackend('test-key', mode='single_call')
+    backend.client = _client(ScriptedModel(reply))
+    return backend
+
+
+def _regions(*names):
+    return [(name, np.full((20, 60), 255, dtype=np.uint8)) for name in names]
+
+
+def test_single_call_maps_json_fields_back_to_areas():
+    backend = _single_call_backend('{"region_1": "2024-01-31", "region_2": "12.50", "extra": "ignored"}')
+
+    texts = backend.recognize_many(_regions('date', 'total', 'vendor'))
+
+    assert texts == ['2024-01-31', '12.50', '']
+    assert len(backend.client.model.requests) == 1
+
+
+def test_single_call_labels_by_position():
+    backend = _single_call_backend('{"region_1": "1", "region_2": "2", "region_3": "3"}')
+
+    # 'total_2' is a real area here, so labels derived from area names would clash
+    assert backend.recognize_many(_regions('total', 'total_2', 'total')) == ['1', '2', '3']
+    instruction = backend.client.model.requests[0][0][1]
+    assert 'region_1, region_2, region_3' in instruction
+
+
+@pytest.mark.parametrize('reply', ['not json', '["a", "b"]'])
+def test_single_call_falls_back_to_per_region_calls(reply):
+    backend = _single_call_backend(reply)
+
+    assert backend.recognize_many(_regions('date', 'total')) == ['region', 'region']
+    assert len(backend.client.model.requests) == 3
+
+
+class FakeGenAIServer:
+    """
+    Local HTTP server speaking the REST API: replies with the scripted statuses, then with 'reply'.
+    """
+
+    def __init__(self, statuses=(), reply="12.50"):
+        self.statuses = list(statuses)
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                server.requests.append((time.monotonic(), self.path, self.headers.get('x-goog-api-key')))
+                status = server.statuses.pop(0) if server.statuses else 200
+                if status == 200:
+                    body = {"candidates": [{"content": {"parts": [{"text": reply}], "role": "model"},
+                                            "finishReason": "STOP", "index": 0}]}
+                else:
+                    body = {"error": {"code": status, "message": "scripted failure"}}
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def model(self, api_key='test-key'):
+        transport = functools.partial(GenerativeServiceRestTransport, url_scheme='http')
+        return KeyedGenerativeModel(api_key, transport=transport, api_endpoint=f"127.0.0.1:{self._httpd.server_port}")
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server_factory():
+    servers = []
+
+    def start(*args, **kwargs):
+        servers.append(FakeGenAIServer(*args, **kwargs))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_real_transport_retries_throttled_requests(server_factory):
+    server = server_factory(statuses=[429, 503])
+    client = GenAIClient(server.model(), requests_per_second=0, max_retries=3, backoff_base=0.01, backoff_max=0.05)
+
+    assert client.generate(["Extract text"]).text == "12.50"
+    assert len(server.requests) == 3
+    assert {key for _, _, key in server.requests} == {'test-key'}
+    assert all(path.startswith('/v1beta/models/gemini-exp-1121:generateContent') for _, path, _ in server.requests)
+    assert client.stats()["retries"] == 2
+
+
+def test_real_transport_gives_up_on_client_errors(server_factory):
+    server = server_factory(statuses=[400])
+    client = GenAIClient(server.model(), requests_per_second=0, max_retries=3, backoff_base=0.01)
+
+    with pytest.raises(GenAIRequestError):
+        client.generate(["Extract text"])
+    assert len(server.requests) == 1
+
+
+def test_real_transport_requests_are_rate_limited(server_factory):
+    server = server_factory()
+    client = GenAIClient(server.model(), requests_per_second=20, burst=1, max_concurrency=4)
+
+    futures = [client.submit(["Extract text"]) for _ in range(4)]
+    assert [future.result().text for future in futures] == ["12.50"] * 4
+
+    times = sorted(sent for sent, _, _ in server.requests)
+    # One token up front, then one every 50ms
+    assert times[-1] - times[0] >= 0.13
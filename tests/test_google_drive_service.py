@@ -0,0 +1,305 @@
+import hashlib
+import json
+import threading
+import time
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from app.services.google_drive_service import GoogleDriveService, is_permanent_error
+from app.services.monitor_state import MonitorState
+
+FOLDER = 'folder'
+
+
+class FakeRequest:
+    def __init__(self, response, uri=None):
+        self.response = response
+        self.uri = uri
+
+    def execute(self, http=None):
+        return self.response
+
+
+class FakeDriveAPI:
+    """
+    Stub of the Drive v3 resource: a folder listing and a change feed, served
+    page_size items at a time. Change feed token 'N' means the first N changes
+    have been read.
+    """
+
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.folder_files = []
+        self.changes_feed = []
+        self.contents = {}
+
+    def files(self):
+        return self
+
+    def changes(self):
+        return self
+
+    def list(self, pageToken=None, q=None, **kwargs):
+        start = int(pageToken or 0)
+        if q is not None:
+            page = self.folder_files[start:start + self.page_size]
+            response = {'files': page}
+            if start + self.page_size < len(self.folder_files):
+                response['nextPageToken'] = str(start + self.page_size)
+            return FakeRequest(response)
+        end = start + self.page_size
+        response = {'changes': self.changes_feed[start:end]}
+        if end < len(self.changes_feed):
+            response['nextPageToken'] = str(end)
+        else:
+            response['newStartPageToken'] = str(len(self.changes_feed))
+        return FakeRequest(response)
+
+    def get(self, fileId, fields=None):
+        content = self.contents[fileId]
+        return FakeRequest({'id': fileId, 'size': str(len(content)), 'md5Checksum': hashlib.md5(content).hexdigest()})
+
+    def get_media(self, fileId):
+        return FakeRequest(None, uri=f'media/{fileId}')
+
+    def getStartPageToken(self):
+        return FakeRequest({'startPageToken': str(len(self.changes_feed))})
+
+    def add_change(self, file, parent=FOLDER, **fields):
+        self.changes_feed.append({'fileId': file['id'], 'file': dict(file, parents=[parent], **fields)})
+
+
+class FakeCredentials:
+    valid = True
+
+
+class FakeHttp:
+    """
+    Serves file contents for media URIs, honouring the Range header.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.ranges = []
+
+    def request(self, uri, headers=None):
+        content = self.api.contents[uri.split('/')[-1]]
+        start, end = (int(value) for value in headers['range'][len('bytes='):].split('-'))
+        self.ranges.append((start, end))
+        return httplib2.Response({'status': 206}), content[start:end + 1]
+
+
+def _file(file_id, mime_type='application/pdf'):
+    return {'id': file_id, 'name': f'{file_id}.pdf', 'mimeType': mime_type, 'createdTime': '2024-01-01T00:00:00Z'}
+
+
+def _http_error(status, reason=None):
+    body = json.dumps({'error': {'code': status, 'errors': [{'reason': reason}]}}).encode() if reason else b''
+    return HttpError(httplib2.Response({'status': status}), body)
+
+
+@pytest.fixture
+def api():
+    return FakeDriveAPI()
+
+
+@pytest.fixture
+def http(api):
+    return FakeHttp(api)
+
+
+@pytest.fixture
+def service(api, http, monkeypatch):
+    service = GoogleDriveService('credentials.json', 'token.json')
+    service.service = api
+    service.credentials = FakeCredentials()
+    monkeypatch.setattr(service, '_thread_http', lambda: http)
+    return service
+
+
+@pytest.fixture
+def drive(service, monkeypatch):
+    drive = service
+    drive.downloaded = []
+    drive.failures = {}
+
+    def download_file(file_id, save_path, **kwargs):
+        if file_id in drive.failures:
+            raise drive.failures[file_id]
+        drive.downloaded.append(file_id)
+
+    monkeypatch.setattr(drive, 'download_file', download_file)
+    return drive
+
+
+@pytest.fixture
+def state(tmp_path):
+    return MonitorState(str(tmp_path / 'state.json'), save_interval=3600)
+
+
+def test_list_files_follows_pages_and_skips_folders_and_native_documents(drive, api):
+    api.folder_files = [_file('a'), _file('sub', GoogleDriveService.FOLDER_MIME_TYPE), _file('b'),
+                        _file('doc', 'application/vnd.google-apps.document'), _file('c')]
+
+    assert [file['id'] for file in drive.list_files(FOLDER)] == ['a', 'b', 'c']
+
+
+def test_list_changes_filters_folder_removed_trashed_and_native(drive, api):
+    api.add_change(_file('a'))
+    api.add_change(_file('elsewhere'), parent='other')
+    api.add_change(_file('trashed'), trashed=True)
+    api.changes_feed.append({'fileId': 'gone', 'removed': True})
+    api.add_change(_file('sheet', 'application/vnd.google-apps.spreadsheet'))
+    api.add_change(_file('sub', GoogleDriveService.FOLDER_MIME_TYPE))
+    api.add_change(_file('b'))
+
+    files, token = drive.list_changes('0', FOLDER)
+
+    assert [file['id'] for file in files] == ['a', 'b']
+    assert token == '7'
+
+
+def test_first_poll_lists_folder_then_reads_change_feed(drive, api, state):
+    api.folder_files = [_file('a'), _file('b'), _file('c')]
+    api.add_change(_file('old'))
+
+    assert drive.sync_folder(FOLDER, state) == 3
+    assert drive.downloaded == ['a', 'b', 'c']
+    assert state.get_page_token(FOLDER) == '1'
+
+    api.add_change(_file('d'))
+    api.add_change(_file('d'))
+    assert drive.sync_folder(FOLDER, state) == 1
+    assert drive.downloaded[-1] == 'd'
+    assert state.get_page_token(FOLDER) == '3'
+    assert drive.sync_folder(FOLDER, state) == 0
+
+
+def test_page_token_persists_across_restarts(drive, api, tmp_path):
+    path = str(tmp_path / 'state.json')
+    api.folder_files = [_file('a')]
+    drive.sync_folder(FOLDER, MonitorState(path))
+
+    api.add_change(_file('b'))
+    restarted = MonitorState(path)
+    assert restarted.get_page_token(FOLDER) == '0'
+    drive.sync_folder(FOLDER, restarted)
+
+    assert drive.downloaded == ['a', 'b']
+
+
+def test_transient_failure_keeps_page_token(drive, api, state):
+    state.set_page_token(FOLDER, '0')
+    api.add_change(_file('a'))
+    api.add_change(_file('b'))
+    drive.failures['b'] = _http_error(503)
+
+    drive.sync_folder(FOLDER, state)
+    assert state.get_page_token(FOLDER) == '0'
+
+    del drive.failures['b']
+    drive.sync_folder(FOLDER, state)
+    assert drive.downloaded == ['a', 'b']
+    assert state.get_page_token(FOLDER) == '2'
+
+
+def test_rate_limited_403_keeps_page_token(drive, api, state):
+    state.set_page_token(FOLDER, '0')
+    api.add_change(_file('a'))
+    drive.failures['a'] = _http_error(403, 'rateLimitExceeded')
+
+    drive.sync_folder(FOLDER, state)
+
+    assert state.get_page_token(FOLDER) == '0'
+    assert not state.is_failed(FOLDER, 'a')
+    del drive.failures['a']
+    assert drive.sync_folder(FOLDER, state) == 1
+    assert drive.downloaded == ['a']
+
+
+@pytest.mark.parametrize('status, reason, permanent', [
+    (400, None, True),
+    (401, None, True),
+    (404, 'notFound', True),
+    (403, 'userRateLimitExceeded', False),
+    (403, 'downloadQuotaExceeded', False),
+    (429, None, False),
+    (503, None, False),
+])
+def test_is_permanent_error(status, reason, permanent):
+    assert is_permanent_error(_http_error(status, reason)) is permanent
+
+
+def test_permanent_failure_does_not_block_page_token(drive, api, state):
+    state.set_page_token(FOLDER, '0')
+    api.add_change(_file('a'))
+    drive.failures['a'] = _http_error(404)
+
+    drive.sync_folder(FOLDER, state)
+
+    assert state.get_page_token(FOLDER) == '1'
+    assert drive.sync_folder(FOLDER, state) == 0
+
+
+def test_download_streams_chunks_and_renames_when_complete(service, api, http, tmp_path):
+    api.contents['a'] = bytes(range(256)) * 10
+    save_path = str(tmp_path / 'a.pdf')
+
+    service.download_file('a', save_path, chunk_size=1000)
+
+    with open(save_path, 'rb') as f:
+        assert f.read() == api.contents['a']
+    assert http.ranges == [(0, 999), (1000, 1999), (2000, 2559)]
+    assert not (tmp_path / '.partial' / 'a').exists()
+
+
+def test_download_resumes_partial_file_by_id(service, api, http, tmp_path):
+    api.contents['a'] = b'0123456789' * 100
+    (tmp_path / '.partial').mkdir()
+    (tmp_path / '.partial' / 'a').write_bytes(api.contents['a'][:400])
+
+    service.download_file('a', str(tmp_path / 'renamed.pdf'), chunk_size=4096)
+
+    assert (tmp_path / 'renamed.pdf').read_bytes() == api.contents['a']
+    assert http.ranges == [(400, 999)]
+
+
+def test_concurrent_downloads_of_one_file_take_turns(service, api, http, tmp_path):
+    api.contents['a'] = bytes(range(256)) * 8
+    request = http.request
+
+    def slow_request(uri, headers=None):
+        time.sleep(0.002)
+        return request(uri, headers=headers)
+
+    http.request = slow_request
+    errors = []
+
+    def download():
+        try:
+            service.download_file('a', str(tmp_path / 'a.pdf'), chunk_size=128)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=download) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert (tmp_path / 'a.pdf').read_bytes() == api.contents['a']
+    assert not (tmp_path / '.partial' / 'a').exists()
+    assert service._partial_locks == {}
+
+
+def test_download_rejects_checksum_mismatch(service, api, tmp_path):
+    api.contents['a'] = b'invoice'
+    (tmp_path / '.partial').mkdir()
+    (tmp_path / '.partial' / 'a').write_bytes(b'XXX')
+
+    with pytest.raises(IOError):
+        service.download_file('a', str(tmp_path / 'a.pdf'))
+
+    assert not (tmp_path / 'a.pdf').exists()
+    assert not (tmp_path / '.partial' / 'a').exists()
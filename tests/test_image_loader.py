@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+import pytest
+from app.services.ocr.image_loader import choose_reduction, load_regions
+
+
+@pytest.mark.parametrize('heights, min_height, expected', [
+    ([512, 600], 64, 8),
+    ([256, 600], 64, 4),
+    ([130], 64, 2),
+    ([100], 64, 1),
+    ([512], 0, 1),
+])
+def test_choose_reduction_keeps_smallest_area_legible(heights, min_height, expected):
+    areas = {f"area_{i}": [0, 0, 100, height] for i, height in enumerate(heights)}
+
+    assert choose_reduction(areas, min_height) == expected
+
+
+def test_choose_reduction_without_areas():
+    assert choose_reduction({}, 64) == 1
+
+
+@pytest.fixture
+def page():
+    image = np.full((400, 300), 255, dtype=np.uint8)
+    image[100:200, 50:150] = 0
+    return image
+
+
+def test_load_regions_crops_areas_in_order(tmp_path, page):
+    path = str(tmp_path / 'invoice.png')
+    cv2.imwrite(path, cv2.cvtColor(page, cv2.COLOR_GRAY2BGR))
+
+    regions, factor = load_regions(path, {'ink': [50, 100, 100, 100], 'paper': [200, 0, 50, 30]},
+                                   min_region_height=8)
+
+    # Only JPEGs are decoded at reduced scale
+    assert factor == 1
+    assert list(regions) == ['ink', 'paper']
+    assert regions['ink'].shape == (100, 100) and regions['ink'].max() == 0
+    assert regions['paper'].shape == (30, 50) and regions['paper'].min() == 255
+
+
+def test_reduced_jpeg_decode_covers_area(tmp_path, page):
+    path = str(tmp_path / 'invoice.jpg')
+    cv2.imwrite(path, page)
+
+    regions, factor = load_regions(path, {'ink': [50, 100, 101, 101]}, min_region_height=25)
+
+    assert factor == 4
+    # Rounded outwards: 101 px at 1/4 scale covers 26 px
+    assert regions['ink'].shape == (26, 26)
+    assert load_regions(path, {'ink': [50, 100, 101, 101]}, min_region_height=0)[1] == 1
+
+
+def test_page_steps_run_before_cropping(tmp_path, page):
+    path = str(tmp_path / 'invoice.png')
+    cv2.imwrite(path, page)
+
+    regions, _ = load_regions(path, {'ink': [50, 100, 100, 100]}, page_steps=['invert'])
+
+    assert regions['ink'].min() == 255
+
+
+def test_unreadable_file_raises_ioerror(tmp_path):
+    path = tmp_path / 'invoice.pdf'
+    path.write_bytes(b'%PDF-1.4')
+
+    with pytest.raises(IOError):
+        load_regions(str(path), {'total': [0, 0, 10, 10]})
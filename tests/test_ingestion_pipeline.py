@@ -0,0 +1,110 @@
+import queue
+import pytest
+from app.services.ingestion_pipeline import IngestionPipeline
+from app.services.monitor_state import MonitorState
+
+
+class FakeDrive:
+    """
+    Change feed where token 'tN' means the first N changes have been read.
+    """
+
+    def __init__(self):
+        self.changes = []
+
+    def poll_folder(self, folder_id, state):
+        start = int((state.get_page_token(folder_id) or 't0')[1:])
+        files = [file for file in self.changes[start:]
+                 if not state.is_processed(folder_id, file['id']) and not state.is_failed(folder_id, file['id'])]
+        return files, f"t{len(self.changes)}"
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    drive = FakeDrive()
+    state = MonitorState(str(tmp_path / 'state.json'), max_attempts=2)
+    return IngestionPipeline(drive, 'folder', state=state, results_path=str(tmp_path / 'results.jsonl'))
+
+
+def _take(pipeline):
+    try:
+        return pipeline._queues['download'].get_nowait()
+    except queue.Empty:
+        return None
+
+
+def _succeed(pipeline, item):
+    pipeline.state.mark_processed(pipeline.folder_id, item['file']['id'])
+    pipeline._finish(item, success=True)
+
+
+def test_token_saved_once_poll_succeeds(pipeline):
+    pipeline.drive_service.changes.append({'id': 'A', 'name': 'a.jpg'})
+    assert pipeline.poll_once() == 1
+    assert pipeline.state.get_page_token('folder') is None
+
+    _succeed(pipeline, _take(pipeline))
+    assert pipeline.state.get_page_token('folder') == 't1'
+
+
+def test_overlapping_poll_does_not_skip_in_flight_file(pipeline):
+    pipeline.drive_service.changes.append({'id': 'A', 'name': 'a.jpg'})
+    assert pipeline.poll_once() == 1
+    item = _take(pipeline)
+
+    # A is still in flight, so this poll finds nothing and must not move the token past A
+    assert pipeline.poll_once() == 0
+    assert pipeline.state.get_page_token('folder') is None
+
+    pipeline._finish(item, success=False)
+    assert pipeline.state.get_page_token('folder') is None
+    assert pipeline.poll_once() == 1
+    assert _take(pipeline)['file']['id'] == 'A'
+
+
+def test_undecodable_file_is_failed_and_releases_token(pipeline):
+    pipeline.drive_service.changes.append({'id': 'A', 'name': 'a.pdf'})
+    pipeline.poll_once()
+    pipeline._fail('decode', _take(pipeline), IOError("cannot identify image file 'a.pdf'"))
+
+    assert pipeline.state.get_page_token('folder') == 't1'
+    assert pipeline.poll_once() == 0
+
+
+def test_file_failing_every_attempt_is_given_up(pipeline):
+    pipeline.drive_service.changes.append({'id': 'A', 'name': 'a.jpg'})
+    pipeline.poll_once()
+    pipeline._fail('ocr', _take(pipeline), RuntimeError('engine crashed'))
+    assert pipeline.state.get_page_token('folder') is None
+
+    assert pipeline.poll_once() == 1
+    pipeline._fail('ocr', _take(pipeline), RuntimeError('engine crashed'))
+    assert pipeline.state.get_page_token('folder') == 't1'
+    assert pipeline.poll_once() == 0
+
+
+def test_later_poll_waits_for_earlier_poll(pipeline):
+    pipeline.drive_service.changes.append({'id': 'A', 'name': 'a.jpg'})
+    pipeline.poll_once()
+    first = _take(pipeline)
+
+    pipeline.drive_service.changes.append({'id': 'B', 'name': 'b.jpg'})
+    assert pipeline.poll_once() == 1
+    second = _take(pipeline)
+
+    _succeed(pipeline, second)
+    assert pipeline.state.get_page_token('folder') is None
+
+    _succeed(pipeline, first)
+    assert pipeline.state.get_page_token('folder') == 't2'
+
+
+def test_poll_after_failure_saves_token_once_file_succeeds(pipeline):
+    pipeline.drive_service.changes.append({'id': 'A', 'name': 'a.jpg'})
+    pipeline.poll_once()
+    pipeline.poll_once()
+    pipeline._finish(_take(pipeline), success=False)
+
+    pipeline.poll_once()
+    _succeed(pipeline, _take(pipeline))
+    assert pipeline.state.get_page_token('folder') == 't1'
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from app.services.ocr.ink import InkPolicy
+from app.services.ocr.ocr_interface import OCRInterface
+from app.services.ocr.resize import ResizePolicy
+
+
+class RecordingBackend(OCRInterface):
+    """
+    Backend answering 'text' for every region and recording the shape of each region it is sent.
+    """
+
+    def __init__(self):
+        super().__init__(region_cache_size=0)
+        self.resize_policy = ResizePolicy(mode='fixed', fixed_scale=1.0)
+        self.ink_policy = InkPolicy(gate=True, crop=True, margin=2)
+        self.shapes = []
+
+    def preprocess_image(self, image):
+        return image
+
+    def recognize(self, image, area_name, **kwargs):
+        self.shapes.append((area_name, image.shape))
+        return 'text'
+
+
+def _blank(height=20, width=60):
+    return np.full((height, width), 255, dtype=np.uint8)
+
+
+def _printed(height=20, width=60):
+    image = _blank(height, width)
+    image[8:12, 20:40] = 0
+    return image
+
+
+def test_blank_region_is_skipped():
+    assert InkPolicy().apply(_blank()) is None
+    assert InkPolicy(gate=False, crop=False).apply(_blank()) is not None
+
+
+def test_sparse_ink_is_blank():
+    image = _blank()
+    image[0, 0] = 0
+
+    assert InkPolicy(min_std=0, min_ratio=0.01).apply(image) is None
+
+
+def test_crop_keeps_margin():
+    cropped = InkPolicy(margin=3).apply(_printed())
+
+    assert cropped.shape == (4 + 2 * 3, 20 + 2 * 3)
+    assert InkPolicy(crop=False).apply(_printed()).shape == (20, 60)
+
+
+def test_inverted_region_is_cropped():
+    cropped = InkPolicy(margin=0).apply(255 - _printed())
+
+    assert cropped.shape == (4, 20)
+
+
+def test_blank_region_costs_no_engine_call():
+    backend = RecordingBackend()
+
+    results = backend._recognize_region_sets([{'blank': _blank(), 'total': _printed()}])
+
+    assert results == [{'blank': '', 'total': 'text'}]
+    assert backend.shapes == [('total', (4 + 2 * 2, 20 + 2 * 2))]
+
+
+def test_area_options_override_policy():
+    backend = RecordingBackend()
+    area_options = {'blank': {'ink': {'gate': False}}, 'total': {'ink': {'crop': False}}}
+
+    results = backend._recognize_region_sets([{'blank': _blank(), 'total': _printed()}], area_options)
+
+    assert results == [{'blank': 'text', 'total': 'text'}]
+    assert sorted(backend.shapes) == [('blank', (20, 60)), ('total', (20, 60))]
+
+
+@pytest.mark.parametrize('options', [{'gate': 'yes'}, {'margin': -1}, {'min_ratio': 1}, {'edges': True}])
+def test_invalid_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        InkPolicy().with_options(options)
@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+from app.main import create_app
+from app.routes import ocr
+from app.services import extraction_service
+from app.services.job_queue import JobQueue
+from app.services.ocr.templates import template_registry
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    (tmp_path / 'invoice.jpg').write_bytes(b'invoice bytes')
+    (tmp_path / 'detection_areas.yaml').write_text('total: [0, 0, 5, 5]\n', encoding='utf-8')
+    monkeypatch.setattr(extraction_service, 'DOWNLOADS_DIR', str(tmp_path))
+    monkeypatch.setattr(template_registry, 'directory', str(tmp_path))
+    monkeypatch.setattr(ocr, 'job_queue', JobQueue(max_pending=1, workers=1))
+    return create_app().test_client()
+
+
+def _wait_for(client, job_id, status):
+    for _ in range(200):
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never reached '{status}'")
+
+
+def test_full_queue_rejects_with_429(client, monkeypatch):
+    release = threading.Event()
+
+    def blocking_job(*args):
+        release.wait(5)
+        return {"invoice": {"total_amount": "10.00"}, "cache": "MISS"}
+
+    monkeypatch.setattr(ocr, '_run_extraction_job', blocking_job)
+    form = {'filename': 'invoice.jpg', 'ocr_backend': 'pytesseract'}
+
+    running = client.post('/jobs', data=form)
+    assert running.status_code == 202
+    running_id = running.get_json()['job_id']
+    _wait_for(client, running_id, 'running')
+
+    queued = client.post('/jobs', data=form)
+    assert queued.status_code == 202
+    assert client.get(queued.get_json()['status_url']).get_json()['status'] == 'queued'
+
+    rejected = client.post('/jobs', data=form)
+    assert rejected.status_code == 429
+    assert rejected.headers['Retry-After']
+    assert client.get('/jobs').get_json()['rejected'] == 1
+
+    release.set()
+    job = _wait_for(client, running_id, 'succeeded')
+    assert job['result'] == {"invoice": {"total_amount": "10.00"}, "cache": "MISS"}
+    _wait_for(client, queued.get_json()['job_id'], 'succeeded')
+
+
+def test_failed_job_reports_error(client, monkeypatch):
+    def failing_job(*args):
+        raise RuntimeError('engine crashed')
+
+    monkeypatch.setattr(ocr, '_run_extraction_job', failing_job)
+    response = client.post('/jobs', data={'filename': 'invoice.jpg', 'ocr_backend': 'pytesseract'})
+
+    job = _wait_for(client, response.get_json()['job_id'], 'failed')
+    assert job['error'] == 'engine crashed'
+
+
+def test_unknown_job_and_invalid_request(client):
+    assert client.get('/jobs/missing').status_code == 404
+    assert client.post('/jobs', data={'filename': 'missing.jpg'}).status_code == 400
+
+
+@pytest.mark.parametrize('field, value', [('workers', True), ('workers', 0), ('invoices_per_task', True),
+                                          ('invoices_per_task', '2')])
+def test_batch_rejects_non_integer_counts(client, field, value):
+    response = client.post('/extract_invoice_batch', json={'filenames': ['invoice.jpg'], field: value})
+
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
@@ -0,0 +1,145 @@
+import threading
+import pytest
+from app.services.monitor_scheduler import MonitorScheduler
+from app.services.monitor_state import MonitorState
+
+
+class ScriptedDrive:
+    """
+    Drive service whose polls find the scripted number of files, then none.
+    """
+
+    def __init__(self, found=()):
+        self.found = list(found)
+        self.polls = []
+        self.polled = threading.Event()
+
+    def sync_folder(self, folder_id, state):
+        self.polls.append(folder_id)
+        self.polled.set()
+        if self.found and isinstance(self.found[0], Exception):
+            raise self.found.pop(0)
+        return self.found.pop(0) if self.found else 0
+
+
+class FakePipeline:
+    def __init__(self):
+        self.started = self.stopped = False
+
+    def start(self, detect=True):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+    def stats(self):
+        return {}
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return MonitorScheduler(ScriptedDrive(), min_interval=1, max_interval=8,
+                            state=MonitorState(str(tmp_path / 'state.json')))
+
+
+def _manual(scheduler, monkeypatch):
+    # Polls are run by the test instead of the scheduler thread
+    monkeypatch.setattr(scheduler, '_start', lambda: None)
+    return scheduler
+
+
+def test_interval_backs_off_while_idle_and_resets_on_files(scheduler, monkeypatch):
+    _manual(scheduler, monkeypatch)
+    scheduler.drive_service.found = [0, 0, 0, 3, 2, 1, 1]
+    scheduler.add('folder', interval=2)
+    monitor = scheduler._monitors['folder']
+
+    intervals = []
+    for _ in range(7):
+        scheduler._poll(monitor)
+        intervals.append(monitor['interval'])
+
+    assert intervals == [4, 8, 8, 4, 2, 1, 1]
+    assert monitor['files'] == 7 and monitor['polls'] == 7
+
+
+def test_failed_poll_is_counted_and_backs_off(scheduler, monkeypatch):
+    _manual(scheduler, monkeypatch)
+    scheduler.drive_service.found = [RuntimeError('Drive unavailable')]
+    scheduler.add('folder', interval=2)
+
+    scheduler._poll(scheduler._monitors['folder'])
+
+    monitor = scheduler.get('folder')
+    assert monitor['errors'] == 1 and monitor['last_error'] == 'Drive unavailable'
+    assert monitor['interval'] == 4
+
+
+def test_initial_interval_is_clamped(scheduler, monkeypatch):
+    _manual(scheduler, monkeypatch)
+
+    assert scheduler.add('fast', interval=0.1)['interval'] == 1
+    assert scheduler.add('slow', interval=60)['interval'] == 8
+
+
+def test_pause_resume_and_stop(scheduler):
+    drive = scheduler.drive_service
+    pipeline = FakePipeline()
+    scheduler.add('folder', 'Invoices', interval=8)
+    assert drive.polled.wait(5)
+
+    paused = scheduler.pause('folder')
+    assert paused['status'] == 'paused'
+
+    drive.polled.clear()
+    assert scheduler.resume('folder')['status'] == 'active'
+    # A resumed monitor polls immediately instead of waiting for its interval
+    assert drive.polled.wait(5)
+
+    stopped = scheduler.stop('folder')
+    assert stopped['status'] == 'stopped'
+    assert scheduler.get('folder') is None
+    with pytest.raises(KeyError):
+        scheduler.pause('folder')
+
+    scheduler.add('piped', pipeline=pipeline)
+    assert pipeline.started
+    scheduler.stop('piped')
+    assert pipeline.stopped
+
+
+def test_add_many_adds_nothing_if_one_folder_is_monitored(scheduler, monkeypatch):
+    _manual(scheduler, monkeypatch)
+    scheduler.add('b', 'B')
+    pipeline = FakePipeline()
+
+    with pytest.raises(ValueError, match="'B' is already monitored"):
+        scheduler.add_many([('a', 'A', pipeline), ('b', 'B', None)])
+
+    assert scheduler.get('a') is None
+    assert not pipeline.started
+    assert [monitor['folder_id'] for monitor in scheduler.add_many([('a', 'A', None), ('c', 'C', None)])] == ['a', 'c']
+
+
+def test_route_validates_every_folder_before_adding(scheduler, monkeypatch):
+    from app.main import create_app
+    from app.routes import monitor as monitor_routes
+
+    class NamedDrive(ScriptedDrive):
+        def get_folder_ids_by_name(self, names):
+            return {name: f"id-{name}" for name in names}
+
+    _manual(scheduler, monkeypatch)
+    monkeypatch.setattr(monitor_routes, 'drive_service', NamedDrive())
+    monkeypatch.setattr(monitor_routes, 'scheduler', scheduler)
+    client = create_app().test_client()
+    scheduler.add('id-B', 'B')
+
+    assert client.post('/monitor', json={'folder_names': ['A', '']}).status_code == 400
+    response = client.post('/monitor', json={'folder_names': ['A', 'B']})
+    assert response.status_code == 400
+    assert "'B' is already monitored" in response.get_json()['error']
+    assert scheduler.get('id-A') is None
+
+    assert client.post('/monitor', json={'folder_names': ['A', 'C']}).status_code == 200
+    assert scheduler.get('id-A') is not None
@@ -0,0 +1,43 @@
+import json
+from app.services.monitor_state import MonitorState
+
+
+def _saved(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_processed_files_are_saved_with_the_page_token(tmp_path):
+    path = str(tmp_path / 'state.json')
+    state = MonitorState(path, save_interval=3600)
+    state.set_page_token('folder', 't0')
+    state.mark_processed('folder', 'a')
+    state.mark_failed('folder', 'b', 'HTTP 404')
+
+    assert _saved(path)['folder']['processed_ids'] == []
+    state.flush()
+    assert _saved(path)['folder']['processed_ids'] == ['a']
+    assert _saved(path)['folder']['failed'] == {'b': 'HTTP 404'}
+
+
+def test_processed_files_saved_once_interval_elapsed(tmp_path):
+    path = str(tmp_path / 'state.json')
+    state = MonitorState(path, save_interval=0)
+    state.mark_processed('folder', 'a')
+
+    assert _saved(path)['folder']['processed_ids'] == ['a']
+
+
+def test_page_token_drops_ids_behind_it(tmp_path):
+    path = str(tmp_path / 'state.json')
+    state = MonitorState(path, save_interval=3600)
+    for file_id in ('a', 'b', 'c'):
+        state.mark_processed('folder', file_id)
+    state.mark_failed('folder', 'd', 'HTTP 403')
+    state.set_page_token('folder', 't4', keep_ids=['c'])
+
+    reloaded = MonitorState(path)
+    assert reloaded.get_page_token('folder') == 't4'
+    assert not reloaded.is_processed('folder', 'a')
+    assert reloaded.is_processed('folder', 'c')
+    assert not reloaded.is_failed('folder', 'd')
@@ -0,0 +1,27 @@
+import pytest
+from app.services.ocr.preprocessing import parse_step
+
+
+@pytest.mark.parametrize('step', [
+    'clahe',
+    {'adaptive': {'block_size': 41, 'c': 5.5}},
+    {'clahe': {'clip_limit': 3, 'tile_size': 16}},
+    {'deskew': {'max_angle': 10.0}},
+])
+def test_accepts_valid_steps(step):
+    parse_step(step)
+
+
+@pytest.mark.parametrize('step', [
+    'sharpen',
+    {'adaptive': {'block_size': 'x'}},
+    {'adaptive': {'block_size': 1}},
+    {'adaptive': {'window': 31}},
+    {'median': {'size': True}},
+    {'clahe': {'tile_size': 2.5}},
+    {'denoise': {'strength': -1}},
+    {'otsu': {'threshold': 128}},
+])
+def test_rejects_invalid_steps(step):
+    with pytest.raises(ValueError):
+        parse_step(step)
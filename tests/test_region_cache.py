@@ -0,0 +1,94 @@
+import numpy as np
+from app.services.ocr.ink import InkPolicy
+from app.services.ocr.ocr_interface import OCRInterface
+from app.services.ocr.region_cache import RegionCache
+
+
+class CountingBackend(OCRInterface):
+    """
+    Backend answering 'text' for every region and counting engine calls.
+    """
+
+    def __init__(self, region_cache_size=16):
+        super().__init__(region_cache_size=region_cache_size)
+        self.ink_policy = InkPolicy(gate=False, crop=False)
+        self.calls = 0
+
+    def preprocess_image(self, image):
+        return image
+
+    def recognize(self, image, area_name, **kwargs):
+        self.calls += 1
+        return 'text'
+
+
+def _region(value=0):
+    image = np.full((20, 60), 255, dtype=np.uint8)
+    image[8:12, 10:50] = value
+    return image
+
+
+def test_lru_bound_evicts_oldest():
+    cache = RegionCache(2)
+    keys = [cache.make_key(_region(value)) for value in (0, 1, 2)]
+    for key in keys:
+        cache.put(key, 'text')
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == 'text'
+    assert cache.stats()['entries'] == 2 and cache.evictions == 1
+
+
+def test_get_refreshes_recency():
+    cache = RegionCache(2)
+    first, second, third = (cache.make_key(_region(value)) for value in (0, 1, 2))
+    cache.put(first, 'a')
+    cache.put(second, 'b')
+    cache.get(first)
+    cache.put(third, 'c')
+
+    assert cache.get(first) == 'a'
+    assert cache.get(second) is None
+
+
+def test_size_zero_disables_cache():
+    backend = CountingBackend(region_cache_size=0)
+    backend._recognize_region_sets([{'total': _region()}])
+    backend._recognize_region_sets([{'total': _region()}])
+
+    assert not backend.region_cache.enabled
+    assert backend.calls == 2
+    assert backend.region_cache.stats()['entries'] == 0
+
+
+def test_identical_region_is_recognized_once():
+    backend = CountingBackend()
+    backend._recognize_region_sets([{'a': _region()}, {'b': _region()}])
+    backend._recognize_region_sets([{'a': _region()}])
+
+    # Regions of one call are all looked up before any is recognized
+    assert backend.calls == 2
+    assert backend.region_cache.hits == 1
+
+
+def test_key_changes_with_resize_policy_profile_and_confidence():
+    backend = CountingBackend()
+    region_sets = [{'total': _region()}]
+
+    backend._recognize_region_sets(region_sets)
+    backend._recognize_region_sets(region_sets, {'total': {'resize': {'target_height': 64}}})
+    backend._recognize_region_sets(region_sets, {'total': {'profile': {'psm': 7}}})
+    backend._recognize_region_sets(region_sets, with_confidence=True)
+    assert backend.calls == 4
+
+    backend._recognize_region_sets(region_sets, {'total': {'profile': {'psm': 7}}})
+    assert backend.calls == 4
+
+
+def test_key_changes_with_pixels_and_shape():
+    image = _region()
+
+    assert RegionCache.make_key(image) == RegionCache.make_key(image.copy())
+    assert RegionCache.make_key(image) != RegionCache.make_key(_region(1))
+    assert RegionCache.make_key(image) != RegionCache.make_key(image.reshape(60, 20))
+    assert RegionCache.make_key(image[:, ::2]) == RegionCache.make_key(np.ascontiguousarray(image[:, ::2]))
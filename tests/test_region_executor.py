@@ -0,0 +1,53 @@
+import threading
+import time
+import pytest
+from app.services.ocr.region_executor import RegionExecutor
+
+
+def test_results_keep_input_order():
+    executor = RegionExecutor(workers=4)
+
+    def slow_square(value, delay):
+        time.sleep(delay)
+        return value * value
+
+    assert executor.map(slow_square, [(1, 0.05), (2, 0.0), (3, 0.02), (4, 0.0)]) == [1, 4, 9, 16]
+
+
+def test_calls_run_on_pool_threads():
+    executor = RegionExecutor(workers=2)
+    names = executor.map(lambda _: threading.current_thread().name, [(1,), (2,)])
+
+    assert all(name.startswith('ocr-region') for name in names)
+    assert RegionExecutor(workers=1).map(lambda _: threading.current_thread().name, [(1,), (2,)]) == \
+        [threading.current_thread().name] * 2
+
+
+def test_nested_map_runs_inline_without_deadlock():
+    executor = RegionExecutor(workers=2)
+
+    def outer(value):
+        # Every pool thread is busy here; a nested submit would wait forever
+        return executor.map(lambda inner: (threading.current_thread().name, value * 10 + inner), [(1,), (2,)])
+
+    results = []
+    runner = threading.Thread(target=lambda: results.append(executor.map(outer, [(1,), (2,)])), daemon=True)
+    runner.start()
+    runner.join(timeout=5)
+
+    assert not runner.is_alive()
+    (first, second), = results
+    assert [value for _, value in first + second] == [11, 12, 21, 22]
+    assert len({name for name, _ in first}) == 1
+
+
+def test_exception_propagates():
+    executor = RegionExecutor(workers=2)
+
+    def fail_on_two(value):
+        if value == 2:
+            raise ValueError('bad region')
+        return value
+
+    with pytest.raises(ValueError, match='bad region'):
+        executor.map(fail_on_two, [(1,), (2,), (3,)])
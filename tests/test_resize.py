@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+import pytest
+from app.services.ocr.resize import ResizePolicy
+
+
+@pytest.mark.parametrize('height, lines, expected', [
+    (16, 1, 3.0),     # capped at max_scale
+    (24, 1, 2.0),
+    (48, 1, 1.0),
+    (96, 2, 1.0),     # two 48px lines
+    (200, 1, 1.0),    # never shrunk below min_scale
+])
+def test_adaptive_scale_follows_text_height(height, lines, expected):
+    policy = ResizePolicy(mode='adaptive', target_height=48, lines=lines, max_scale=3.0)
+
+    assert policy.scale_for(height) == pytest.approx(expected)
+
+
+def test_min_scale_allows_shrinking():
+    assert ResizePolicy(target_height=48, min_scale=0.5).scale_for(192) == pytest.approx(0.5)
+    assert ResizePolicy(target_height=48, min_scale=0.25).scale_for(96) == pytest.approx(0.5)
+
+
+def test_fixed_scale_ignores_height():
+    policy = ResizePolicy(mode='fixed', fixed_scale=3.0)
+
+    assert policy.scale_for(10) == policy.scale_for(500) == 3.0
+
+
+def test_zero_height_does_not_divide_by_zero():
+    assert ResizePolicy(target_height=48, max_scale=3.0).scale_for(0) == 3.0
+
+
+@pytest.mark.parametrize('scale, expected', [(3.0, cv2.INTER_CUBIC), (1.5, cv2.INTER_LINEAR), (0.5, cv2.INTER_AREA)])
+def test_auto_interpolation_depends_on_scale(scale, expected):
+    assert ResizePolicy(interpolation='auto').interpolation_for(scale) == expected
+    assert ResizePolicy(interpolation='lanczos').interpolation_for(scale) == cv2.INTER_LANCZOS4
+
+
+def test_apply_leaves_near_target_regions_untouched():
+    image = np.zeros((47, 100), dtype=np.uint8)
+
+    assert ResizePolicy(target_height=48).apply(image) is image
+    assert ResizePolicy(target_height=48).apply(np.zeros((24, 100), dtype=np.uint8)).shape == (48, 200)
+
+
+@pytest.mark.parametrize('options', [{'mode': 'huge'}, {'lines': 0}, {'min_scale': 2, 'max_scale': 1},
+                                     {'interpolation': 'bogus'}, {'height': 40}])
+def test_invalid_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        ResizePolicy().with_options(options)
@@ -0,0 +1,68 @@
+import pytest
+from app.services import extraction_service
+from app.services.extraction_service import result_cache_key
+from app.services.ocr.templates import parse_template
+from app.services.result_cache import ExtractionCache
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / 'invoice.jpg'
+    path.write_bytes(b'invoice bytes')
+    return str(path)
+
+
+@pytest.fixture
+def template():
+    return parse_template({'total': [0, 0, 10, 10]}, 'invoice')
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ExtractionCache(cache_dir=str(tmp_path / 'cache'))
+    monkeypatch.setattr(extraction_service, 'result_cache', cache)
+    return cache
+
+
+def test_disk_tier_survives_restart(tmp_path, image):
+    cache = ExtractionCache(cache_dir=str(tmp_path / 'cache'))
+    key = cache.make_key(image, {'total': [0, 0, 10, 10]}, 'pytesseract')
+    cache.put(key, {'total': '10.00'})
+
+    assert ExtractionCache(cache_dir=str(tmp_path / 'cache')).get(key) == {'total': '10.00'}
+
+
+@pytest.mark.parametrize('setting, value', [
+    ('TESSERACT_MODE', 'subprocess'),
+    ('RESIZE_MAX_SCALE', 1.5),
+    ('INK_CROP', False),
+    ('DECODE_MIN_REGION_HEIGHT', 16),
+])
+def test_changed_setting_misses_cache(cache, image, template, monkeypatch, setting, value):
+    cache.put(result_cache_key(image, 'pytesseract', template), {'total': '10.00'})
+    monkeypatch.setattr(extraction_service, setting, value)
+
+    assert cache.get(result_cache_key(image, 'pytesseract', template)) is None
+
+
+def test_cascade_key_follows_tier_settings(cache, image, template, monkeypatch):
+    backend = 'cascade(pytesseract,genai)'
+    cache.put(result_cache_key(image, backend, template), {'total': '10.00'})
+    assert cache.get(result_cache_key(image, backend, template)) == {'total': '10.00'}
+
+    monkeypatch.setattr(extraction_service, 'GENAI_PROMPT', 'Read the invoice.')
+    assert cache.get(result_cache_key(image, backend, template)) is None
+
+
+def test_unused_backend_settings_keep_key(cache, image, template, monkeypatch):
+    key = result_cache_key(image, 'pytesseract', template)
+    monkeypatch.setattr(extraction_service, 'EASYOCR_MODE', 'recognize')
+
+    assert result_cache_key(image, 'pytesseract', template) == key
+
+
+def test_schema_version_is_part_of_key(image, monkeypatch):
+    key = ExtractionCache.make_key(image, {'total': [0, 0, 10, 10]}, 'pytesseract')
+    monkeypatch.setattr('app.services.result_cache.CACHE_SCHEMA_VERSION', 0)
+
+    assert ExtractionCache.make_key(image, {'total': [0, 0, 10, 10]}, 'pytesseract') != key
@@ -0,0 +1,73 @@
+import os
+import pytest
+from app.services.ocr.templates import TemplateRegistry, parse_template
+from app.utils.text_parser import AREA_MAPPING
+
+
+def test_legacy_list_template():
+    template = parse_template({'area_1': [10, 20, 30, 40], 'area_2': [0, 0, 5, 5]}, 'legacy')
+
+    assert template.areas == {'area_1': [10, 20, 30, 40], 'area_2': [0, 0, 5, 5]}
+    assert template.area_names == ('area_1', 'area_2')
+    assert template.field_mapping == AREA_MAPPING
+    assert template.region_options == {'area_1': {}, 'area_2': {}}
+
+
+def test_extended_template_merges_options():
+    template = parse_template({
+        'resize': {'mode': 'fixed'},
+        'page_preprocess': ['deskew'],
+        'areas': {
+            'number': {'box': [0, 0, 50, 10], 'field': 'invoice_number', 'resize': {'lines': 2}, 'profile': 'digits'},
+            'total': [0, 20, 50, 10],
+        },
+    })
+
+    assert template.areas == {'number': [0, 0, 50, 10], 'total': [0, 20, 50, 10]}
+    assert template.field_mapping == {'number': 'invoice_number'}
+    assert template.region_options['number']['resize'] == {'mode': 'fixed', 'lines': 2}
+    assert template.region_options['number']['profile']['psm'] == 7
+    assert template.region_options['total'] == {'resize': {'mode': 'fixed'}}
+    assert template.page_steps == ['deskew']
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'areas': {'total': {'box': [0, 0, 5, 5], 'colour': 'red'}}}, "unknown option"),
+    ({'areas': {'total': [0, 0, 5, 5]}, 'resise': {'lines': 2}}, "Unknown template option"),
+    ({'areas': {'total': {'box': [0, 0, 5, 5], 'resize': {'height': 40}}}}, "invalid 'resize'"),
+])
+def test_unknown_keys_are_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        parse_template(data)
+
+
+@pytest.mark.parametrize('box', [[0, 0, 5], [0, 0, 5, '5'], [0, 0, True, 5], [-1, 0, 5, 5], [0, 0, 0, 5], 'box'])
+def test_bad_coordinates_are_rejected(box):
+    with pytest.raises(ValueError, match="Area 'total'"):
+        parse_template({'total': box})
+
+
+def test_registry_reloads_changed_file(tmp_path):
+    registry = TemplateRegistry(str(tmp_path))
+    path = tmp_path / 'invoice.yaml'
+    path.write_text('total: [0, 0, 5, 5]\n', encoding='utf-8')
+
+    first = registry.get('invoice')
+    assert registry.get('invoice') is first
+
+    path.write_text('total: [1, 1, 5, 5]\n', encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, first.mtime + 1_000_000_000))
+    reloaded = registry.get('invoice')
+
+    assert reloaded is not first
+    assert reloaded.areas == {'total': [1, 1, 5, 5]}
+
+
+def test_registry_rejects_unknown_and_invalid_names(tmp_path):
+    registry = TemplateRegistry(str(tmp_path))
+
+    with pytest.raises(ValueError, match="does not exist"):
+        registry.get('missing')
+    with pytest.raises(ValueError, match="Template names"):
+        registry.get('../secrets')
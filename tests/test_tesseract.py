@@ -0,0 +1,67 @@
+import pytest
+from app.services.ocr.profiles import RecognitionProfile, resolve_profile
+from app.services.ocr.region_executor import region_executor
+from app.services.ocr.tesseract_pool import parse_tesseract_config
+
+
+@pytest.mark.parametrize('config, expected', [
+    ("--psm 12 --oem 1", {"psm": 12, "oem": 1, "variables": {}}),
+    ("--psm 7 -c tessedit_char_whitelist=0123456789",
+     {"psm": 7, "oem": None, "variables": {"tessedit_char_whitelist": "0123456789"}}),
+    ("-c 'tessedit_char_whitelist=0 1'", {"psm": None, "oem": None, "variables": {"tessedit_char_whitelist": "0 1"}}),
+    ("", {"psm": None, "oem": None, "variables": {}}),
+])
+def test_parse_tesseract_config(config, expected):
+    assert parse_tesseract_config(config) == expected
+
+
+@pytest.mark.parametrize('config', ["--dpi 300", "--psm", "-c novalue", "-l eng"])
+def test_parse_tesseract_config_rejects_unsupported_options(config):
+    with pytest.raises(ValueError):
+        parse_tesseract_config(config)
+
+
+def test_profile_language_must_be_configured():
+    assert resolve_profile({'lang': 'eng', 'psm': 7}).lang == 'eng'
+    with pytest.raises(ValueError, match="configured languages"):
+        RecognitionProfile(lang='fra')
+    with pytest.raises(ValueError, match="configured languages"):
+        resolve_profile({'lang': 'deu'})
+
+
+@pytest.fixture
+def backend_module(monkeypatch):
+    pytesseract_backend = pytest.importorskip('app.services.ocr.pytesseract_backend')
+
+    class FakePool:
+        def __init__(self, size, lang, config, tessdata_path=None):
+            self.size, self.lang = size, lang
+
+    monkeypatch.setattr(pytesseract_backend, 'TesseractEnginePool', FakePool)
+    return pytesseract_backend
+
+
+def test_pool_size_follows_region_workers(backend_module, monkeypatch):
+    monkeypatch.setattr(region_executor, 'workers', 6)
+
+    assert backend_module.PytesseractOCR(mode='subprocess').pool_size == 6
+    assert backend_module.PytesseractOCR(mode='subprocess', pool_size=2).pool_size == 2
+    monkeypatch.setattr(region_executor, 'workers', 0)
+    assert backend_module.PytesseractOCR(mode='subprocess').pool_size == 1
+
+
+def test_language_pools_are_limited_to_configured_languages(backend_module):
+    backend = backend_module.PytesseractOCR(mode='subprocess', pool_size=3)
+
+    pool = backend._pool_for('eng')
+    assert (pool.lang, pool.size) == ('eng', 3)
+    assert backend._pool_for('eng') is pool
+    with pytest.raises(ValueError, match="not in the configured languages"):
+        backend._pool_for('fra')
+
+
+def test_profile_config_keeps_engine_mode(backend_module):
+    backend = backend_module.PytesseractOCR(mode='subprocess')
+
+    assert backend._config(None, None) == backend.CONFIG
+    assert backend._config(7, "0123456789") == "--psm 7 --oem 1 -c tessedit_char_whitelist=0123456789"